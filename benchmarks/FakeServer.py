@@ -0,0 +1,367 @@
+""" A local, in-memory stand-in for the cloudCache server, built on tornado. It implements just enough of the real API
+(users, access tokens, notebooks and notes) for the CLI commands to run against it, with configurable latency.
+
+The notebook and note listings may be paged with `limit` and `offset` query parameters, in which case the response
+also gives the `offset`, `limit` and `total`, and `note_counts=true` lists each notebook's note count rather than its
+notes. Paging can be turned off, to stand in for a server which ignores the parameters. """
+
+import argparse
+import datetime
+import itertools
+import json
+import threading
+import uuid
+
+from tornado import gen
+from tornado.httpserver import HTTPServer
+from tornado.ioloop import IOLoop
+from tornado.netutil import bind_sockets
+from tornado.web import Application, RequestHandler
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+def _now():
+    """ The current UTC time as an ISO-8601 string, the same format the real server returns. """
+    return datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%f+00:00')
+
+
+class FakeDataStore(object):
+    """ Holds the users, access tokens, notebooks and notes served by the fake server. """
+
+    def __init__(self):
+        self.ids       = itertools.count(1)
+        self.users     = {}
+        self.tokens    = {}
+        self.notebooks = {}
+        self.lock      = threading.Lock()
+
+
+    def add_user(self, username, password='password'):
+        """ Creates a user, and returns the user's API key. """
+        with self.lock:
+            api_key = uuid.uuid4().hex
+            self.users[username] = {'id': next(self.ids), 'username': username, 'password': password,
+                                    'api_key': api_key}
+            return api_key
+
+
+    def issue_token(self, username, lifetime=datetime.timedelta(hours=1)):
+        """ Issues a new access token for the user, and returns (token, expires_on). """
+        with self.lock:
+            token = uuid.uuid4().hex
+            expires_on = (datetime.datetime.utcnow() + lifetime).strftime('%Y-%m-%dT%H:%M:%S.%f+00:00')
+            self.tokens[token] = username
+            return token, expires_on
+
+
+    def add_notebook(self, owner, name):
+        """ Creates an empty notebook, and returns its ID. """
+        with self.lock:
+            nb_id = next(self.ids)
+            self.notebooks[nb_id] = {'id': nb_id, 'name': name, 'owner': owner, 'notes': {},
+                                     'created_on': _now(), 'last_updated': _now()}
+            return nb_id
+
+
+    def add_note(self, nb_id, key, value):
+        """ Creates a note in the notebook, and returns its ID. """
+        with self.lock:
+            note_id = next(self.ids)
+            now = _now()
+            self.notebooks[nb_id]['notes'][note_id] = {'id': note_id, 'key': key, 'value': value,
+                                                       'created_on': now, 'last_updated': now}
+            self.notebooks[nb_id]['last_updated'] = now
+            return note_id
+
+
+    def populate(self, owner, notebooks, notes_per_notebook, value_size=32):
+        """ Fills the store with generated notebooks and notes for the owner. """
+        for nb_index in range(notebooks):
+            nb_id = self.add_notebook(owner, 'notebook {}'.format(nb_index))
+            for note_index in range(notes_per_notebook):
+                self.add_note(nb_id, 'key {}'.format(note_index), 'v' * value_size)
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+class BaseHandler(RequestHandler):
+    """ Common behaviour for every fake endpoint: simulated latency, JSON bodies, and access token checks. """
+
+    def initialize(self, store, settings):
+        self.store = store
+        self.fake_settings = settings
+
+
+    @gen.coroutine
+    def prepare(self):
+        if self.fake_settings['latency']:
+            yield gen.sleep(self.fake_settings['latency'])
+
+
+    def body(self):
+        return json.loads(self.request.body.decode('utf-8')) if self.request.body else {}
+
+
+    def reply(self, payload, status=200):
+        self.set_status(status)
+        self.set_header('Content-Type', 'application/json')
+        self.finish(json.dumps(payload))
+
+
+    def fail(self, status, message):
+        self.reply({'message': message}, status)
+
+
+    def paged_reply(self, payload, collection):
+        """ Replies with the payload, cut down to the requested page of its collection if paging was asked for. """
+
+        limit = self.get_query_argument('limit', None)
+        if limit is None or not self.fake_settings['pagination']:
+            return self.reply(payload)
+
+        offset = int(self.get_query_argument('offset', 0))
+        items = payload[collection]
+        payload = dict(payload, offset=offset, limit=int(limit), total=len(items))
+        payload[collection] = items[offset:offset + int(limit)]
+        self.reply(payload)
+
+
+    def authorized_user(self):
+        """ Returns the username owning the request's access token, or replies 401 and returns None. """
+        username = self.store.tokens.get(self.request.headers.get('access-token'))
+        if username is None:
+            self.fail(401, 'Your access token is invalid or has expired.')
+        return username
+
+
+    def owned_notebook(self, nb_id):
+        """ Returns the notebook if it exists and belongs to the requesting user, otherwise replies with an error. """
+        username = self.authorized_user()
+        if username is None:
+            return None
+        notebook = self.store.notebooks.get(int(nb_id))
+        if notebook is None or notebook['owner'] != username:
+            self.fail(404, 'Notebook {} does not exist.'.format(nb_id))
+            return None
+        return notebook
+
+
+class UsersHandler(BaseHandler):
+
+    def get(self):
+        users = [{'id': user['id'], 'username': user['username']} for user in self.store.users.values()]
+        self.reply({'users': users})
+
+
+    def put(self):
+        body = self.body()
+        if body['username'] in self.store.users:
+            return self.fail(400, 'User {} already exists.'.format(body['username']))
+        api_key = self.store.add_user(body['username'], body['password'])
+        self.reply({'api_key': api_key}, 201)
+
+
+class UserHandler(BaseHandler):
+
+    def _checked_user(self, username):
+        user = self.store.users.get(username)
+        if user is None or user['password'] != self.body().get('password'):
+            self.fail(401, 'Invalid username or password.')
+            return None
+        return user
+
+
+    def get(self, username):
+        user = self._checked_user(username)
+        if user is not None:
+            self.reply({'user': {'id': user['id'], 'username': username, 'api_key': user['api_key']}})
+
+
+    def delete(self, username):
+        if self._checked_user(username) is not None:
+            del self.store.users[username]
+            self.reply({'message': 'User deleted.'})
+
+
+class AccessHandler(BaseHandler):
+
+    def get(self, username, api_key):
+        user = self.store.users.get(username)
+        if user is None or user['api_key'] != api_key:
+            return self.fail(401, 'Invalid username or API key.')
+        token, expires_on = self.store.issue_token(username)
+        self.reply({'access token': {'access_token': token, 'expires_on': expires_on}})
+
+
+class NotebooksHandler(BaseHandler):
+
+    def get(self):
+        username = self.authorized_user()
+        if username is None:
+            return
+        counts = self.fake_settings['pagination'] and self.get_query_argument('note_counts', '') == 'true'
+        notebooks = [dict({'id': nb['id'], 'name': nb['name'], 'created_on': nb['created_on'],
+                           'last_updated': nb['last_updated']},
+                          **({'note_count': len(nb['notes'])} if counts else {'notes': list(nb['notes'].values())}))
+                     for nb in self.store.notebooks.values() if nb['owner'] == username]
+        self.paged_reply({'notebooks': notebooks}, 'notebooks')
+
+
+    def put(self):
+        username = self.authorized_user()
+        if username is not None:
+            nb_id = self.store.add_notebook(username, self.body()['notebook_name'])
+            self.reply({'notebook_id': nb_id}, 201)
+
+
+class NotebookHandler(BaseHandler):
+
+    def delete(self, nb_id):
+        if self.owned_notebook(nb_id) is not None:
+            del self.store.notebooks[int(nb_id)]
+            self.reply({'message': 'Notebook deleted.'})
+
+
+class NotesHandler(BaseHandler):
+
+    def get(self, nb_id):
+        notebook = self.owned_notebook(nb_id)
+        if notebook is not None:
+            self.paged_reply({'notebook': notebook['name'], 'notes': list(notebook['notes'].values())}, 'notes')
+
+
+    def put(self, nb_id):
+        if self.owned_notebook(nb_id) is not None:
+            body = self.body()
+            note_id = self.store.add_note(int(nb_id), body['note_key'], body['note_value'])
+            self.reply({'note_id': note_id}, 201)
+
+
+class NoteHandler(BaseHandler):
+
+    def _note(self, nb_id, note_id):
+        notebook = self.owned_notebook(nb_id)
+        if notebook is None:
+            return None
+        note = notebook['notes'].get(int(note_id))
+        if note is None:
+            self.fail(404, 'Note {} does not exist.'.format(note_id))
+        return note
+
+
+    def get(self, nb_id, note_id):
+        note = self._note(nb_id, note_id)
+        if note is not None:
+            self.reply(note)
+
+
+    def delete(self, nb_id, note_id):
+        if self._note(nb_id, note_id) is not None:
+            del self.store.notebooks[int(nb_id)]['notes'][int(note_id)]
+            self.reply({'message': 'Note deleted.'})
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+class CountingHTTPServer(HTTPServer):
+    """ An HTTPServer which counts the TCP connections it accepts, so benchmarks can show connection reuse. """
+
+    def handle_stream(self, stream, address):
+        self.connections_opened += 1
+        return super(CountingHTTPServer, self).handle_stream(stream, address)
+
+
+class FakeServer(object):
+    """ Runs the fake cloudCache server on its own IOLoop in a background thread. Use port=0 to pick a free port. """
+
+    def __init__(self, port=0, latency=0.0, store=None, pagination=True):
+        self.store    = store if store is not None else FakeDataStore()
+        self.settings = {'latency': latency, 'pagination': pagination}
+        self.sockets  = bind_sockets(port, '127.0.0.1')
+        self.port     = self.sockets[0].getsockname()[1]
+        self.server   = None
+        self.thread   = None
+        self.started  = threading.Event()
+
+
+    def make_app(self):
+        kwargs = {'store': self.store, 'settings': self.settings}
+        return Application([
+            (r'/users/?', UsersHandler, kwargs),
+            (r'/users/([^/]+)', UserHandler, kwargs),
+            (r'/access/([^/]+)/([^/]+)', AccessHandler, kwargs),
+            (r'/notebooks/?', NotebooksHandler, kwargs),
+            (r'/notebooks/(\d+)', NotebookHandler, kwargs),
+            (r'/notebooks/(\d+)/notes/?', NotesHandler, kwargs),
+            (r'/notebooks/(\d+)/notes/(\d+)', NoteHandler, kwargs),
+        ], log_function=lambda handler: None)
+
+
+    @property
+    def connections_opened(self):
+        return self.server.connections_opened if self.server else 0
+
+
+    def _run(self):
+        try:
+            import asyncio
+            asyncio.set_event_loop(asyncio.new_event_loop())
+        except ImportError:
+            pass
+
+        self.io_loop = IOLoop.current()
+        self.server = CountingHTTPServer(self.make_app())
+        self.server.connections_opened = 0
+        self.server.add_sockets(self.sockets)
+        self.io_loop.add_callback(self.started.set)
+        self.io_loop.start()
+
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+        self.started.wait()
+        return self
+
+
+    def stop(self):
+        self.io_loop.add_callback(self.server.stop)
+        self.io_loop.add_callback(self.io_loop.stop)
+        self.thread.join()
+
+
+    def seed_cli_config(self, config_manager, username='benchmark'):
+        """ Creates a user with a valid access token, and points the CLI config at this server as that user. """
+        from cloudCacheCLI import CFG_SERVER, CFG_PORT, CFG_USER, CFG_API_KEY, CFG_ACCESS_TOKEN, CFG_TOKEN_EXPIRES
+
+        api_key = self.store.add_user(username)
+        token, expires_on = self.store.issue_token(username)
+
+        config = config_manager.load_config()
+        config.update({CFG_SERVER: '127.0.0.1', CFG_PORT: str(self.port), CFG_USER: username, CFG_API_KEY: api_key,
+                       CFG_ACCESS_TOKEN: token, CFG_TOKEN_EXPIRES: expires_on})
+        config_manager.save_config(config)
+        return username
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a local stand-in cloudCache server.')
+    parser.add_argument('--port', type=int, default=8888)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds of simulated latency per request')
+    parser.add_argument('--user', default=None, help='create this user (password `password`) on startup')
+    parser.add_argument('--notebooks', type=int, default=0, help='notebooks to generate for --user')
+    parser.add_argument('--notes', type=int, default=0, help='notes to generate per notebook for --user')
+    parser.add_argument('--no-pagination', action='store_true', help='ignore `limit` and `offset`, like older servers')
+    cli_args = parser.parse_args()
+
+    fake = FakeServer(cli_args.port, cli_args.latency, pagination=not cli_args.no_pagination)
+    if cli_args.user:
+        print('API key for {}: {}'.format(cli_args.user, fake.store.add_user(cli_args.user)))
+        fake.store.populate(cli_args.user, cli_args.notebooks, cli_args.notes)
+
+    print('Fake cloudCache server listening on 127.0.0.1:{}'.format(fake.port))
+    fake.start()
+    try:
+        fake.thread.join()
+    except KeyboardInterrupt:
+        fake.stop()
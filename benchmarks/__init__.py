@@ -0,0 +1,2 @@
+""" Benchmarks for the cloudCache CLI, run against a local stand-in cloudCache server. `python -m benchmarks.suite` runs
+them all, and saves the results as JSON for comparing runs. """
@@ -0,0 +1,96 @@
+""" Measures how long decoding a large /notebooks response and encoding its notes take with each JSON codec which is
+installed. The `before` rows decode the response the way the CLI used to: from response.text, which first decodes the
+body to text, and then twice over, as PutCommand and PostCommand did. """
+
+import argparse
+import json
+import statistics
+import time
+
+import requests
+
+from cloudCacheCLI.Utilities import JsonCodec
+
+# The notes in each notebook of the response, and the characters in each note's value, if not given. Large enough that
+# the codec, rather than the fixed cost of each call, dominates
+DEFAULT_NOTES      = 5000
+DEFAULT_VALUE_SIZE = 256
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+def notebooks_payload(notebooks, notes_per_notebook, value_size):
+    """ The body of a /notebooks response holding the given number of notebooks and notes, as bytes. """
+
+    value = 'v' * value_size
+    listing = {'notebooks': [{'id': nb_id, 'name': 'notebook {}'.format(nb_id), 'last_updated': None,
+                              'notes': [{'id': nb_id * notes_per_notebook + note_id, 'key': 'key {}'.format(note_id),
+                                         'value': value, 'last_updated': '2016-01-01T00:00:00+00:00'}
+                                        for note_id in range(notes_per_notebook)]}
+                             for nb_id in range(notebooks)]}
+    return json.dumps(listing).encode('utf-8'), listing
+
+
+def fake_response(body):
+    """ A requests.Response holding body, as the server would send it. """
+    response = requests.models.Response()
+    response.status_code = 200
+    response.headers['Content-Type'] = 'application/json'
+    response._content = body
+    return response
+
+
+def time_ms(function, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def measure(runs, notebooks, notes_per_notebook, value_size):
+    """ Times each operation with each installed codec. Returns a result per codec and operation. """
+
+    body, listing = notebooks_payload(notebooks, notes_per_notebook, value_size)
+    notes = [note for notebook in listing['notebooks'] for note in notebook['notes']]
+    megabytes = len(body) / (1024.0 * 1024.0)
+
+    def decode_before():
+        for _ in range(2):
+            json.loads(fake_response(body).text)
+
+    operations = [
+        ('decode response (before)', decode_before),
+        ('decode response', lambda: JsonCodec.loads(fake_response(body).content)),
+        ('encode request bodies', lambda: [JsonCodec.dumps_bytes(note) for note in notes]),
+        ('encode export records', lambda: [JsonCodec.dumps(note) for note in notes]),
+    ]
+
+    results = []
+    for codec in JsonCodec.AUTO_PREFERENCE:
+        if not JsonCodec.codec_available(codec):
+            continue
+        JsonCodec.use_codec(codec)
+
+        for operation, function in operations:
+            if operation.endswith('(before)') and codec != JsonCodec.CODEC_JSON:
+                continue
+            median_ms = time_ms(function, runs)
+            results.append({'codec': codec, 'operation': operation, 'notes': len(notes),
+                            'megabytes': round(megabytes, 2), 'median_ms': round(median_ms, 2),
+                            'megabytes_per_second': round(megabytes / (median_ms / 1000), 1)})
+
+    JsonCodec.use_codec(JsonCodec.CODEC_AUTO)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the JSON codecs on a large /notebooks response.')
+    parser.add_argument('--runs', type=int, default=5, help='runs of each measurement')
+    parser.add_argument('--notebooks', type=int, default=10)
+    parser.add_argument('--notes', type=int, default=DEFAULT_NOTES, help='notes per notebook')
+    parser.add_argument('--value-size', type=int, default=DEFAULT_VALUE_SIZE, help='characters in each note value')
+    cli_args = parser.parse_args()
+
+    for result in measure(cli_args.runs, cli_args.notebooks, cli_args.notes, cli_args.value_size):
+        print(json.dumps(result))
@@ -0,0 +1,177 @@
+""" Measures the end-to-end latency of individual `cc` commands, how long `notes` takes to render listings of various
+sizes, and `exportnotebooks` throughput. Every measurement is a separate `cc` process, exactly as a user runs it,
+against a throwaway copy of the CLI pointed at the fake server. """
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from cloudCacheCLI import CFG_CACHE_TTL
+from cloudCacheCLI.ConfigManager import ConfigManager
+from benchmarks.FakeServer import FakeServer
+
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cloudCacheCLI')
+
+# Each command measured, with `{notebook}` and `{note}` standing for the IDs of a notebook and note of the dataset. The
+# local and offline commands run after `sync` has filled the replica
+COMMANDS = [
+    ('users', ['users']),
+    ('notebooks', ['notebooks']),
+    ('notes', ['notes', '{notebook}']),
+    ('note', ['note', '{note}', '{notebook}']),
+    ('newnote', ['newnote', '{notebook}', 'benchmark key', 'benchmark value']),
+    ('sync', ['sync']),
+    ('notebooks --local', ['notebooks', '--local']),
+    ('notes --local', ['notes', '{notebook}', '--local']),
+    ('search', ['search', 'key']),
+]
+
+# The listing sizes `notes` is rendered at, and the output formats it's rendered in
+DEFAULT_ROWS    = [10, 1000, 100000]
+DEFAULT_FORMATS = ['table', 'tsv']
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+class CliSandbox(object):
+    """ A copy of the CLI in a temporary directory, configured as a user of a fake server of its own. The response
+    cache is turned off, so every command reaches the server. Without pagination, the server stands in for one which
+    ignores the paging parameters. """
+
+    def __init__(self, latency=0.0, notebooks=0, notes_per_notebook=0, value_size=32, pagination=True):
+        self.work_dir = tempfile.mkdtemp()
+        shutil.copytree(PACKAGE_DIR, os.path.join(self.work_dir, 'cloudCacheCLI'),
+                        ignore=shutil.ignore_patterns('__pycache__', '.cc*'))
+
+        self.server = FakeServer(latency=latency, pagination=pagination).start()
+        config_manager = ConfigManager(os.path.join(self.work_dir, 'cloudCacheCLI', '.ccconfig'))
+        self.user = self.server.seed_cli_config(config_manager)
+
+        config = config_manager.load_config()
+        config[CFG_CACHE_TTL] = '0'
+        config_manager.save_config(config)
+
+        self.server.store.populate(self.user, notebooks, notes_per_notebook, value_size)
+
+
+    @property
+    def notebook_id(self):
+        return min(self.server.store.notebooks)
+
+
+    @property
+    def note_id(self):
+        return min(self.server.store.notebooks[self.notebook_id]['notes'])
+
+
+    def run(self, args):
+        """ Runs `cc` with the args, discarding its output. Returns the wall-clock milliseconds it took. """
+
+        start = time.perf_counter()
+        self._run(args, subprocess.DEVNULL)
+        return (time.perf_counter() - start) * 1000
+
+
+    def output(self, args):
+        """ Runs `cc` with the args, and returns what it printed. """
+        return self._run(args, subprocess.PIPE).stdout
+
+
+    def _run(self, args, stdout):
+        script = os.path.join(self.work_dir, 'cloudCacheCLI', 'cc_cli.py')
+        env = dict(os.environ, PYTHONPATH=self.work_dir)
+
+        process = subprocess.run([sys.executable, script] + args, cwd=self.work_dir, env=env,
+                                 stdout=stdout, stderr=subprocess.PIPE, universal_newlines=True)
+
+        if process.returncode != 0:
+            raise RuntimeError('`cc {}` failed:\n{}'.format(' '.join(args), process.stderr))
+        return process
+
+
+    def close(self):
+        self.server.stop()
+        shutil.rmtree(self.work_dir)
+
+
+def summarize(timings_ms):
+    """ The minimum, median and 95th percentile of a list of timings. """
+
+    timings_ms = sorted(timings_ms)
+    middle = len(timings_ms) // 2
+    median = timings_ms[middle] if len(timings_ms) % 2 else (timings_ms[middle - 1] + timings_ms[middle]) / 2
+    p95 = timings_ms[int(round(0.95 * (len(timings_ms) - 1)))]
+    return {'runs': len(timings_ms), 'min_ms': round(timings_ms[0], 1), 'median_ms': round(median, 1),
+            'p95_ms': round(p95, 1)}
+
+
+def measure_commands(runs, latency, notebooks, notes_per_notebook):
+    """ Runs each of COMMANDS `runs` times against a dataset of the given size. """
+
+    sandbox = CliSandbox(latency, notebooks, notes_per_notebook)
+    try:
+        results = []
+        for name, args in COMMANDS:
+            args = [arg.format(notebook=sandbox.notebook_id, note=sandbox.note_id) for arg in args]
+            timings = [sandbox.run(args) for _ in range(runs)]
+            results.append(dict({'command': name, 'notes': notebooks * notes_per_notebook, 'latency': latency},
+                                **summarize(timings)))
+        return results
+    finally:
+        sandbox.close()
+
+
+def measure_rendering(runs, latency, row_counts, output_formats):
+    """ Times `notes` listing a single notebook of each size, in each output format. """
+
+    results = []
+    for rows in row_counts:
+        sandbox = CliSandbox(latency, 1, rows)
+        try:
+            for output_format in output_formats:
+                args = ['notes', str(sandbox.notebook_id), '--output', output_format]
+                result = summarize([sandbox.run(args) for _ in range(runs)])
+                result['rows_per_second'] = round(rows / (result['median_ms'] / 1000), 1)
+                results.append(dict({'rows': rows, 'format': output_format, 'latency': latency}, **result))
+        finally:
+            sandbox.close()
+    return results
+
+
+def measure_export(runs, latency, notebooks, notes_per_notebook, export_formats=('json', 'ndjson')):
+    """ Times `exportnotebooks` of a dataset of the given size, in each export format. """
+
+    sandbox = CliSandbox(latency, notebooks, notes_per_notebook)
+    note_count = notebooks * notes_per_notebook
+    try:
+        results = []
+        for export_format in export_formats:
+            path = os.path.join(sandbox.work_dir, 'export.' + export_format)
+            result = summarize([sandbox.run(['exportnotebooks', path]) for _ in range(runs)])
+            result['notes_per_second'] = round(note_count / (result['median_ms'] / 1000), 1)
+            results.append(dict({'format': export_format, 'notes': note_count, 'latency': latency}, **result))
+        return results
+    finally:
+        sandbox.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark individual `cc` commands against the fake server.')
+    parser.add_argument('--runs', type=int, default=5, help='runs of each command')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds of simulated server latency')
+    parser.add_argument('--notebooks', type=int, default=10, help='notebooks in the dataset')
+    parser.add_argument('--notes', type=int, default=100, help='notes per notebook in the dataset')
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS, help='`notes` listing sizes to render')
+    parser.add_argument('--formats', nargs='+', default=DEFAULT_FORMATS, help='output formats to render `notes` in')
+    cli_args = parser.parse_args()
+
+    for result in measure_commands(cli_args.runs, cli_args.latency, cli_args.notebooks, cli_args.notes):
+        print(json.dumps(result))
+    for result in measure_rendering(cli_args.runs, cli_args.latency, cli_args.rows, cli_args.formats):
+        print(json.dumps(result))
+    for result in measure_export(cli_args.runs, cli_args.latency, cli_args.notebooks, cli_args.notes):
+        print(json.dumps(result))
@@ -0,0 +1,91 @@
+""" Measures `importnotebooks` throughput against the fake server, comparing the pooled Transport against the previous
+behaviour of one module-level requests call (and so one new TCP connection) per API call, at various worker counts. """
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import requests
+
+from cloudCacheCLI.ConfigManager import ConfigManager
+from cloudCacheCLI.Transport import Transport
+from cloudCacheCLI.ResponseCache import ResponseCache
+from cloudCacheCLI.Replica import Replica
+from cloudCacheCLI.Commands.NotebookCommands import ImportNotebooksCommand
+from benchmarks.FakeServer import FakeServer
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+class UnpooledTransport(Transport):
+    """ Mimics the CLI before the shared transport: every call goes through requests' module-level API. """
+
+    def _send(self, method, url, body, stream, headers):
+        data = json.dumps(body) if body is not None else None
+        headers = dict(self.session.headers, **(headers or {}))
+        return requests.request(method, url, data=data, headers=headers, stream=stream)
+
+
+class BenchmarkApp(object):
+    """ The subset of CloudCacheCliApp the commands rely on, without argv parsing or the ensure_* steps. """
+
+    def __init__(self, config_manager, transport_class):
+        self.config_manager = config_manager
+        self.transport = transport_class(config_manager)
+        self.response_cache = ResponseCache(config_manager, config_manager.config_file + '.cache')
+        self.replica = Replica(config_manager, config_manager.config_file + '.replica')
+
+
+def write_export_file(path, notebooks, notes_per_notebook):
+    """ Writes an export file in the `exportnotebooks` layout with generated notebooks and notes. """
+    data = {'notebooks': [{'name': 'notebook {}'.format(i),
+                           'notes': [{'key': 'key {}'.format(j), 'value': 'value {}'.format(j)}
+                                     for j in range(notes_per_notebook)]}
+                          for i in range(notebooks)]}
+    with open(path, 'w') as export_file:
+        json.dump(data, export_file)
+
+
+def run(transport_class, notebooks, notes_per_notebook, latency, workers=1):
+    """ Imports a generated export file through the given transport, returning the timing and connection counts. """
+
+    work_dir = tempfile.mkdtemp()
+    server = FakeServer(latency=latency).start()
+
+    try:
+        config_manager = ConfigManager(os.path.join(work_dir, '.ccconfig'))
+        server.seed_cli_config(config_manager)
+
+        export_path = os.path.join(work_dir, 'export.json')
+        write_export_file(export_path, notebooks, notes_per_notebook)
+
+        app = BenchmarkApp(config_manager, transport_class)
+        start = time.time()
+        ImportNotebooksCommand([export_path, '--workers', str(workers)], app)
+        elapsed = time.time() - start
+
+        requests_made = notebooks * (notes_per_notebook + 1)
+        return {'transport': transport_class.__name__, 'workers': workers, 'requests': requests_made,
+                'seconds': round(elapsed, 3),
+                'requests_per_second': round(requests_made / elapsed, 1),
+                'connections_opened': server.connections_opened}
+
+    finally:
+        server.stop()
+        shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark importnotebooks with and without connection pooling.')
+    parser.add_argument('--notebooks', type=int, default=10)
+    parser.add_argument('--notes', type=int, default=100, help='notes per notebook')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds of simulated server latency')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1], help='worker counts to benchmark')
+    cli_args = parser.parse_args()
+
+    for transport_class in (UnpooledTransport, Transport):
+        for workers in cli_args.workers:
+            result = run(transport_class, cli_args.notebooks, cli_args.notes, cli_args.latency, workers)
+            print(json.dumps(result))
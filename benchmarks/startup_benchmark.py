@@ -0,0 +1,135 @@
+""" Measures how long `cc` takes to start, using `python -X importtime`, and checks it against a budget. Each scenario
+is run once cold (with no bytecode cached for the CLI's own modules) and then several times warm, against a throwaway
+copy of the CLI so the real config is never touched. The imports the bare interpreter makes on its own (`site`,
+`encodings`, any `.pth` hooks) are measured separately and taken off, so only the CLI's own imports count against the
+budget. Exits with status 1 if any scenario is over budget, or imports a module it has no use for, so it can guard
+against startup regressions as commands are added. """
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cloudCacheCLI')
+
+# Each scenario's command line, the most milliseconds its warm imports may take, and the modules it must never import
+# since none of its code paths use them
+SCENARIOS = {
+    'config': (['config', 'port', '8888'], 50, ('requests', 'arrow', 'tabulate', 'sqlite3', 'concurrent.futures')),
+    'echo config': ([], 75, ('requests', 'arrow', 'sqlite3', 'concurrent.futures')),
+    'unknown command': (['nosuchcommand'], 50, ('requests', 'arrow', 'tabulate', 'sqlite3', 'concurrent.futures'))
+}
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+def parse_importtime(stderr):
+    """ Parses `-X importtime` output into the total import time in milliseconds, and the set of modules imported. """
+
+    total_us = 0
+    modules = set()
+
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+
+        _, cumulative, name = line.split('|', 2)
+        modules.add(name.strip())
+
+        # Nested imports are indented beneath the import which triggered them, and are counted in its cumulative time
+        if not name[1:].startswith(' '):
+            total_us += int(cumulative)
+
+    return total_us / 1000.0, modules
+
+
+def run_python(work_dir, args):
+    """ Runs the interpreter once with -X importtime, in the same environment as the CLI copy. Returns the wall-clock
+    milliseconds, import milliseconds, and the set of modules imported. """
+
+    env = dict(os.environ, PYTHONPATH=work_dir)
+
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime'] + args, cwd=work_dir, env=env,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    import_ms, modules = parse_importtime(process.stderr)
+    return wall_ms, import_ms, modules
+
+
+def run_cli(work_dir, args):
+    """ Runs the CLI copy once, returning the same as run_python. """
+    return run_python(work_dir, [os.path.join(work_dir, 'cloudCacheCLI', 'cc_cli.py')] + args)
+
+
+def measure_baseline(work_dir, runs):
+    """ Runs the bare interpreter, and returns the median wall-clock and import milliseconds of its own startup, and
+    the set of modules it imports before any script runs. """
+
+    results = [run_python(work_dir, ['-c', 'pass']) for _ in range(runs)]
+    return (statistics.median(result[0] for result in results), statistics.median(result[1] for result in results),
+            results[0][2])
+
+
+def clear_bytecode(work_dir):
+    for root, dirs, _ in os.walk(work_dir):
+        if '__pycache__' in dirs:
+            shutil.rmtree(os.path.join(root, '__pycache__'))
+            dirs.remove('__pycache__')
+
+
+def measure(work_dir, name, runs, budget_scale, baseline):
+    """ Runs one scenario cold, then warm, and returns its results, less the interpreter's own startup, including
+    whether it is within budget. """
+
+    args, budget_ms, forbidden = SCENARIOS[name]
+    baseline_wall_ms, baseline_import_ms, baseline_modules = baseline
+
+    clear_bytecode(work_dir)
+    cold_wall_ms, cold_import_ms, modules = run_cli(work_dir, args)
+    cold_wall_ms -= baseline_wall_ms
+    cold_import_ms -= baseline_import_ms
+
+    warm = [run_cli(work_dir, args) for _ in range(runs)]
+    warm_wall_ms = statistics.median(result[0] for result in warm) - baseline_wall_ms
+    warm_import_ms = statistics.median(result[1] for result in warm) - baseline_import_ms
+
+    unwanted = sorted(module for module in forbidden if module in modules - baseline_modules)
+    budget_ms *= budget_scale
+
+    return {'scenario': name, 'args': args,
+            'cold_wall_ms': round(cold_wall_ms, 1), 'cold_import_ms': round(cold_import_ms, 1),
+            'warm_wall_ms': round(warm_wall_ms, 1), 'warm_import_ms': round(warm_import_ms, 1),
+            'baseline_import_ms': round(baseline_import_ms, 1), 'budget_import_ms': budget_ms,
+            'unwanted_imports': unwanted,
+            'within_budget': warm_import_ms <= budget_ms and not unwanted}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark `cc` startup time against a regression budget.')
+    parser.add_argument('--runs', type=int, default=5, help='warm runs per scenario')
+    parser.add_argument('--budget-scale', type=float, default=1.0,
+                        help='multiplies every time budget, to allow for slower machines')
+    parser.add_argument('--scenarios', nargs='+', default=sorted(SCENARIOS), choices=sorted(SCENARIOS))
+    cli_args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        shutil.copytree(PACKAGE_DIR, os.path.join(work_dir, 'cloudCacheCLI'),
+                        ignore=shutil.ignore_patterns('__pycache__', '.cc*'))
+
+        baseline = measure_baseline(work_dir, cli_args.runs)
+        results = [measure(work_dir, name, cli_args.runs, cli_args.budget_scale, baseline)
+                   for name in cli_args.scenarios]
+    finally:
+        shutil.rmtree(work_dir)
+
+    for result in results:
+        print(json.dumps(result))
+
+    sys.exit(0 if all(result['within_budget'] for result in results) else 1)
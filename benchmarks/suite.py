@@ -0,0 +1,146 @@
+""" Runs every benchmark with the same settings, and saves the results as a single JSON file, so that runs on different
+commits can be compared. With `--compare`, also prints how each measurement changed since an earlier results file.
+
+    python -m benchmarks.suite --output after.json --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import codec_benchmark, command_benchmark, import_benchmark, startup_benchmark
+from cloudCacheCLI.Transport import Transport
+
+# The measurements compared between runs, and whether a bigger number is better
+METRICS = {'warm_import_ms': False, 'median_ms': False, 'p95_ms': False, 'seconds': False,
+           'requests_per_second': True, 'rows_per_second': True, 'notes_per_second': True, 'megabytes_per_second': True}
+
+# The benchmarks run, in order
+SECTIONS = ('startup', 'commands', 'rendering', 'import', 'export', 'codec')
+
+# Changes smaller than this (percent) are within the usual run-to-run noise, so aren't flagged
+NOISE_PERCENT = 5
+
+# The fields which, along with its section, identify a result, so it can be matched with the same result of another run
+IDENTITY_FIELDS = ('scenario', 'command', 'rows', 'format', 'workers', 'notes', 'latency', 'codec', 'operation')
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+def run_startup(runs):
+    work_dir = tempfile.mkdtemp()
+    try:
+        shutil.copytree(startup_benchmark.PACKAGE_DIR, os.path.join(work_dir, 'cloudCacheCLI'),
+                        ignore=shutil.ignore_patterns('__pycache__', '.cc*'))
+        return [startup_benchmark.measure(work_dir, name, runs, 1.0) for name in sorted(startup_benchmark.SCENARIOS)]
+    finally:
+        shutil.rmtree(work_dir)
+
+
+def run_import(settings):
+    return [import_benchmark.run(Transport, settings.notebooks, settings.notes, settings.latency, workers)
+            for workers in settings.workers]
+
+
+def run_suite(settings):
+    """ Runs each benchmark in turn, printing progress to stderr. Returns the results, along with the settings and
+    environment they were measured with. """
+
+    sections = [
+        ('startup', lambda: run_startup(settings.runs)),
+        ('commands', lambda: command_benchmark.measure_commands(settings.runs, settings.latency, settings.notebooks,
+                                                                settings.notes)),
+        ('rendering', lambda: command_benchmark.measure_rendering(settings.runs, settings.latency, settings.rows,
+                                                                  command_benchmark.DEFAULT_FORMATS)),
+        ('import', lambda: run_import(settings)),
+        ('export', lambda: command_benchmark.measure_export(settings.runs, settings.latency, settings.notebooks,
+                                                           settings.notes)),
+        ('codec', lambda: codec_benchmark.measure(settings.runs, settings.notebooks, codec_benchmark.DEFAULT_NOTES,
+                                                  codec_benchmark.DEFAULT_VALUE_SIZE)),
+    ]
+
+    results = {'settings': vars(settings), 'environment': environment(), 'results': {}}
+    for name, benchmark in sections:
+        if name not in settings.sections:
+            continue
+
+        sys.stderr.write('Running the {} benchmarks...\n'.format(name))
+        start = time.time()
+        results['results'][name] = benchmark()
+        sys.stderr.write('  done in {:.1f} seconds.\n'.format(time.time() - start))
+
+    return results
+
+
+def environment():
+    """ What the results were measured on. """
+
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                         cwd=os.path.dirname(os.path.abspath(__file__)), universal_newlines=True)
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {'commit': commit.strip() if commit else None, 'python': platform.python_version(),
+            'platform': platform.platform(), 'measured_on': time.strftime('%Y-%m-%dT%H:%M:%S%z')}
+
+
+def compare(before, after):
+    """ Prints each measurement present in both runs, and how much it changed, flagging those which got noticeably
+    worse. """
+
+    def measurements(run):
+        found = {}
+        for section, results in run['results'].items():
+            for result in results:
+                identity = ' '.join('{}={}'.format(field, result[field]) for field in IDENTITY_FIELDS
+                                    if field in result)
+                for metric, value in result.items():
+                    if metric in METRICS:
+                        found[(section, identity, metric)] = value
+        return found
+
+    before_values, after_values = measurements(before), measurements(after)
+
+    print('\nCompared with {} (commit {}):'.format(before['environment']['measured_on'],
+                                                   before['environment']['commit']))
+    for key in sorted(set(before_values) & set(after_values)):
+        old, new = before_values[key], after_values[key]
+        change = (new - old) / old * 100 if old else 0.0
+        worse = (-change if METRICS[key[2]] else change) > NOISE_PERCENT
+        flag = ' (worse)' if worse else ''
+        print('  {:<60} {:>12} -> {:<12} {:+7.1f}%{}'.format(' '.join(key), old, new, change, flag))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run every cloudCache CLI benchmark, and save the results as JSON.')
+    parser.add_argument('--output', default='benchmark-results.json', help='the file the results are saved to')
+    parser.add_argument('--compare', default=None, help='an earlier results file to compare these results with')
+    parser.add_argument('--sections', nargs='+', default=list(SECTIONS), choices=SECTIONS)
+    parser.add_argument('--runs', type=int, default=5, help='runs of each measurement')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds of simulated server latency')
+    parser.add_argument('--notebooks', type=int, default=10, help='notebooks in the dataset')
+    parser.add_argument('--notes', type=int, default=100, help='notes per notebook in the dataset')
+    parser.add_argument('--rows', type=int, nargs='+', default=command_benchmark.DEFAULT_ROWS,
+                        help='`notes` listing sizes to render')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8], help='importnotebooks worker counts')
+    settings = parser.parse_args()
+
+    baseline = None
+    if settings.compare:
+        with open(settings.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    suite_results = run_suite(settings)
+
+    with open(settings.output, 'w') as output_file:
+        json.dump(suite_results, output_file, indent=2)
+    print('Saved the results to {}.'.format(settings.output))
+
+    if baseline is not None:
+        compare(baseline, suite_results)
@@ -0,0 +1,292 @@
+""" The cloudCache CLI application, which dispatches a command line to its command. """
+
+import importlib
+import sys
+import threading
+from contextlib import contextmanager
+from os.path import dirname, realpath, join
+
+from ConfigManager import ConfigManager
+from Daemon import SOCKET_NAME
+from Commands import CommandValidationError, pop_global_options
+from cloudCacheCLI import CFG_SERVER, CFG_PORT, CFG_POOL_SIZE, CFG_CACHE_TTL, CFG_CACHE_SIZE, CFG_TOKEN_MARGIN,\
+    CFG_CONNECT_TIMEOUT, CFG_READ_TIMEOUT, CFG_RETRIES, CFG_BREAKER_THRESHOLD, CFG_BREAKER_COOLDOWN,\
+    CFG_METRICS_RETENTION, CFG_JSON_CODEC
+from cloudCacheCLI.Tracer import span, traced, tracing
+from cloudCacheCLI.Utilities.JsonCodec import CODEC_AUTO, use_codec
+from cloudCacheCLI.Utilities.TableWriter import OUTPUT_TABLE
+
+# -------------------------------------------------------------------------------------------------
+
+class CloudCacheCliApp(object):
+
+    # Each command's class, as `package.ClassName`. A command's module, and everything it depends on, is only imported
+    # when that command is run, so adding commands doesn't slow down every other one
+    commands = {
+        'config': 'Commands.ConfigAppCommand',
+        'users': 'Commands.UserCommands.ShowUsersCommand',
+        'notebooks': 'Commands.NotebookCommands.ShowNotebooksCommand',
+        'newuser': 'Commands.UserCommands.NewUserCommand',
+        'notes': 'Commands.NoteCommands.ShowNotesCommand',
+        'newnotebook': 'Commands.NotebookCommands.NewNotebookCommand',
+        'newnote': 'Commands.NoteCommands.NewNoteCommand',
+        'newnotes': 'Commands.NoteCommands.NewNotesCommand',
+        'note': 'Commands.NoteCommands.ShowNoteCommand',
+        'deletenote': 'Commands.NoteCommands.DeleteNoteCommand',
+        'deletenotebook': 'Commands.NotebookCommands.DeleteNotebookCommand',
+        'deletenotes': 'Commands.NoteCommands.DeleteNotesCommand',
+        'deletenotebooks': 'Commands.NotebookCommands.DeleteNotebooksCommand',
+        'deleteuser': 'Commands.UserCommands.DeleteUserCommand',
+        'exportnotebooks': 'Commands.NotebookCommands.ExportNotebooksCommand',
+        'importnotebooks': 'Commands.NotebookCommands.ImportNotebooksCommand',
+        'compactexports': 'Commands.NotebookCommands.CompactExportsCommand',
+        'sync': 'Commands.SyncCommand',
+        'search': 'Commands.SearchCommand',
+        'diff': 'Commands.DiffCommand',
+        'stats': 'Commands.StatsCommand',
+        'daemon': 'Commands.DaemonCommand',
+        'batch': 'Commands.BatchCommand',
+        'shell': 'Commands.ShellCommand'
+    }
+
+    # The commands which don't need a configured user, API key and access token before they run
+    commands_without_ensure_steps = ('config', 'newuser', 'daemon', 'stats')
+
+    # The commands which only read the local replica or local files, so work offline, without an API key or access token
+    offline_commands = ('search', 'compactexports')
+
+    # The configuration options which the transport, response cache, request metrics, local replica, export manifest and
+    # JSON codec are set up from
+    RESOURCE_SETTINGS = (CFG_SERVER, CFG_PORT, CFG_POOL_SIZE, CFG_CACHE_TTL, CFG_CACHE_SIZE, CFG_TOKEN_MARGIN,
+                         CFG_CONNECT_TIMEOUT, CFG_READ_TIMEOUT, CFG_RETRIES, CFG_BREAKER_THRESHOLD,
+                         CFG_BREAKER_COOLDOWN, CFG_METRICS_RETENTION, CFG_JSON_CODEC)
+
+    def __init__(self, args=None, started_at=None):
+        """ Sets up the application, and runs the command line in args (sys.argv) if supplied. The `cc daemon` creates
+        the application once without args, and then calls run() for each command it serves. If the time the process
+        started at is given, `--trace` includes the time spent importing the CLI. """
+
+        self.started_at = started_at
+
+        self.config_manager = ConfigManager(app_path('.ccconfig'))
+        self.daemon_socket_path = app_path(SOCKET_NAME)
+        self.settings = self._current_settings()
+        self._use_configured_codec()
+
+        self._transport = None
+        self._response_cache = None
+        self._replica = None
+        self._export_manifest = None
+        self._request_metrics = None
+        self._local = threading.local()
+        self.output_format = OUTPUT_TABLE
+
+        # The name of the command being run, which the requests it makes are recorded against
+        self.command_name = None
+
+        if args is not None:
+            # discard the first argument, which is the script name
+            self.run(args[1:])
+
+
+    @property
+    def transport(self):
+        """ The HTTP transport, which is only set up (and requests imported) once a command makes an API call. """
+        if self._transport is None:
+            with span('set up transport'):
+                from Transport import Transport
+                self._transport = Transport(self.config_manager, self.request_metrics)
+        return self._transport
+
+
+    @property
+    def output_format(self):
+        """ The format listings are written in. A `cc batch` line may give its own, for the thread running it. """
+        return getattr(self._local, 'output_format', None) or self._output_format
+
+
+    @output_format.setter
+    def output_format(self, output_format):
+        self._output_format = output_format
+
+
+    @contextmanager
+    def formatted_as(self, output_format):
+        """ Writes the listings of the commands run on the current thread in `output_format`, for as long as the
+        block runs. """
+
+        previous = getattr(self._local, 'output_format', None)
+        self._local.output_format = output_format
+        try:
+            yield
+        finally:
+            self._local.output_format = previous
+
+
+    @property
+    def response_cache(self):
+        if self._response_cache is None:
+            from ResponseCache import ResponseCache
+            self._response_cache = ResponseCache(self.config_manager, app_path('.cccache'))
+        return self._response_cache
+
+
+    @property
+    def request_metrics(self):
+        if self._request_metrics is None:
+            from RequestMetrics import RequestMetrics
+            self._request_metrics = RequestMetrics(self.config_manager, app_path('.ccmetrics'))
+            self._request_metrics.command = self.command_name
+        return self._request_metrics
+
+
+    @property
+    def replica(self):
+        if self._replica is None:
+            from Replica import Replica
+            self._replica = Replica(self.config_manager, app_path('.ccreplica'))
+        return self._replica
+
+
+    @property
+    def export_manifest(self):
+        if self._export_manifest is None:
+            from ExportManifest import ExportManifest
+            self._export_manifest = ExportManifest(self.config_manager, app_path('.ccexports'))
+        return self._export_manifest
+
+
+    def _current_settings(self):
+        config = self.config_manager.load_config()
+        return [config.get(key) for key in self.RESOURCE_SETTINGS]
+
+
+    def _use_configured_codec(self):
+        use_codec(self.config_manager.load_config().get(CFG_JSON_CODEC, CODEC_AUTO))
+
+
+    def reopen_if_settings_changed(self):
+        """ Sets the transport, response cache, request metrics, local replica, export manifest and JSON codec up again
+        if their configuration has changed since they were opened, for example by `cc config port`. Only matters to the
+        long-lived daemon. """
+
+        if self._current_settings() != self.settings:
+            if self._transport is not None:
+                self._transport.close()
+            self.settings = self._current_settings()
+            self._transport = None
+            self._response_cache = None
+            self._request_metrics = None
+            self._replica = None
+            self._export_manifest = None
+            self._use_configured_codec()
+
+
+    def run(self, args):
+        """ Runs a single command line, without the script name. Returns the command object, or None if the command
+        couldn't be run. """
+
+        self.args = list(args)
+
+        try:
+            self.output_format, trace, trace_file = pop_global_options(self.args)
+        except CommandValidationError as error:
+            print('\n{}'.format(error))
+            return None
+
+        # Only the first command a process runs has had to wait for the CLI to be imported
+        started_at, self.started_at = self.started_at, None
+
+        # A command run by a traced `cc shell` or `cc batch` is already part of its trace
+        if not trace or tracing():
+            return self._run_command()
+
+        with traced(' '.join(['cc'] + list(args)), trace_file, started_at):
+            return self._run_command()
+
+
+    def _run_command(self):
+        """ Runs the command line in self.args. Returns the command object, or None if the command couldn't be run. """
+
+        # If no arguments are provided, just echo the current configuration and exit the script
+        if len(self.args) == 0:
+            self.config_manager.echo_config()
+            sys.exit(0)
+
+        user_command = self.args.pop(0)
+        if user_command not in self.commands:
+            print('\n`{}` is not a valid cloudCache command.'.format(user_command))
+            return None
+            # TODO display help
+
+        self.command = self.load_command(user_command)
+
+        self.command_name = user_command
+        if self._request_metrics is not None:
+            self._request_metrics.command = user_command
+
+        try:
+            self._ensure_credentials(user_command)
+
+            # Execute command now
+            with span('run command', command=user_command):
+                return self.action()
+
+        finally:
+            # The requests the command made, including any to get credentials, are written out together
+            if self._request_metrics is not None:
+                with span('record request metrics'):
+                    self._request_metrics.flush()
+
+
+    def _ensure_credentials(self, user_command):
+        """ Before executing any command other than config, newuser, daemon or stats, ensure a user is configured,
+        ensure we have a valid API key, and also an access token so we can be making API calls. """
+
+        if user_command in self.commands_without_ensure_steps:
+            return
+
+        with span('ensure user'):
+            self.config_manager.ensure_user()
+
+        # Reading from the local replica works offline, so doesn't need an API key or access token
+        if '--local' not in self.args and user_command not in self.offline_commands:
+            with span('ensure api key'):
+                self.config_manager.ensure_api_key(self.transport)
+            with span('ensure access token'):
+                self.config_manager.ensure_access_token(self.transport)
+
+
+    def load_command(self, name):
+        """ Imports the named command's class. """
+        package, _, class_name = self.commands[name].rpartition('.')
+        with span('import command', command=name):
+            return getattr(importlib.import_module(package), class_name)
+
+
+    def action(self):
+        """ Perform the selected command action. Returns the command object, or None if it failed to run. """
+        try:
+            return self.command(self.args, self)
+
+        except _connection_errors() as error:
+            msg  = '\nUnable to connect to the cloudCache server: {}'.format(error)
+            msg += '\nEnsure your server host and port configuration is correct, and that the server is running.'
+            print(msg)
+
+        except CommandValidationError as error:
+            print('\n{}'.format(error))
+
+# -------------------------------------------------------------------------------------------------
+
+def _connection_errors():
+    """ The exceptions raised when the server can't be reached, or doesn't respond in time. If no command has imported
+    requests, then no command can have tried to reach it, so there's nothing to catch. """
+
+    exceptions = sys.modules.get('requests.exceptions')
+    return (exceptions.ConnectionError, exceptions.Timeout) if exceptions is not None else ()
+
+
+def app_path(name):
+    """ The path of a file which lives alongside the application, such as the config file. """
+    return join(dirname(realpath(__file__)), name)
@@ -1,7 +1,9 @@
 """ The base command class which all other commands subclass. """
 
-import json
-from cloudCacheCLI import CFG_SERVER, CFG_PORT, CFG_ACCESS_TOKEN
+from cloudCacheCLI import CFG_SERVER, CFG_PORT, CFG_USER
+from cloudCacheCLI.Tracer import span
+from cloudCacheCLI.Utilities.JsonCodec import loads
+from cloudCacheCLI.Utilities.TableWriter import OUTPUT_TABLE, write_rows, paged_output
 
 # -------------------------------------------------------------------------------------------------
 
@@ -16,22 +18,43 @@ class BaseCommand(object):
         self._validate_and_parse_args()
 
         config = self.app.config_manager.load_config()
-
-        if CFG_ACCESS_TOKEN in config:
-            self.headers = {'access-token': config[CFG_ACCESS_TOKEN]}
-
         self.base_url = 'http://{}:{}'.format(config[CFG_SERVER], config[CFG_PORT])
+        self.user = config.get(CFG_USER)
 
 
     def action(self):
         """ Evaluates this Command by performing its API call. The response object itself, and the json/dict contents
-        of the response, are set as instance attributes so we can reference them later. """
-        self.results = json.loads(self.response.text)
+        of the response, are set as instance attributes so we can reference them later. The response is decoded
+        straight from its bytes, exactly once, by whichever subclass's action() calls this. """
+        with span('decode response'):
+            self.results = loads(self.response.content)
 
         # requests.response with a status_code of 200 evaluates as 'True' if checked as a bool
         self._on_action_success() if self.response else self._on_action_failure()
 
 
+    def _invalidate_cached_responses(self):
+        """ Drops any cached GET responses which this command's changes to self.url may have made stale. """
+        self.app.response_cache.invalidate(self.url)
+
+
+    @property
+    def _table_output(self):
+        """ Whether listings are being written as a table for people to read, rather than for a script. """
+        return self.app.output_format == OUTPUT_TABLE
+
+
+    def _write_rows(self, columns, rows, indent=2, heading=''):
+        """ Writes a listing in the format chosen with `--output`, as the rows are produced. A table too tall for the
+        terminal is shown through the pager, along with any heading above it. See TableWriter.write_rows for the
+        columns and rows. """
+
+        with span('render'), paged_output(enabled=self._table_output) as stream:
+            if self._table_output:
+                stream.write('\n' + heading)
+            write_rows(columns, rows, self.app.output_format, indent, stream)
+
+
     def _on_action_failure(self):
         """ May be overridden. Defaults to just printing out the error message returned by the response. """
         print('')
@@ -0,0 +1,207 @@
+""" The base command class for a command which deletes many items at once. """
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
+
+from requests.exceptions import RequestException
+
+from . import BaseCommand
+from .. import CommandValidationError, pop_flag, pop_option, pop_positive_int_option
+from cloudCacheCLI.Utilities import get_table
+from cloudCacheCLI.Utilities.JsonCodec import loads
+
+# The number of DELETEs sent concurrently, if --workers isn't supplied
+DEFAULT_WORKERS = 8
+
+# -------------------------------------------------------------------------------------------------
+
+def parse_ids(tokens):
+    """ Parses IDs given individually, as comma-separated lists, and as inclusive ranges (ex: `3 7,9 12-20`) into a
+    list of IDs, in the order given, without duplicates. Raises CommandValidationError for anything else. """
+
+    ids = []
+    for token in tokens:
+        for part in token.split(','):
+            if not part:
+                continue
+
+            first, _, last = part.partition('-')
+            if not first.isdigit() or (last and not last.isdigit()):
+                raise CommandValidationError('`{}` is not an ID, or a range of IDs such as `12-20`.'.format(part))
+
+            first, last = int(first), int(last or first)
+            if last < first:
+                raise CommandValidationError('The range `{}` is backwards.'.format(part))
+
+            ids.extend(range(first, last + 1))
+
+    return list(dict.fromkeys(ids))
+
+
+class BulkDeleteCommand(BaseCommand):
+    """ The base command class for a command which deletes many items with a single confirmation. The items may be
+    given by ID (individually, as lists or as ranges), read from stdin with `-`, or selected by matching a pattern
+    against their names with `--match`. The DELETEs are sent concurrently by a bounded pool of worker threads.
+
+    Any subclass must set self.noun, self.listing_url and self.prompt, and implement usage, _listed_items() and
+    _item_url(), before calling action(). """
+
+    def __init__(self, args, parent_app):
+        super(BulkDeleteCommand, self).__init__(args, parent_app)
+
+
+    def _validate_and_parse_args(self):
+        """ Pops the `--workers N`, `--match PATTERN` and `--yes` options, and the subclass's own leading parameters,
+        then parses the remaining arguments as IDs. """
+
+        self.args = list(self.args)
+        self.workers = pop_positive_int_option(self.args, '--workers', DEFAULT_WORKERS)
+        self.pattern = pop_option(self.args, '--match')
+        self.confirmed = pop_flag(self.args, '--yes')
+
+        self._validate_and_parse_leading_args()
+
+        if not self.confirmed and not self._table_output:
+            message = 'Pass `--yes` along with `--output`, since asking to confirm would be mixed into the output.'
+            raise CommandValidationError(message)
+
+        if '-' in self.args:
+            if not self.confirmed:
+                message = 'Pass `--yes` when reading IDs from stdin, since there is then no way to ask to confirm.'
+                raise CommandValidationError(message)
+            self.args.remove('-')
+            self.args.extend(sys.stdin.read().split())
+
+        self.ids = parse_ids(self.args)
+
+        if not self.ids and self.pattern is None:
+            raise CommandValidationError(self.usage)
+
+
+    def action(self):
+        """ Lists the items which may be deleted, so that the targets can be shown by name, and IDs which don't exist
+        are caught before any DELETE is sent. Once the full set of targets has been confirmed, deletes them all, and
+        prints the result for each ID. """
+
+        self.response = self.app.transport.get(self.listing_url)
+        self.results = loads(self.response.content)
+        if not self.response:
+            self._on_action_failure()
+            return
+
+        items = self._listed_items(self.results)
+        targets = [item_id for item_id in self.ids if item_id in items]
+        missing = [item_id for item_id in self.ids if item_id not in items]
+
+        if self.pattern is not None:
+            targets.extend(item_id for item_id, name in items.items()
+                           if fnmatchcase(name, self.pattern) and item_id not in targets)
+
+        outcomes = {}
+        elapsed = None
+
+        if not targets:
+            if self._table_output:
+                print('\nThere are no {}s to delete.'.format(self.noun))
+        elif self._confirm(targets, items):
+            start = time.time()
+            outcomes = self._delete_all(targets)
+            elapsed = time.time() - start
+            self.app.response_cache.invalidate(self.listing_url)
+
+        for item_id in missing:
+            outcomes[item_id] = '{} {} does not exist.'.format(self.noun.capitalize(), item_id)
+
+        self.deleted = [item_id for item_id, message in outcomes.items() if message is None]
+        self.failed = {item_id: message for item_id, message in outcomes.items() if message is not None}
+
+        self._print_results(items, outcomes)
+        if elapsed is not None and self._table_output:
+            self._print_summary(len(targets), elapsed)
+
+
+    def _confirm(self, targets, items):
+        """ Shows every target, and asks once whether they should all be deleted, unless `--yes` was passed. Nothing is
+        shown with `--output`, which always comes with `--yes`. """
+
+        if not self._table_output:
+            return True
+
+        from distutils.util import strtobool
+
+        data = [[item_id, items[item_id]] for item_id in targets]
+        print('\nThe following {} {}s will be deleted:'.format(len(targets), self.noun))
+        print(get_table(data, headers=['ID', self.noun.capitalize()], indent=2))
+
+        if self.confirmed:
+            return True
+
+        prompt = '\n{}\nEnter `yes` or `no` (or `y` or `n`): '.format(self.prompt)
+        return bool(strtobool(input(prompt)))
+
+
+    def _delete_all(self, targets):
+        """ Deletes every target concurrently. Returns {ID: None if it was deleted, or else the error message}. """
+
+        self.app.transport.ensure_pool_size(self.workers + 1)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return dict(zip(targets, pool.map(self._delete, targets)))
+
+
+    def _delete(self, item_id):
+        """ Deletes a single item. Returns None if it was deleted, or else the error message. Runs on a worker
+        thread. """
+
+        try:
+            response = self.app.transport.delete(self._item_url(item_id))
+        except RequestException as error:
+            return str(error) or error.__class__.__name__
+
+        if response:
+            return None
+
+        try:
+            return loads(response.content).get('message', response.reason)
+        except ValueError:
+            return response.reason
+
+
+    def _print_results(self, items, outcomes):
+        """ Lists what happened to each ID which was asked for, or matched, in the format chosen with `--output`. """
+
+        if not outcomes and self._table_output:
+            return
+
+        columns = [('id', 'ID'), ('name', self.noun.capitalize()), ('result', 'Result')]
+        rows = [{'id': item_id, 'name': items.get(item_id, ''), 'result': 'Deleted' if message is None else message}
+                for item_id, message in outcomes.items()]
+        self._write_rows(columns, rows)
+
+
+    def _print_summary(self, target_count, elapsed):
+        msg = '\nDeleted {} of {} {}s in {:.2f} seconds ({} workers).'
+        print(msg.format(len(self.deleted), target_count, self.noun, elapsed, self.workers))
+
+
+    @property
+    def usage(self):
+        """ Any subclasses must implement this property. The validation message for a command line without targets. """
+        raise NotImplementedError()
+
+
+    def _validate_and_parse_leading_args(self):
+        """ May be overridden. Validates and pops any parameters which come before the IDs from self.args. """
+        pass
+
+
+    def _listed_items(self, results):
+        """ Any subclasses must implement this method. Returns {ID: name} for every item in the listing. """
+        raise NotImplementedError()
+
+
+    def _item_url(self, item_id):
+        """ Any subclasses must implement this method. Returns the URL which deletes the item with the given ID. """
+        raise NotImplementedError()
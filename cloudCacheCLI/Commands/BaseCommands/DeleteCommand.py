@@ -1,9 +1,6 @@
 """ The base command class which all other commands subclass. """
 
-import requests
-
 from . import BaseCommand
-from distutils.util import strtobool
 
 # -------------------------------------------------------------------------------------------------
 
@@ -19,11 +16,14 @@ class DeleteCommand(BaseCommand):
         """ Evaluates this Command by performing its API call. The response object itself, and the json/dict contents
         of the response, are set as instance attributes so we can reference them later. """
 
+        from distutils.util import strtobool
+
         prompt = '\n{}\nEnter `yes` or `no` (or `y` or `n`): '.format(self.prompt)
         user_confirmation = bool(strtobool(input(prompt)))
 
         if user_confirmation:
-            self.response = requests.delete(self.url, headers=self.headers)
+            self.response = self.app.transport.delete(self.url)
+            self._invalidate_cached_responses()
             super(DeleteCommand, self).action()
 
 
@@ -1,20 +1,77 @@
 """ The base command class which all other commands subclass. """
 
-import requests
 from . import BaseCommand
+from .. import CommandValidationError, pop_flag
 
 # -------------------------------------------------------------------------------------------------
 
 class GetCommand(BaseCommand):
     """ The base command class for a command which makes an HTTP GET call. """
 
+    # Whether this command's responses may be served from, and stored in, the response cache
+    cacheable = True
+
     def __init__(self, args, parent_app):
-        """ Any subclass must create a self.url attribute so the action() call may evaluate successfully. """
+        """ Any subclass must create a self.url attribute so the action() call may evaluate successfully. If the
+        `--local` flag is passed, the results are read from the local replica instead, by _local_results(). """
+        args = list(args)
+        self.local = pop_flag(args, '--local')
         super(GetCommand, self).__init__(args, parent_app)
 
 
     def action(self):
         """ Evaluates this Command by performing its API call. The response object itself, and the json/dict contents
         of the response, are set as instance attributes so we can reference them later. """
-        self.response = requests.get(self.url, headers=self.headers)
-        super(GetCommand, self).action()
\ No newline at end of file
+
+        if self.local:
+            self._local_action()
+            return
+
+        self.response = self._cached_get() if self.cacheable else self.app.transport.get(self.url)
+        super(GetCommand, self).action()
+
+
+    def _local_action(self):
+        """ Evaluates this Command against the local replica, rather than the server. """
+
+        if self.app.replica.last_synced(self.user) is None:
+            message = 'There is no local replica for `{}` yet. Run `cc sync` first.'.format(self.user)
+            raise CommandValidationError(message)
+
+        self.results = self._local_results()
+        if self.results is None:
+            print('\nNot found in the local replica. Run `cc sync` to refresh it.')
+        else:
+            self._on_action_success()
+
+
+    def _local_results(self):
+        """ May be overridden. Returns this Command's results from the local replica, shaped like the server's
+        response, or None if they aren't in it. """
+        raise CommandValidationError('This command can not be run against the local replica.')
+
+
+    def _cached_get(self, url=None):
+        """ Serves the GET of url (by default, self.url) from the response cache while the cached response is fresh.
+        Once it isn't, asks the server whether it has changed, and only downloads it again if it has. """
+
+        from cloudCacheCLI.ResponseCache import CachedResponse
+
+        url = url or self.url
+        cache = self.app.response_cache
+        entry = cache.get(self.user, url)
+
+        if entry is not None and entry.is_fresh(cache.ttl):
+            return CachedResponse(entry)
+
+        headers = entry.validation_headers() if entry is not None else None
+        response = self.app.transport.get(url, headers=headers)
+
+        if response.status_code == 304 and entry is not None:
+            cache.touch(self.user, url)
+            return CachedResponse(entry)
+
+        if response.status_code == 200:
+            cache.store(self.user, url, response)
+
+        return response
@@ -0,0 +1,125 @@
+""" The base command class for a command which lists a collection, a page at a time. """
+
+
+from . import GetCommand
+from .. import pop_positive_int_option
+from cloudCacheCLI.Utilities.JsonCodec import loads
+
+# The number of items requested per page, if --page-size isn't supplied
+DEFAULT_PAGE_SIZE = 100
+
+# -------------------------------------------------------------------------------------------------
+
+class ListCommand(GetCommand):
+    """ The base command class for a command which lists a collection. The collection is requested a page at a time,
+    with `limit` and `offset` query parameters, and each page is only requested once the rows of the one before it have
+    been written. Only the part of the collection selected with `--offset N` and `--limit N` is listed.
+
+    A server which doesn't support paging ignores the parameters, and returns the whole collection, in which case the
+    selected part of it is picked out here instead. A paged response is recognised by its `total` field:
+    {"<collection>": [...], "offset": 0, "limit": 100, "total": 1234}
+
+    Any subclass must set self.collection, the key of the collection's items in each response, and self.label_field,
+    the field which names each item. It may also set self.page_params, any other query parameters to send with each
+    page.
+
+    As the items are listed, the name of each is kept in self.listed ({id: name}), and self.complete is set once the
+    whole collection has been listed, rather than just part of it. """
+
+    collection  = None
+    label_field = None
+    page_params = {}
+
+    def __init__(self, args, parent_app):
+        args = list(args)
+        self.limit = pop_positive_int_option(args, '--limit', None)
+        self.offset = pop_positive_int_option(args, '--offset', 0, zero_allowed=True)
+        self.page_size = pop_positive_int_option(args, '--page-size', DEFAULT_PAGE_SIZE)
+        self.page_error = None
+        self.listed = {}
+        self.complete = False
+        super(ListCommand, self).__init__(args, parent_app)
+
+
+    def action(self):
+        """ OVERRIDE - Requests just the first page. The rest are requested by _iter_items(), as they're needed. """
+
+        if self.local:
+            self._local_action()
+            return
+
+        self.response = self._get_page(self.offset, self._page_limit(self.limit))
+        super(GetCommand, self).action()
+
+
+    def _get_page(self, offset, limit):
+        """ Requests the page of `limit` items starting at `offset`. """
+
+        params = dict(self.page_params, limit=limit, offset=offset)
+        url = '{}?{}'.format(self.url, '&'.join('{}={}'.format(*param) for param in sorted(params.items())))
+        return self._cached_get(url) if self.cacheable else self.app.transport.get(url)
+
+
+    def _page_limit(self, remaining):
+        return self.page_size if remaining is None else min(self.page_size, remaining)
+
+
+    def _collection_empty(self):
+        """ Whether the whole collection is empty, rather than just the part of it selected. """
+        return self.results.get('total', len(self.results[self.collection])) == 0
+
+
+    def _iter_items(self):
+        """ Yields each item of the selected part of the collection, recording the ones listed. """
+
+        for item in self._iter_selected_items():
+            self.listed[item['id']] = item[self.label_field]
+            yield item
+
+        self.complete = self.offset == 0 and self.limit is None and self.page_error is None
+
+
+    def _iter_selected_items(self):
+        """ Yields each item of the selected part of the collection, starting with the first page's, and requesting
+        each following page once the one before it has been used up. If a page can't be fetched, the listing stops
+        there, and the server's message is kept in self.page_error. """
+
+        results = self.results
+
+        if 'total' not in results:
+            # The whole collection, either from a server without paging or the local replica
+            items = results[self.collection][self.offset:]
+            for item in (items if self.limit is None else items[:self.limit]):
+                yield item
+            return
+
+        offset, remaining = self.offset, self.limit
+
+        while True:
+            items = results[self.collection]
+            if remaining is not None:
+                items = items[:remaining]
+                remaining -= len(items)
+
+            for item in items:
+                yield item
+
+            offset += len(items)
+            if not items or remaining == 0 or offset >= results['total']:
+                return
+
+            response = self._get_page(offset, self._page_limit(remaining))
+            results = loads(response.content)
+            if not response:
+                self.page_error = results.get('message', response.reason)
+                return
+
+
+    def _write_listing(self, columns, indent=2, heading=''):
+        """ Writes the selected items with _write_rows(), followed by the reason the listing stopped early, if it
+        did. """
+
+        self._write_rows(columns, self._iter_items(), indent, heading)
+
+        if self.page_error is not None:
+            print('\nThe listing stopped early: {}'.format(self.page_error))
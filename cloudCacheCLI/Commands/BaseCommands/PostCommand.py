@@ -1,8 +1,5 @@
 """ The base command class which all other commands subclass. """
 
-import json
-import requests
-
 from . import BaseCommand
 
 # -------------------------------------------------------------------------------------------------
@@ -20,12 +17,8 @@ class PostCommand(BaseCommand):
         """ Evaluates this Command by performing its API call. The response object itself, and the json/dict contents
         of the response, are set as instance attributes so we can reference them later. """
 
-        kwargs = {'data': json.dumps(self.body)}
-        if hasattr(self, 'headers'):
-            kwargs['headers'] = self.headers
-
-        self.response = requests.post(self.url, **kwargs)
-        self.results  = json.loads(self.response.text)
+        self.response = self.app.transport.post(self.url, self.body)
+        self._invalidate_cached_responses()
         super(PostCommand, self).action()
 
 
@@ -2,4 +2,9 @@ from .BaseCommand import BaseCommand
 from .DeleteCommand import DeleteCommand
 from .PostCommand import PostCommand
 from .GetCommand import GetCommand
-from .PutCommand import PutCommand
\ No newline at end of file
+from .ListCommand import ListCommand
+from .PutCommand import PutCommand
+from .. import lazy_exports
+
+# Only imported when a bulk command runs, since it brings in the thread pool
+__getattr__ = lazy_exports(globals(), ('BulkDeleteCommand',))
@@ -0,0 +1,210 @@
+""" Run many commands, one per line of a file (or stdin), in a single process. """
+
+import io
+import json
+import shlex
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+
+from requests.exceptions import RequestException
+
+from . import CommandValidationError, pop_flag, pop_global_options, pop_positive_int_option
+from cloudCacheCLI.Tracer import traced, tracing
+
+# The number of lines run concurrently, if --workers isn't supplied
+DEFAULT_WORKERS = 1
+
+# Commands which can't be run from a batch, since they take over the process or prompt for a password
+UNBATCHABLE_COMMANDS = ('batch', 'daemon', 'shell', 'newuser', 'deleteuser')
+
+# --------------------------------------------------------------------------------------------------------------------
+
+class _ThreadLocalStream(io.TextIOBase):
+    """ Stands in for sys.stdout or sys.stdin while a batch runs. Each line's thread is given its own stream, so that
+    concurrently running commands each have their output captured separately. Threads without one use the original. """
+
+    def __init__(self, original):
+        self.original = original
+        self.local = threading.local()
+
+
+    def _stream(self):
+        return getattr(self.local, 'stream', None) or self.original
+
+
+    def writable(self):
+        return True
+
+
+    def readable(self):
+        return True
+
+
+    def write(self, text):
+        return self._stream().write(text)
+
+
+    def readline(self, size=-1):
+        return self._stream().readline(size)
+
+
+    def flush(self):
+        self._stream().flush()
+
+
+class BatchCommand(object):
+
+    def __init__(self, args, parent_app):
+        self.args = args
+        self.app = parent_app
+        self._validate_and_parse_args()
+        self.action()
+
+
+    def _validate_and_parse_args(self):
+        """ Make sure exactly 1 argument, the input file (or `-` for stdin), is passed in, along with the optional
+        `--workers N` and `--yes` options. """
+
+        self.args = list(self.args)
+        self.workers = pop_positive_int_option(self.args, '--workers', DEFAULT_WORKERS)
+        self.confirm = pop_flag(self.args, '--yes')
+
+        if len(self.args) != 1:
+            message = 'The `batch` command takes exactly 1 parameter: the input file, or `-` to read from stdin.'
+            raise CommandValidationError(message)
+
+        self.input_file = self.args[0]
+
+
+    def action(self):
+        """ Runs each line of the input through the app's command table, sharing the app's config, access token and
+        pooled connection. A JSON status record is printed for each line as it finishes, followed by a summary record.
+        With more than 1 worker, lines run concurrently and may finish out of order, so they must be independent of
+        one another. Lines are read as they're needed, so the input may be arbitrarily long. """
+
+        self.lock = threading.Lock()
+        self.counts = {'ok': 0, 'failed': 0}
+
+        self.app.transport.ensure_pool_size(self.workers + 1)
+        queue_slots = threading.BoundedSemaphore(self.workers * 2)
+
+        stdout, stdin = sys.stdout, sys.stdin
+        input_context = nullcontext(stdin) if self.input_file == '-' else open(self.input_file)
+
+        sys.stdout, sys.stdin = _ThreadLocalStream(stdout), _ThreadLocalStream(stdin)
+        start = time.time()
+
+        try:
+            with input_context as input_file, ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for line_number, command_line in self._iter_command_lines(input_file):
+                    queue_slots.acquire()
+                    future = pool.submit(self._run_line, line_number, command_line)
+                    future.add_done_callback(lambda _: queue_slots.release())
+        finally:
+            sys.stdout, sys.stdin = stdout, stdin
+
+        elapsed = time.time() - start
+        self._emit({'summary': True, 'lines': sum(self.counts.values()), 'ok': self.counts['ok'],
+                    'failed': self.counts['failed'], 'seconds': round(elapsed, 3)})
+
+        if self.counts['failed']:
+            sys.exit(1)
+
+
+    def _iter_command_lines(self, input_file):
+        """ Yields the (line number, text) of each command in the input, skipping blank lines and `#` comments. """
+
+        for line_number, line in enumerate(input_file, 1):
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line_number, line
+
+
+    def _run_line(self, line_number, command_line):
+        """ Runs a single line's command, capturing its output, and prints its status record. Runs on a worker
+        thread. """
+
+        output = io.StringIO()
+        sys.stdout.local.stream = output
+        sys.stdin.local.stream = io.StringIO('yes\n' if self.confirm else '')
+
+        try:
+            error = self._dispatch(command_line)
+        finally:
+            sys.stdout.local.stream = None
+            sys.stdin.local.stream = None
+
+        record = {'line': line_number, 'command': command_line, 'status': 'ok' if error is None else 'failed',
+                  'output': output.getvalue().strip()}
+        if error is not None:
+            record['message'] = error
+
+        with self.lock:
+            self.counts[record['status']] += 1
+        self._emit(record)
+
+
+    def _dispatch(self, command_line):
+        """ Runs a command line through the app's command table, with the same global options (`--output`, `--trace`
+        and `--trace-file`) as the command line of `cc` itself. Returns None if it succeeded, or an error message. """
+
+        try:
+            args = shlex.split(command_line)
+            output_format, trace, trace_file = pop_global_options(args)
+        except ValueError as error:
+            return 'Unable to parse the line: {}'.format(error)
+        except CommandValidationError as error:
+            return str(error)
+
+        if not args:
+            return 'The line has no command.'
+
+        name, args = args[0], args[1:]
+        if name not in self.app.commands:
+            return '`{}` is not a valid cloudCache command.'.format(name)
+        if name in UNBATCHABLE_COMMANDS:
+            return 'The `{}` command can not be run from a batch.'.format(name)
+
+        # A traced batch already traces every line. Otherwise only one line can be traced at a time, since a trace
+        # records every thread's spans
+        trace = trace and not tracing()
+        if trace and self.workers > 1:
+            return 'A line can only be traced with `--workers 1`. Pass `--trace` to `batch` to trace every line.'
+
+        try:
+            with self.app.request_metrics.attributed_to(name), self.app.formatted_as(output_format):
+                if trace:
+                    with traced(command_line, trace_file):
+                        command = self.app.load_command(name)(args, self.app)
+                else:
+                    command = self.app.load_command(name)(args, self.app)
+
+        except CommandValidationError as error:
+            return str(error)
+        except EOFError:
+            return 'The command asked for confirmation. Pass `--yes` to `batch` to confirm every such prompt.'
+        except (RequestException, ValueError) as error:
+            return str(error) or error.__class__.__name__
+        except SystemExit:
+            return 'The command exited before it finished.'
+        except Exception as error:
+            # The line runs on a worker thread, whose future is never read, so anything else is reported here too
+            return '{}: {}'.format(error.__class__.__name__, error)
+
+        response = getattr(command, 'response', None)
+        if response is not None and not response:
+            results = getattr(command, 'results', None) or {}
+            return results.get('message', response.reason)
+
+        return None
+
+
+    def _emit(self, record):
+        """ Prints a status record as a single line of JSON, straight to the real stdout. """
+        with self.lock:
+            stream = sys.stdout.original if isinstance(sys.stdout, _ThreadLocalStream) else sys.stdout
+            stream.write(json.dumps(record) + '\n')
+            stream.flush()
@@ -2,7 +2,23 @@
 
 from . import CommandValidationError
 from .BaseCommands import BaseCommand
-from cloudCacheCLI import CFG_SERVER, CFG_PORT, CFG_USER, CFG_API_KEY, CFG_ACCESS_TOKEN, CFG_TOKEN_EXPIRES
+from cloudCacheCLI import CFG_SERVER, CFG_PORT, CFG_USER, CFG_API_KEY, CFG_ACCESS_TOKEN, CFG_TOKEN_EXPIRES,\
+    CFG_POOL_SIZE, CFG_CACHE_TTL, CFG_CACHE_SIZE, CFG_TOKEN_MARGIN, CFG_CONNECT_TIMEOUT, CFG_READ_TIMEOUT, CFG_RETRIES,\
+    CFG_BREAKER_THRESHOLD, CFG_BREAKER_COOLDOWN, CFG_METRICS_RETENTION, CFG_JSON_CODEC
+from cloudCacheCLI.Utilities.JsonCodec import CODECS, codec_available
+
+# The configuration options which may be set with the config command
+CONFIGURABLE_OPTIONS = (CFG_USER, CFG_SERVER, CFG_PORT, CFG_POOL_SIZE, CFG_CACHE_TTL, CFG_CACHE_SIZE, CFG_TOKEN_MARGIN,
+                        CFG_CONNECT_TIMEOUT, CFG_READ_TIMEOUT, CFG_RETRIES, CFG_BREAKER_THRESHOLD, CFG_BREAKER_COOLDOWN,
+                        CFG_METRICS_RETENTION, CFG_JSON_CODEC)
+
+# The configuration options which must be whole numbers, and whether zero is allowed for each
+NUMERIC_OPTIONS = {CFG_POOL_SIZE: False, CFG_CACHE_TTL: True, CFG_CACHE_SIZE: True, CFG_TOKEN_MARGIN: True,
+                   CFG_CONNECT_TIMEOUT: False, CFG_READ_TIMEOUT: False, CFG_RETRIES: True, CFG_BREAKER_THRESHOLD: True,
+                   CFG_BREAKER_COOLDOWN: False, CFG_METRICS_RETENTION: True}
+
+# The configuration options which must be one of a list of choices
+CHOICE_OPTIONS = {CFG_JSON_CODEC: CODECS}
 
 # --------------------------------------------------------------------------------------------------------------------
 
@@ -19,23 +35,36 @@ class ConfigAppCommand(BaseCommand):
 
         if len(self.args) != 2:
             msg  = 'The config command takes exactly 2 parameters.\n'
-            msg += 'The first argument must be one of [server, port, user].\n'
+            msg += 'The first argument must be one of [{}].\n'.format(', '.join(CONFIGURABLE_OPTIONS))
             msg += 'The second argument must be the value that configuration option is to take.'
             raise CommandValidationError(msg)
 
         self.key, self.val = self.args[0], self.args[1]
 
-        if self.key not in (CFG_USER, CFG_SERVER, CFG_PORT):
+        if self.key not in CONFIGURABLE_OPTIONS:
             msg  = 'The configuration option `{}` is not valid.\n'.format(self.key)
-            msg += 'You may only configure `{}`, `{}`, or `{}`.'.format(CFG_USER, CFG_PORT, CFG_SERVER)
+            msg += 'You may only configure {}.'.format(', '.join('`{}`'.format(key) for key in CONFIGURABLE_OPTIONS))
             raise CommandValidationError(msg)
 
+        if self.key in NUMERIC_OPTIONS:
+            zero_allowed = NUMERIC_OPTIONS[self.key]
+            if not self.val.isdigit() or (int(self.val) == 0 and not zero_allowed):
+                kind = 'non-negative' if zero_allowed else 'positive'
+                raise CommandValidationError('The `{}` option must be a {} whole number.'.format(self.key, kind))
+
+        if self.key in CHOICE_OPTIONS:
+            choices = CHOICE_OPTIONS[self.key]
+            if self.val not in choices:
+                msg = 'The `{}` option must be one of {}.'.format(self.key, ', '.join(choices))
+                raise CommandValidationError(msg)
+
+        if self.key == CFG_JSON_CODEC and not codec_available(self.val):
+            raise CommandValidationError('The `{}` JSON codec is not installed.'.format(self.val))
+
 
     def _change_port_or_server(self):
         """ Change port or server in the configuration file. """
-        config = self.app.config_manager.load_config()
-        config[self.key] = self.val
-        self.app.config_manager.save_config(config)
+        self.app.config_manager.update_config({self.key: self.val})
 
 
     def _change_user(self):
@@ -58,8 +87,8 @@ class ConfigAppCommand(BaseCommand):
         try:
             self.app.config_manager.save_config(config_copy)
             self.app.config_manager.ensure_user()
-            self.app.config_manager.ensure_api_key()
-            self.app.config_manager.ensure_access_token()
+            self.app.config_manager.ensure_api_key(self.app.transport)
+            self.app.config_manager.ensure_access_token(self.app.transport)
 
         except Exception:
             print('\nUser change failed. Reverting back to original settings.')
@@ -0,0 +1,41 @@
+""" Run, or stop, the long-lived cloudCache daemon which `cc` hands its commands to. """
+
+from . import CommandValidationError
+from cloudCacheCLI.Daemon import CommandDaemon, STOP_ARGV, daemon_available, forward_to_daemon
+
+# --------------------------------------------------------------------------------------------------------------------
+
+class DaemonCommand(object):
+
+    def __init__(self, args, parent_app):
+        self.args = args
+        self.app = parent_app
+        self._validate_and_parse_args()
+        self.action()
+
+
+    def _validate_and_parse_args(self):
+        """ Make sure either no arguments, or just `stop`, were passed in. """
+
+        if self.args not in ([], ['stop']):
+            raise CommandValidationError('The `daemon` command takes either no parameters, or `stop`.')
+
+        if not daemon_available():
+            raise CommandValidationError('The daemon needs Unix domain sockets, which this platform does not support.')
+
+        self.stop = self.args == ['stop']
+
+
+    def action(self):
+        """ Serves commands in the foreground until stopped, or asks the running daemon to stop. When the daemon is
+        running, `cc daemon stop` is handled by the daemon itself, so getting here means there's nothing to stop. """
+
+        if self.stop:
+            if forward_to_daemon(self.app.daemon_socket_path, STOP_ARGV) is None:
+                print('\nThe cloudCache daemon is not running.')
+            return
+
+        try:
+            CommandDaemon(self.app, self.app.daemon_socket_path).serve_forever()
+        except RuntimeError as error:
+            raise CommandValidationError(str(error))
@@ -0,0 +1,82 @@
+""" Show what `importnotebooks --sync` would change on the server for an export file, without changing anything. """
+
+from contextlib import closing
+
+from . import CommandValidationError, pop_option
+from .BaseCommands import GetCommand
+from cloudCacheCLI.Utilities.ExportReader import FORMATS, iter_notebooks, iter_response_notebooks, guess_format
+from cloudCacheCLI.Utilities.ImportPlan import ImportPlan
+from cloudCacheCLI.Utilities.JsonCodec import loads
+
+# --------------------------------------------------------------------------------------------------------------------
+
+class DiffCommand(GetCommand):
+
+    # The plan needs the server's current state, and streams it rather than decoding it all at once
+    cacheable = False
+
+    def __init__(self, args, parent_app):
+        super(DiffCommand, self).__init__(args, parent_app)
+        self.url = '{}/notebooks'.format(self.base_url)
+        self.plan = None
+        self.action()
+
+
+    def _validate_and_parse_args(self):
+        """ Make sure exactly 1 argument, the export file, is passed in, along with an optional `--format`. """
+
+        self.args = list(self.args)
+        self.format = pop_option(self.args, '--format')
+
+        if len(self.args) != 1:
+            raise CommandValidationError('The `diff` command takes exactly 1 parameter: the export file')
+
+        self.input_file = self.args[0]
+        self.format = self.format or guess_format(self.input_file)
+
+        if self.format not in FORMATS:
+            raise CommandValidationError('The `--format` option must be one of {}.'.format(', '.join(FORMATS)))
+
+
+    def action(self):
+        """ OVERRIDE - Streams the server's notebooks and notes, then the export file, into the plan. Only a digest of
+        each note is kept, so memory use doesn't grow with the size of the notes. """
+
+        self.response = self.app.transport.get(self.url, stream=True)
+
+        with closing(self.response):
+            if not self.response:
+                self.results = loads(self.response.content)
+                self._on_action_failure()
+                return
+
+            plan = ImportPlan()
+            plan.read_server(iter_response_notebooks(self.response))
+
+        try:
+            with open(self.input_file) as input_file:
+                plan.read_file(iter_notebooks(input_file, self.format))
+        except (OSError, ValueError) as error:
+            raise CommandValidationError('Unable to read `{}`: {}'.format(self.input_file, error))
+
+        self.plan = plan
+        self._on_action_success()
+
+
+    def _on_action_success(self):
+        """ Lists what would happen to each notebook of the file, followed by the totals. """
+
+        columns = [('notebook', 'Notebook'), ('action', 'Action'), ('created', 'Notes created'),
+                   ('replaced', 'Notes replaced'), ('unchanged', 'Notes unchanged')]
+        rows = ({'notebook': notebook.name, 'action': notebook.action,
+                 'created': len(notebook.creates) - len(notebook.replaces), 'replaced': len(notebook.replaces),
+                 'unchanged': notebook.unchanged}
+                for notebook in self.plan.notebooks.values())
+
+        self._write_rows(columns, rows)
+
+        if self._table_output:
+            totals = self.plan.totals
+            msg  = '\n{} notebooks and {} notes to create, {} notes to replace, and {} notes already on the server.'
+            print(msg.format(totals['notebooks created'], totals['notes created'], totals['notes replaced'],
+                             totals['notes unchanged']))
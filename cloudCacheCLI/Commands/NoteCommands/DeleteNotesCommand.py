@@ -0,0 +1,44 @@
+""" Delete many notes from the specified notebook at once. """
+
+from .. import CommandValidationError
+from ..BaseCommands import BulkDeleteCommand
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+class DeleteNotesCommand(BulkDeleteCommand):
+
+    noun = 'note'
+
+    def __init__(self, args, parent_app):
+        super(DeleteNotesCommand, self).__init__(args, parent_app)
+        self.listing_url = '{}/notebooks/{}/notes'.format(self.base_url, self.notebook_id)
+        self.prompt = 'Are you sure you want to delete these notes? This action is irreversible.'
+        self.action()
+
+
+    @property
+    def usage(self):
+        msg  = 'The `deletenotes` command takes the notebook ID, followed by the note IDs to delete (ex: `3 7,9 12-20`,'
+        msg += ' or `-` to read them from stdin) and/or `--match PATTERN` to delete the notes whose keys match the '
+        msg += 'pattern (ex: `tmp-*`). Pass `--yes` to skip the confirmation, and `--workers N` to set how many '
+        msg += 'notes are deleted at once.'
+        return msg
+
+
+    def _validate_and_parse_leading_args(self):
+        """ OVERRIDE - The first parameter is the notebook ID. """
+
+        if not self.args:
+            raise CommandValidationError(self.usage)
+
+        self.notebook_id = self.args.pop(0)
+
+
+    def _listed_items(self, results):
+        """ OVERRIDE - The notebook's notes, by key. """
+        return {note['id']: note['key'] for note in results['notes']}
+
+
+    def _item_url(self, item_id):
+        """ OVERRIDE """
+        return '{}/{}'.format(self.listing_url, item_id)
@@ -0,0 +1,163 @@
+""" Create many notes in a notebook at once, streamed from a CSV, TSV or NDJSON file (or stdin). """
+
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+
+from requests.exceptions import RequestException
+
+from .. import CommandValidationError, pop_option, pop_positive_int_option
+from . import NewNoteCommand
+from cloudCacheCLI.Utilities.NoteReader import FORMATS, iter_notes, guess_format
+from cloudCacheCLI.Utilities.TableWriter import OUTPUT_TABLE, write_rows
+
+# The number of notes uploaded concurrently, if --workers isn't supplied
+DEFAULT_WORKERS = 4
+
+# How often (seconds) progress is reported while notes are uploading
+PROGRESS_INTERVAL = 2
+
+# The most failures listed at the end. Any beyond these are only counted, so memory use doesn't grow with the input
+MAX_LISTED_FAILURES = 100
+
+# --------------------------------------------------------------------------------------------------------------------
+
+class _BulkNoteCommand(NewNoteCommand):
+    """ A NewNoteCommand whose failures are collected by `newnotes`, rather than printed inline. """
+
+    def _on_action_failure(self):
+        pass
+
+# --------------------------------------------------------------------------------------------------------------------
+
+class NewNotesCommand(object):
+
+    def __init__(self, args, parent_app):
+        self.args = args
+        self.parent_app = parent_app
+        self._validate_and_parse_args()
+        self.action()
+
+
+    def _validate_and_parse_args(self):
+        """ Make sure exactly 2 arguments, the notebook ID and the input file (or `-` for stdin), are passed in, along
+        with optional `--workers N` and `--format` options. An input file must exist, and be readable. """
+
+        self.args = list(self.args)
+        self.workers = pop_positive_int_option(self.args, '--workers', DEFAULT_WORKERS)
+        self.format = pop_option(self.args, '--format')
+
+        if len(self.args) != 2:
+            msg = 'The `newnotes` command takes exactly 2 parameters: the notebook ID, and the input file (or `-` to '
+            msg += 'read from stdin) of key/value records.'
+            raise CommandValidationError(msg)
+
+        self.notebook_id, self.input_file = self.args
+        self.format = self.format or guess_format(self.input_file)
+
+        if self.format not in FORMATS:
+            raise CommandValidationError('The `--format` option must be one of {}.'.format(', '.join(FORMATS)))
+
+        if self.input_file != '-':
+            if not os.path.isfile(self.input_file):
+                raise CommandValidationError('The input file `{}` does not exist.'.format(self.input_file))
+            if not os.access(self.input_file, os.R_OK):
+                raise CommandValidationError('The input file `{}` can not be read.'.format(self.input_file))
+
+
+    def action(self):
+        """ Streams the input one record at a time, handing each note off to a bounded pool of worker threads, which
+        share the app's pooled connection. At most 2 notes per worker are queued at once, so memory use doesn't grow
+        with the input. Progress is reported every few seconds, and a summary once the input is exhausted.
+
+        With `--output`, only the failures are written to stdout, in the chosen format, and the progress and summary
+        go to stderr instead. """
+
+        self.table_output = self.parent_app.output_format == OUTPUT_TABLE
+        self.report = sys.stdout if self.table_output else sys.stderr
+
+        self.lock = threading.Lock()
+        self.failures = []
+        self.failure_count = 0
+        self.notes_created = 0
+
+        self.parent_app.transport.ensure_pool_size(self.workers + 1)
+        queue_slots = threading.BoundedSemaphore(self.workers * 2)
+
+        input_context = nullcontext(sys.stdin) if self.input_file == '-' else open(self.input_file, newline='')
+        self.start = self.last_progress = time.time()
+
+        try:
+            with input_context as input_file, ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for line_number, key, value in iter_notes(input_file, self.format):
+                    queue_slots.acquire()
+                    future = pool.submit(self._create_note, line_number, key, value)
+                    future.add_done_callback(lambda _: queue_slots.release())
+
+        except ValueError as error:
+            # The notes read before the bad record have still been created, so report them too
+            print('\n{}'.format(error), file=self.report)
+
+        self._print_summary(time.time() - self.start)
+
+
+    def _create_note(self, line_number, key, value):
+        """ Creates a single note. Runs on a worker thread, so anything it raises is recorded as a failure of that note,
+        rather than left unseen in its future. """
+
+        try:
+            command = _BulkNoteCommand([self.notebook_id, key, value], self.parent_app)
+            error = None if command.response else command.results.get('message', command.response.reason)
+        except (RequestException, ValueError) as exception:
+            error = str(exception) or exception.__class__.__name__
+        except Exception as unexpected:
+            error = '{}: {}'.format(unexpected.__class__.__name__, unexpected)
+
+        with self.lock:
+            if error is None:
+                self.notes_created += 1
+            else:
+                self.failure_count += 1
+                if len(self.failures) < MAX_LISTED_FAILURES:
+                    self.failures.append([line_number, key, error])
+
+            self._report_progress()
+
+
+    def _report_progress(self):
+        """ Prints the running totals, if it has been long enough since they were last printed. Called with the lock
+        held. """
+
+        now = time.time()
+        if now - self.last_progress < PROGRESS_INTERVAL:
+            return
+
+        self.last_progress = now
+        rate = self.notes_created / (now - self.start)
+        msg = '  {} notes created, {} failed ({:.1f} notes/second)'
+        print(msg.format(self.notes_created, self.failure_count, rate), file=self.report)
+        self.report.flush()
+
+
+    def _print_summary(self, elapsed):
+        """ Prints the throughput, followed by a listing of any failures in the format chosen with `--output`. """
+
+        rate = self.notes_created / elapsed if elapsed else 0
+        msg  = '\nCreated {} notes in {:.2f} seconds '.format(self.notes_created, elapsed)
+        msg += '({:.1f} notes/second, {} workers).'.format(rate, self.workers)
+        print(msg, file=self.report)
+
+        if self.failure_count and self.table_output:
+            print('\n{} notes failed to be created:'.format(self.failure_count))
+
+        if self.failure_count or not self.table_output:
+            columns = [('line', 'Line'), ('key', 'Key'), ('error', 'Error')]
+            rows = [{'line': line_number, 'key': key, 'error': error}
+                    for line_number, key, error in sorted(self.failures)]
+            write_rows(columns, rows, self.parent_app.output_format, indent=2)
+
+        if self.failure_count > len(self.failures):
+            print('  ... and {} more.'.format(self.failure_count - len(self.failures)), file=self.report)
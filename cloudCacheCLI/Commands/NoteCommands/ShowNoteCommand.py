@@ -27,8 +27,18 @@ class ShowNoteCommand(GetCommand):
         self.note_id = self.args[0]
 
 
+    def _local_results(self):
+        """ OVERRIDE - Read the note from the local replica. """
+        return self.app.replica.note(self.user, self.notebook_id, self.note_id)
+
+
     def _on_action_success(self):
-        """ Prints the list of notes to the console in a formatted table. """
+        """ Prints the note to the console in a formatted table, or the chosen output format. """
+
+        if not self._table_output:
+            fields = ('id', 'key', 'value', 'created_on', 'last_updated')
+            self._write_rows([(field, field) for field in fields], [self.results])
+            return
 
         id = self.results['id']
         key = self.results['key']
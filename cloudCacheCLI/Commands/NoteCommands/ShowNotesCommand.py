@@ -1,12 +1,15 @@
 """ Show the notes in the specified notebook. """
 
 from .. import CommandValidationError
-from ..BaseCommands import GetCommand
+from ..BaseCommands import ListCommand
 from cloudCacheCLI.Utilities import get_table
 
 # ---------------------------------------------------------------------------------------------------------------------
 
-class ShowNotesCommand(GetCommand):
+class ShowNotesCommand(ListCommand):
+
+    collection  = 'notes'
+    label_field = 'key'
 
     def __init__(self, args, parent_app):
         super(ShowNotesCommand, self).__init__(args, parent_app)
@@ -15,7 +18,8 @@ class ShowNotesCommand(GetCommand):
 
 
     def _validate_and_parse_args(self):
-        """ Ensure only 1 argument is passed in, the notebook ID. """
+        """ Ensure only 1 argument is passed in, the notebook ID, besides the `--limit`, `--offset` and `--page-size`
+        options. """
 
         if len(self.args) != 1:
             raise CommandValidationError('The `notes` command takes exactly 1 parameter, the notebook ID.')
@@ -23,16 +27,21 @@ class ShowNotesCommand(GetCommand):
         self.notebook_id = self.args[0]
 
 
+    def _local_results(self):
+        """ OVERRIDE - Read the notebook's notes from the local replica. """
+        return self.app.replica.notes(self.user, self.notebook_id)
+
+
     def _on_action_success(self):
-        """ Prints the list of notes to the console in a formatted table. """
+        """ Prints the list of notes to the console in a formatted table, or the chosen output format. Long values are
+        truncated in the table, but given in full by the other formats. """
 
-        notes = self.results['notes']
         notebook = self.results['notebook']
+        columns = [('id', 'ID'), ('key', 'Note name'), ('value', 'Note contents')]
 
-        if len(notes) == 0:
+        if not self._table_output:
+            self._write_listing(columns)
+        elif self._collection_empty():
             print('\n' + get_table([['This notebook does not have any notes yet.']], indent=2))
         else:
-            print('\n' + get_table([[notebook]], indent=2))
-            data = [[note['id'], note['key'], note['value']] for note in notes]
-            table_headers = ['ID', 'Note name', 'Note contents']
-            print(get_table(data, headers=table_headers, indent=6))
+            self._write_listing(columns, indent=6, heading=get_table([[notebook]], indent=2) + '\n')
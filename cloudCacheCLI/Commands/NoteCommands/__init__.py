@@ -1,4 +1,4 @@
-from .DeleteNoteCommand import DeleteNoteCommand
-from .ShowNoteCommand import ShowNoteCommand
-from .NewNoteCommand import NewNoteCommand
-from .ShowNotesCommand import ShowNotesCommand
\ No newline at end of file
+from .. import lazy_exports
+
+__getattr__ = lazy_exports(globals(), ('DeleteNoteCommand', 'ShowNoteCommand', 'NewNoteCommand', 'ShowNotesCommand',
+                                       'DeleteNotesCommand', 'NewNotesCommand'))
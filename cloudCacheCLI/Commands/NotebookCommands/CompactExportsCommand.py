@@ -0,0 +1,157 @@
+""" Merge a full export and the delta exports taken after it into a single, full NDJSON export. """
+
+from collections import defaultdict
+
+from .. import CommandValidationError
+from cloudCacheCLI.Utilities.ExportReader import NDJSON_NOTEBOOK, NDJSON_NOTE, NDJSON_DELETED_NOTEBOOK,\
+    NDJSON_DELETED_NOTE, FORMAT_NDJSON, iter_notebooks, guess_format, read_delta
+from cloudCacheCLI.Utilities.JsonCodec import dumps
+
+# --------------------------------------------------------------------------------------------------------------------
+
+class _Changes(object):
+    """ The combined effect of a series of delta exports: the latest version of every notebook and note they added or
+    updated, and everything they deleted. Later deltas take precedence over earlier ones. """
+
+    def __init__(self):
+        # {notebook ID: notebook}, and {notebook ID: {note ID: note}}
+        self.notebooks = {}
+        self.notes = defaultdict(dict)
+        self.deleted_notebooks = set()
+        self.deleted_notes = set()
+
+
+    def apply(self, records):
+        for record in records:
+            record_type = record.get('type')
+
+            if record_type == NDJSON_NOTEBOOK:
+                self.notebooks[record['id']] = record
+
+            elif record_type == NDJSON_NOTE:
+                self.notes[record['notebook_id']][record['id']] = record
+
+            elif record_type == NDJSON_DELETED_NOTE:
+                self.deleted_notes.add(record['id'])
+                self.notes[record['notebook_id']].pop(record['id'], None)
+
+            elif record_type == NDJSON_DELETED_NOTEBOOK:
+                self.deleted_notebooks.add(record['id'])
+                self.notebooks.pop(record['id'], None)
+                self.notes.pop(record['id'], None)
+
+            else:
+                raise ValueError('Invalid delta export: found a record of unknown type `{}`.'.format(record_type))
+
+
+class CompactExportsCommand(object):
+
+    def __init__(self, args, parent_app):
+        self.args = args
+        self.parent_app = parent_app
+        self._validate_and_parse_args()
+        self.action()
+
+
+    def _validate_and_parse_args(self):
+        """ Make sure at least 3 arguments are passed in: the base export, one or more delta exports in the order they
+        were taken, and the output file. The compacted export is written as NDJSON, so the output file must be named
+        as one (`.ndjson` or `.jsonl`), or it would later be read as JSON. """
+
+        if len(self.args) < 3:
+            msg  = 'The `compactexports` command takes at least 3 parameters: the full export to start from, the delta '
+            msg += 'exports taken since (oldest first), and the output file.'
+            raise CommandValidationError(msg)
+
+        self.base_file = self.args[0]
+        self.delta_files = self.args[1:-1]
+        self.output_file = self.args[-1]
+
+        if self.output_file in self.args[:-1]:
+            raise CommandValidationError('The output file can not also be one of the exports being compacted.')
+
+        if guess_format(self.output_file) != FORMAT_NDJSON:
+            msg = 'The compacted export is written as NDJSON, so the output file `{}` must end in `.ndjson` or `.jsonl`.'
+            raise CommandValidationError(msg.format(self.output_file))
+
+
+    def action(self):
+        """ Reads every delta into memory, since they only hold what changed, then streams the base export through to
+        the output one note at a time, swapping in the changed notes, dropping the deleted ones, and adding the new
+        ones after the rest of their notebook's notes. Notebooks which are new since the base export come last. """
+
+        try:
+            changes = self._read_deltas()
+        except (OSError, ValueError) as error:
+            raise CommandValidationError('Unable to read the delta exports: {}'.format(error))
+
+        try:
+            notebook_count, note_count = self._write_compacted(changes)
+        except (OSError, ValueError) as error:
+            raise CommandValidationError('Unable to compact `{}`: {}'.format(self.base_file, error))
+
+        msg = '\nCompacted {} delta exports into a full export of {} notebooks and {} notes in {}.'
+        print(msg.format(len(self.delta_files), notebook_count, note_count, self.output_file))
+
+
+    def _write_compacted(self, changes):
+        """ Writes the base export with the changes applied to the output file. Returns the number of notebooks and
+        notes written. """
+
+        notebook_count, note_count = 0, 0
+
+        with open(self.base_file) as base_file, open(self.output_file, 'w') as output_file:
+            for notebook, notes in iter_notebooks(base_file, guess_format(self.base_file)):
+                nb_id = notebook.get('id')
+                if nb_id in changes.deleted_notebooks:
+                    continue
+
+                notebook = changes.notebooks.pop(nb_id, notebook)
+                self._write_record(output_file, NDJSON_NOTEBOOK, notebook)
+                notebook_count += 1
+
+                changed_notes = changes.notes.pop(nb_id, {})
+                for note in notes:
+                    if note['id'] in changes.deleted_notes:
+                        continue
+                    note = changed_notes.pop(note['id'], note)
+                    self._write_record(output_file, NDJSON_NOTE, dict(note, notebook_id=nb_id))
+                    note_count += 1
+
+                for note in changed_notes.values():
+                    self._write_record(output_file, NDJSON_NOTE, note)
+                    note_count += 1
+
+            for nb_id, notebook in changes.notebooks.items():
+                self._write_record(output_file, NDJSON_NOTEBOOK, notebook)
+                notebook_count += 1
+
+                for note in changes.notes.pop(nb_id, {}).values():
+                    self._write_record(output_file, NDJSON_NOTE, note)
+                    note_count += 1
+
+        return notebook_count, note_count
+
+
+    def _read_deltas(self):
+        """ Applies each delta export in turn, checking they're in the order they were taken. """
+
+        changes = _Changes()
+        last_exported_on = None
+
+        for delta_file in self.delta_files:
+            with open(delta_file) as delta:
+                header, records = read_delta(delta)
+
+                if last_exported_on is not None and header['exported_on'] < last_exported_on:
+                    raise ValueError('`{}` was taken before the delta export given ahead of it.'.format(delta_file))
+                last_exported_on = header['exported_on']
+
+                changes.apply(records)
+
+        return changes
+
+
+    def _write_record(self, output_file, record_type, record):
+        record = dict(record, type=record_type)
+        output_file.write(dumps(record) + '\n')
@@ -0,0 +1,34 @@
+""" Delete many notebooks at once. """
+
+from ..BaseCommands import BulkDeleteCommand
+
+# --------------------------------------------------------------------------------------------------------------------
+
+class DeleteNotebooksCommand(BulkDeleteCommand):
+
+    noun = 'notebook'
+
+    def __init__(self, args, parent_app):
+        super(DeleteNotebooksCommand, self).__init__(args, parent_app)
+        self.listing_url = '{}/notebooks'.format(self.base_url)
+        self.prompt = 'Are you sure you want to delete these notebooks? All notes in them will also be deleted.'
+        self.action()
+
+
+    @property
+    def usage(self):
+        msg  = 'The `deletenotebooks` command takes the notebook IDs to delete (ex: `3 7,9 12-20`, or `-` to read them '
+        msg += 'from stdin) and/or `--match PATTERN` to delete the notebooks whose names match the pattern (ex: '
+        msg += '`scratch*`). Pass `--yes` to skip the confirmation, and `--workers N` to set how many notebooks are '
+        msg += 'deleted at once.'
+        return msg
+
+
+    def _listed_items(self, results):
+        """ OVERRIDE - The user's notebooks, by name. """
+        return {nb['id']: nb['name'] for nb in results['notebooks']}
+
+
+    def _item_url(self, item_id):
+        """ OVERRIDE """
+        return '{}/{}'.format(self.listing_url, item_id)
@@ -1,14 +1,27 @@
-""" Show the user notebooks. """
+""" Export the user notebooks, and all their notes, to a file. """
 
-from .. import CommandValidationError
+import json
+from contextlib import closing
+
+import arrow
+
+from .. import CommandValidationError, pop_option
 from ..BaseCommands import GetCommand
 from cloudCacheCLI.Utilities import get_table
-import json
+from cloudCacheCLI.Utilities.ExportReader import FORMATS, FORMAT_JSON, FORMAT_NDJSON, NDJSON_NOTEBOOK, NDJSON_NOTE,\
+    NDJSON_DELTA, NDJSON_DELETED_NOTEBOOK, NDJSON_DELETED_NOTE, iter_response_notebooks, guess_format
+from cloudCacheCLI.Utilities.JsonCodec import dumps, loads
+
+# The value of `--since` which exports what has changed since the previous export
+SINCE_LAST = 'last'
 
 # --------------------------------------------------------------------------------------------------------------------
 
 class ExportNotebooksCommand(GetCommand):
 
+    # An export is a one-off download of everything, so there's no sense in caching it
+    cacheable = False
+
     def __init__(self, args, parent_app):
         super(ExportNotebooksCommand, self).__init__(args, parent_app)
         self.url = '{}/notebooks'.format(self.base_url)
@@ -16,20 +29,186 @@ class ExportNotebooksCommand(GetCommand):
 
 
     def _validate_and_parse_args(self):
-        """ Since the 'notebooks' command is argument-free, make sure no arguments were passed in. """
+        """ Make sure exactly 1 argument, the output file, is passed in, along with optional `--format` and
+        `--since <timestamp|last>` options. A delta export, with `--since`, is always NDJSON. """
+
+        self.args = list(self.args)
+        self.format = pop_option(self.args, '--format')
+        self.since = pop_option(self.args, '--since')
+
         if len(self.args) != 1:
             message = 'The `exportnotebooks` command takes exactly 1 parameter: the target output file'
             raise CommandValidationError(message)
 
         self.output_file = self.args[0]
 
+        if self.since is not None:
+            self.format = self.format or FORMAT_NDJSON
+            if self.format != FORMAT_NDJSON:
+                raise CommandValidationError('An export with `--since` can only be written in the ndjson format.')
+
+        self.format = self.format or guess_format(self.output_file)
+
+        if self.format not in FORMATS:
+            raise CommandValidationError('The `--format` option must be one of {}.'.format(', '.join(FORMATS)))
+
+        if self.since not in (None, SINCE_LAST):
+            try:
+                self.since_time = arrow.get(self.since)
+            except (arrow.parser.ParserError, ValueError, TypeError):
+                msg = 'The `--since` option must be an ISO-8601 timestamp, or `last` for the previous export.'
+                raise CommandValidationError(msg)
+
+
+    def action(self):
+        """ OVERRIDE - In NDJSON format, stream the response instead of decoding it all at once. Every export records
+        what it exported in the export manifest, which is what `--since last` compares against. """
+
+        self.exported_on = arrow.utcnow().isoformat()
+
+        if self.since is not None:
+            self._check_since()
+
+        if self.format == FORMAT_JSON:
+            super(ExportNotebooksCommand, self).action()
+            return
+
+        self.response = self.app.transport.get(self.url, stream=True)
+
+        with closing(self.response):
+            if not self.response:
+                self.results = loads(self.response.content)
+                self._on_action_failure()
+                return
+
+            manifest_update = self.app.export_manifest.begin_export(self.user)
+            try:
+                self._write_ndjson(manifest_update)
+            except BaseException:
+                manifest_update.abort()
+                raise
+            manifest_update.finish(self.exported_on)
+
+
+    def _check_since(self):
+        """ The deletions in a delta export come from the export manifest, so they only go back as far as the previous
+        export. A `--since` timestamp from before then would leave out whatever was deleted in between, and compacting
+        the delta onto an export taken at that time would bring those notes back. """
+
+        last_exported = self.app.export_manifest.last_exported(self.user)
+
+        if last_exported is None:
+            msg = 'There is no previous export to take the changes since. Export everything without `--since` first.'
+            raise CommandValidationError(msg)
+
+        if self.since != SINCE_LAST and self.since_time < arrow.get(last_exported):
+            msg  = 'The `--since` timestamp can not be earlier than the previous export, at {}, since the deletions '
+            msg += 'made before then are no longer known. Use `--since last`, or export everything again.'
+            raise CommandValidationError(msg.format(last_exported))
+
+
+    def _write_ndjson(self, manifest_update):
+        """ Parses the /notebooks response as it arrives, and writes one notebook or note record per line. Only one
+        note is held in memory at a time, and the file is flushed after each notebook. The output file of a full
+        export isn't created until the first notebook arrives.
+
+        A delta export starts with a header record, and only writes the notebooks and notes which have changed since
+        the `--since` timestamp, or the previous export. A notebook is written before any of its notes which changed,
+        even if it didn't change itself. Tombstones for whatever has been deleted since the previous export follow. """
+
+        delta = self.since is not None
+        output_file = None
+        notebook_count, note_count = 0, 0
+
+        if delta:
+            since = manifest_update.previous_export if self.since == SINCE_LAST else self.since_time.isoformat()
+            output_file = open(self.output_file, 'w')
+            self._write_record(output_file, {'type': NDJSON_DELTA, 'since': since, 'exported_on': self.exported_on})
+
+        try:
+            for notebook, notes in iter_response_notebooks(self.response):
+                if output_file is None:
+                    output_file = open(self.output_file, 'w')
+
+                notebook['type'] = NDJSON_NOTEBOOK
+                pending_notebook = notebook
+                if self._is_exported(notebook, manifest_update.apply_notebook(notebook)):
+                    self._write_record(output_file, notebook)
+                    pending_notebook = None
+                    notebook_count += 1
+
+                for note, changed in manifest_update.apply_notes(notebook.get('id'), notes):
+                    if not self._is_exported(note, changed):
+                        continue
+
+                    if pending_notebook is not None:
+                        self._write_record(output_file, pending_notebook)
+                        pending_notebook = None
+                        notebook_count += 1
+
+                    note['type'] = NDJSON_NOTE
+                    note['notebook_id'] = notebook.get('id')
+                    self._write_record(output_file, note)
+                    note_count += 1
+
+                output_file.flush()
+
+            deleted_notebooks = manifest_update.deleted_notebooks()
+            deleted_notes = manifest_update.deleted_notes
+
+            if delta:
+                for nb_id in deleted_notebooks:
+                    self._write_record(output_file, {'type': NDJSON_DELETED_NOTEBOOK, 'id': nb_id})
+                for nb_id, note_id in deleted_notes:
+                    self._write_record(output_file, {'type': NDJSON_DELETED_NOTE, 'notebook_id': nb_id, 'id': note_id})
+
+        finally:
+            if output_file is not None:
+                output_file.close()
+
+        if delta:
+            msg = '\nExported {} notebooks and {} notes changed since {}, and {} deletions, to {}.'
+            print(msg.format(notebook_count, note_count, since, len(deleted_notebooks) + len(deleted_notes),
+                             self.output_file))
+        elif notebook_count == 0:
+            print('\n' + get_table([['No notebooks exist for this user']], indent=2))
+        else:
+            print('\nExported {} notebooks and {} notes to {}.'.format(notebook_count, note_count, self.output_file))
+
+
+    def _is_exported(self, item, changed):
+        """ Whether a notebook or note belongs in this export. A full export has everything. A delta export has what
+        the manifest says changed since the previous export, or what was created or updated after the `--since`
+        timestamp. """
+
+        if self.since is None:
+            return True
+        if self.since == SINCE_LAST:
+            return changed
+
+        timestamp = item.get('last_updated') or item.get('created_on')
+        return timestamp is None or arrow.get(timestamp) > self.since_time
+
+
+    def _write_record(self, output_file, record):
+        output_file.write(dumps(record) + '\n')
+
 
     def _on_action_success(self):
-        """ Prints the list of the current user's notebooks to the console in a formatted table. """
+        """ Writes the current user's notebooks, and all their notes, to the output file as a single JSON document, and
+        records them in the export manifest. """
 
         if len(self.results['notebooks']) == 0:
             print('\n' + get_table([['No notebooks exist for this user']], indent=2))
 
         else:
             with open(self.output_file, 'w') as output_file:
-                json.dump(self.results, output_file, indent=4, separators=(',', ': '))
\ No newline at end of file
+                json.dump(self.results, output_file, indent=4, separators=(',', ': '))
+
+        manifest_update = self.app.export_manifest.begin_export(self.user)
+        for notebook in self.results['notebooks']:
+            manifest_update.apply_notebook(notebook)
+            for _ in manifest_update.apply_notes(notebook['id'], notebook.get('notes', [])):
+                pass
+        manifest_update.deleted_notebooks()
+        manifest_update.finish(self.exported_on)
@@ -1,9 +1,38 @@
-""" Show the user notebooks. """
+""" Import notebooks and their notes from a file created by the `exportnotebooks` command. """
 
-from .. import CommandValidationError
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from requests.exceptions import RequestException
+
+from .. import CommandValidationError, pop_flag, pop_option, pop_positive_int_option
 from . import NewNotebookCommand
 from ..NoteCommands import NewNoteCommand
-import json
+from ..DiffCommand import DiffCommand
+from cloudCacheCLI.Utilities import get_table
+from cloudCacheCLI.Utilities.ExportReader import FORMATS, iter_notebooks, guess_format
+from cloudCacheCLI.Utilities.ImportJournal import ImportJournal, JOURNAL_SUFFIX
+from cloudCacheCLI.Utilities.JsonCodec import loads
+
+# The number of notes uploaded concurrently, if --workers isn't supplied
+DEFAULT_WORKERS = 1
+
+# --------------------------------------------------------------------------------------------------------------------
+
+class _ImportNotebookCommand(NewNotebookCommand):
+    """ A NewNotebookCommand whose failures are collected by the import, rather than printed inline. """
+
+    def _on_action_failure(self):
+        pass
+
+
+class _ImportNoteCommand(NewNoteCommand):
+    """ A NewNoteCommand whose failures are collected by the import, rather than printed inline. """
+
+    def _on_action_failure(self):
+        pass
 
 # --------------------------------------------------------------------------------------------------------------------
 
@@ -17,30 +46,244 @@ class ImportNotebooksCommand(object):
 
 
     def _validate_and_parse_args(self):
-        """ Since the 'notebooks' command is argument-free, make sure no arguments were passed in. """
+        """ Make sure exactly 1 argument, the input file, is passed in, along with optional `--workers N`, `--format`,
+        `--journal PATH`, `--resume` and `--sync` options. Without `--resume`, there must not already be a journal,
+        since that means an earlier import of the file stopped partway through. A `--sync` import isn't journaled,
+        since running it again skips whatever is already on the server anyway. """
+
+        self.args = list(self.args)
+        self.workers = pop_positive_int_option(self.args, '--workers', DEFAULT_WORKERS)
+        self.format = pop_option(self.args, '--format')
+        self.journal_path = pop_option(self.args, '--journal')
+        self.resume = pop_flag(self.args, '--resume')
+        self.sync = pop_flag(self.args, '--sync')
+
         if len(self.args) != 1:
             message = 'The `importnotebooks` command takes exactly 1 parameter: the target input file'
             raise CommandValidationError(message)
 
         self.input_file = self.args[0]
+        self.format = self.format or guess_format(self.input_file)
 
+        if self.format not in FORMATS:
+            raise CommandValidationError('The `--format` option must be one of {}.'.format(', '.join(FORMATS)))
 
-    def action(self):
+        if not os.path.isfile(self.input_file):
+            raise CommandValidationError('The input file `{}` does not exist.'.format(self.input_file))
 
-        with open(self.input_file) as input_file:
-            dict_from_file = json.load(input_file)
+        if self.sync:
+            if self.resume or self.journal_path is not None:
+                raise CommandValidationError('A `--sync` import is not journaled, so can not be resumed.')
+            self.journal = None
+            return
 
-        for nb in dict_from_file['notebooks']:
-            new_nb_cmd = NewNotebookCommand([nb['name']], self.parent_app)
+        self.journal = ImportJournal(self.journal_path or self.input_file + JOURNAL_SUFFIX, self.input_file)
 
+        if self.resume and not self.journal.exists:
+            raise CommandValidationError('There is no journal at `{}` to resume from.'.format(self.journal.path))
+
+        if not self.resume and self.journal.exists:
+            msg  = 'An earlier import of `{}` stopped partway through. Pass `--resume` to continue it, or delete its '
+            msg += 'journal `{}` to import everything again.'
+            raise CommandValidationError(msg.format(self.input_file, self.journal.path))
+
+        if self.resume:
             try:
-                new_nb_id  = new_nb_cmd.results['notebook_id']
-            except KeyError:
-                # KeyError because new_nb_cmd won't have a results attribute if the command failed. If the command
-                # failed, we don't have a new notebook, so skip trying to recreate the notes. The failure reason
-                # will be printed by the NewNotebookCommand itself
-                continue
-
-            for note in nb['notes']:
-                new_note_args = [new_nb_id, note['key'], note['value']]
-                NewNoteCommand(new_note_args, self.parent_app)
\ No newline at end of file
+                self.journal.load()
+            except ValueError as error:
+                raise CommandValidationError(str(error))
+
+
+    def action(self):
+        """ Streams the input file one notebook and one note at a time. Each notebook is created as soon as it has been
+        read, and its notes are handed off to a bounded pool of worker threads as they are read. At most 2 notes per
+        worker are queued at once, so memory use doesn't grow with the file.
+
+        With `--sync`, the plan of what's missing from the server is worked out and shown first, by `diff`. Notebooks
+        are then only created when the server has none of the same name, and only the notes which aren't already on
+        the server are created. A note whose value has changed replaces the server's version.
+
+        Every notebook and note the server creates is recorded in the journal, by its position in the file. A resumed
+        import skips whatever the journal records, and adds the notes of a notebook it already created to that
+        notebook. The journal is removed once everything has been imported; if anything failed, or the import was
+        interrupted, it's kept so the import can be resumed. """
+
+        self.lock = threading.Lock()
+        self.failures = []
+        self.notebooks_imported = 0
+        self.notes_imported = 0
+        self.notebooks_skipped = 0
+        self.notes_skipped = 0
+        interrupted = False
+
+        if self.sync:
+            diff = DiffCommand([self.input_file, '--format', self.format], self.parent_app)
+            if diff.plan is None:
+                return
+            self.plan, self.base_url = diff.plan, diff.base_url
+            self.already_imported = self.plan
+        else:
+            self.plan = None
+            self.already_imported = self.journal
+
+        self.parent_app.transport.ensure_pool_size(self.workers + 1)
+        queue_slots = threading.BoundedSemaphore(self.workers * 2)
+
+        start = time.time()
+        if self.journal is not None:
+            self.journal.open(self.resume)
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+
+        try:
+            with open(self.input_file) as input_file:
+                for position, (notebook, notes) in enumerate(iter_notebooks(input_file, self.format)):
+                    name = notebook['name']
+                    notebook_id = self._imported_notebook_id(position, name)
+
+                    if notebook_id is None:
+                        results, error = self._run(_ImportNotebookCommand, [name])
+
+                        if error is not None:
+                            # Without the new notebook there's nowhere to put its notes, so they're all skipped
+                            skipped = sum(1 for _ in notes)
+                            self._record_failure('Notebook `{}` ({} notes skipped)'.format(name, skipped), error)
+                            continue
+
+                        notebook_id = results['notebook_id']
+                        if self.journal is not None:
+                            self.journal.record_notebook(position, name, notebook_id)
+                        self.notebooks_imported += 1
+
+                    else:
+                        self.notebooks_skipped += 1
+
+                    for note_position, note in enumerate(notes):
+                        if self.already_imported.note_imported(position, note_position):
+                            self.notes_skipped += 1
+                            continue
+
+                        queue_slots.acquire()
+                        future = pool.submit(self._import_note, notebook_id, name, position, note_position, note)
+                        future.add_done_callback(lambda _: queue_slots.release())
+
+        except KeyboardInterrupt:
+            interrupted = True
+            print('')
+
+        finally:
+            # Let the notes already handed to the workers finish, so that every note the server creates is journaled
+            pool.shutdown(wait=True)
+            if self.journal is not None:
+                self.journal.close()
+
+        self._print_summary(time.time() - start)
+
+        if self.sync:
+            if interrupted or self.failures:
+                print('\nThe import is incomplete. Run it again with `--sync` to import whatever is still missing.')
+        elif interrupted or self.failures:
+            msg = '\nThe import is incomplete. Run it again with `--resume` to continue from its journal `{}`.'
+            print(msg.format(self.journal.path))
+        else:
+            self.journal.remove()
+
+
+    def _imported_notebook_id(self, position, name):
+        """ The ID of the notebook at this position, if the journal records that it has already been created, or the
+        sync plan found it on the server. """
+
+        try:
+            return self.already_imported.notebook_id(position, name)
+        except ValueError as error:
+            raise CommandValidationError(str(error))
+
+
+    def _import_note(self, notebook_id, notebook_name, notebook_position, note_position, note):
+        """ Creates a single note, and journals it, or deletes the server's older version of it when syncing. Runs on
+        a worker thread, whose future is never read, so any error at all is recorded here as the note's failure. """
+
+        try:
+            error = self._create_note(notebook_id, notebook_position, note_position, note)
+        except Exception as unexpected:
+            error = '{}: {}'.format(unexpected.__class__.__name__, unexpected)
+
+        if error is not None:
+            self._record_failure('Note `{}` in notebook `{}`'.format(note.get('key'), notebook_name), error)
+        else:
+            with self.lock:
+                self.notes_imported += 1
+
+
+    def _create_note(self, notebook_id, notebook_position, note_position, note):
+        """ Returns None if the note was created (and the old version of it deleted), or else the error message. """
+
+        results, error = self._run(_ImportNoteCommand, [notebook_id, note['key'], note['value']])
+
+        if error is None and self.journal is not None:
+            self.journal.record_note(notebook_position, note_position, results['note_id'])
+
+        if error is None and self.plan is not None:
+            replaced_id = self.plan.replaced_note_id(notebook_position, note_position)
+            if replaced_id is not None:
+                error = self._delete_note(notebook_id, replaced_id)
+                if error is not None:
+                    error = 'Created, but the old version (note {}) was not deleted: {}'.format(replaced_id, error)
+
+        return error
+
+
+    def _delete_note(self, notebook_id, note_id):
+        """ Deletes a note from the server. Returns None if it was deleted, or else the error message. """
+
+        url = '{}/notebooks/{}/notes/{}'.format(self.base_url, notebook_id, note_id)
+        try:
+            response = self.parent_app.transport.delete(url)
+        except RequestException as error:
+            return str(error) or error.__class__.__name__
+
+        if response:
+            return None
+
+        try:
+            return loads(response.content).get('message', response.reason)
+        except ValueError:
+            return response.reason
+
+
+    def _run(self, command_class, args):
+        """ Runs a create command, and returns a (results, error message) pair. Exactly one of the two is None,
+        depending on whether the command succeeded. """
+
+        try:
+            command = command_class(args, self.parent_app)
+        except (RequestException, ValueError) as error:
+            return None, str(error) or error.__class__.__name__
+
+        if not command.response:
+            return None, command.results.get('message', command.response.reason)
+
+        return command.results, None
+
+
+    def _record_failure(self, description, message):
+        with self.lock:
+            self.failures.append([description, message])
+
+
+    def _print_summary(self, elapsed):
+        """ Prints the import throughput, followed by a table of any failures. """
+
+        rate = self.notes_imported / elapsed if elapsed else 0
+        msg  = '\nImported {} notebooks and {} notes in {:.2f} seconds '.format(self.notebooks_imported,
+                                                                              self.notes_imported, elapsed)
+        msg += '({:.1f} notes/second, {} workers).'.format(rate, self.workers)
+        print(msg)
+
+        if self.notebooks_skipped or self.notes_skipped:
+            reason = 'are already on the server' if self.sync else 'the journal shows were already imported'
+            print('Skipped {} notebooks and {} notes which {}.'.format(self.notebooks_skipped, self.notes_skipped,
+                                                                          reason))
+
+        if self.failures:
+            print('\n{} items failed to import:'.format(len(self.failures)))
+            print(get_table(self.failures, headers=['Item', 'Error'], indent=2))
@@ -1,12 +1,18 @@
 """ Show the user notebooks. """
 
 from .. import CommandValidationError
-from ..BaseCommands import GetCommand
+from ..BaseCommands import ListCommand
 from cloudCacheCLI.Utilities import get_table
 
 # --------------------------------------------------------------------------------------------------------------------
 
-class ShowNotebooksCommand(GetCommand):
+class ShowNotebooksCommand(ListCommand):
+
+    collection  = 'notebooks'
+    label_field = 'name'
+
+    # Asks a server which supports paging for each notebook's note count, rather than all of its notes
+    page_params = {'note_counts': 'true'}
 
     def __init__(self, args, parent_app):
         super(ShowNotebooksCommand, self).__init__(args, parent_app)
@@ -15,18 +21,37 @@ class ShowNotebooksCommand(GetCommand):
 
 
     def _validate_and_parse_args(self):
-        """ Since the 'notebooks' command is argument-free, make sure no arguments were passed in. """
+        """ Since the 'notebooks' command is argument-free, besides the `--limit`, `--offset` and `--page-size` options,
+        make sure no arguments were passed in. """
         if len(self.args) > 0:
             raise CommandValidationError('The `notebooks` command takes no parameters.')
 
 
     def _on_action_success(self):
-        """ Prints the list of the current user's notebooks to the console in a formatted table. """
+        """ Prints the list of the current user's notebooks to the console in a formatted table, or the chosen output
+        format. """
 
-        if len(self.results['notebooks']) == 0:
+        if self._collection_empty() and self._table_output:
             print('\n' + get_table([['No notebooks exist for this user']], indent=2))
 
         else:
-            table_headers = ['ID', 'Notebook Name', '# of Notes']
-            data = [[nb['id'], nb['name'], len(nb['notes'])] for nb in self.results['notebooks']]
-            print('\n' + get_table(data, headers=table_headers, indent=2))
\ No newline at end of file
+            columns = [('id', 'ID'), ('name', 'Notebook Name'), ('note_count', '# of Notes')]
+            self._write_listing(columns)
+
+
+    def _iter_items(self):
+        """ OVERRIDE - Gives each notebook its note count, for servers which return every note rather than counting
+        them. """
+        for nb in super(ShowNotebooksCommand, self)._iter_items():
+            yield {'id': nb['id'], 'name': nb['name'], 'note_count': self._note_count(nb)}
+
+
+    def _note_count(self, nb):
+        """ The local replica, and a server which supports paging, count notes for us, rather than returning every one
+        of them. """
+        return nb['note_count'] if 'note_count' in nb else len(nb['notes'])
+
+
+    def _local_results(self):
+        """ OVERRIDE - Read the notebooks, and how many notes each has, from the local replica. """
+        return self.app.replica.notebooks(self.user)
\ No newline at end of file
@@ -1,5 +1,5 @@
-from .DeleteNotebookCommand import DeleteNotebookCommand
-from .ShowNotebooksCommand import ShowNotebooksCommand
-from .NewNotebookCommand import NewNotebookCommand
-from .ExportNotebooksCommand import ExportNotebooksCommand
-from .ImportNotebooksCommand import ImportNotebooksCommand
\ No newline at end of file
+from .. import lazy_exports
+
+__getattr__ = lazy_exports(globals(), ('DeleteNotebookCommand', 'ShowNotebooksCommand', 'NewNotebookCommand',
+                                       'ExportNotebooksCommand', 'ImportNotebooksCommand', 'DeleteNotebooksCommand',
+                                       'CompactExportsCommand'))
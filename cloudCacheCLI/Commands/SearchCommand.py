@@ -0,0 +1,98 @@
+""" Search the configured user's notes, using the full-text index of the local replica. """
+
+import sqlite3
+import time
+
+from . import CommandValidationError, pop_flag, pop_option, pop_positive_int_option
+from .BaseCommands import BaseCommand
+
+# The number of results shown, if --limit isn't supplied
+DEFAULT_LIMIT = 20
+
+# --------------------------------------------------------------------------------------------------------------------
+
+def _fts_query(terms):
+    """ Turns the words searched for into an FTS5 query matching notes which contain every one of them, or a word
+    starting with it. Each word is quoted, so punctuation in it isn't taken for query syntax. """
+
+    words = [word for term in terms for word in term.split()]
+    return ' '.join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+
+class SearchCommand(BaseCommand):
+
+    def __init__(self, args, parent_app):
+        super(SearchCommand, self).__init__(args, parent_app)
+        self.action()
+
+
+    def _validate_and_parse_args(self):
+        """ Make sure the words to search for are passed in, along with the optional `--limit N`, `--notebook ID`,
+        `--sync` and `--raw` options. """
+
+        self.args = list(self.args)
+        self.limit = pop_positive_int_option(self.args, '--limit', DEFAULT_LIMIT)
+        self.notebook_id = pop_option(self.args, '--notebook')
+        self.sync = pop_flag(self.args, '--sync')
+        self.raw = pop_flag(self.args, '--raw')
+
+        if len(self.args) == 0:
+            msg  = 'The `search` command takes the words to search for. Pass `--raw` to give an SQLite FTS5 query '
+            msg += 'instead, such as `"exact phrase" OR other`.'
+            raise CommandValidationError(msg)
+
+        if self.notebook_id is not None and not self.notebook_id.isdigit():
+            raise CommandValidationError('The `--notebook` option must be a notebook ID.')
+
+        self.query = ' '.join(self.args) if self.raw else _fts_query(self.args)
+
+
+    def action(self):
+        """ OVERRIDE - Search the replica's full-text index, after syncing it first if `--sync` was passed. Notes are
+        ranked by how well they match, with matches in a note's key counting for more than in its value. """
+
+        replica = self.app.replica
+
+        if self.sync:
+            self._sync()
+
+        if replica.last_synced(self.user) is None:
+            message = 'There is no local replica for `{}` yet. Run `cc sync` first, or pass `--sync`.'
+            raise CommandValidationError(message.format(self.user))
+
+        if not replica.searchable:
+            raise CommandValidationError('Searching needs SQLite with FTS5, which this Python was built without.')
+
+        start = time.time()
+        try:
+            self.results = replica.search(self.user, self.query, self.limit, self.notebook_id)
+        except sqlite3.OperationalError as error:
+            raise CommandValidationError('Unable to search for `{}`: {}'.format(' '.join(self.args), error))
+        elapsed = time.time() - start
+
+        self._on_action_success()
+
+        if self._table_output:
+            print('\n{} results in {:.1f} ms.'.format(len(self.results), elapsed * 1000))
+
+
+    def _sync(self):
+        """ Brings the replica up to date. Only the notes which have changed since the last sync are re-indexed. """
+
+        from .SyncCommand import SyncCommand
+
+        self.app.config_manager.ensure_api_key(self.app.transport)
+        self.app.config_manager.ensure_access_token(self.app.transport)
+        SyncCommand([], self.app)
+
+
+    def _on_action_success(self):
+        """ Prints the matching notes, best first, in a formatted table or the chosen output format. """
+
+        if not self.results and self._table_output:
+            print('\nNo notes match `{}`.'.format(' '.join(self.args)))
+            return
+
+        columns = [('notebook_id', 'Notebook ID'), ('notebook', 'Notebook'), ('note_id', 'Note ID'),
+                   ('key', 'Note name'), ('snippet', 'Match')]
+        self._write_rows(columns, self.results)
@@ -0,0 +1,288 @@
+""" An interactive shell which runs cloudCache commands in a single, long-lived process. """
+
+import cmd
+import shlex
+import threading
+
+from . import CommandValidationError
+
+# How often (seconds) the access token is checked while the shell is idle, and how long before it expires it's renewed
+TOKEN_CHECK_INTERVAL = 60
+TOKEN_REFRESH_MARGIN = 2 * TOKEN_CHECK_INTERVAL
+
+# Short names for the most used commands
+ALIASES = {'nb': 'notebooks', 'ls': 'notes', 'cat': 'note'}
+
+# Commands which can't be run from the shell, since they take over the process
+UNSHELLABLE_COMMANDS = ('shell', 'daemon')
+
+# The commands whose first argument, or second for `note`, is a notebook ID
+NOTEBOOK_ARG_POSITIONS = {'notes': 0, 'newnote': 0, 'newnotes': 0, 'deletenotebook': 0, 'deletenote': 0,
+                          'deletenotes': 0, 'note': 1}
+
+# The commands whose argument is a note ID, and its position
+NOTE_ARG_POSITIONS = {'note': 0, 'deletenote': 1}
+
+# The number of arguments each command is given when its notebook ID has been left out
+IMPLIED_NOTEBOOK_ARG_COUNTS = {'notes': 0, 'note': 1, 'newnote': 2, 'deletenote': 1}
+
+# The options which are followed by a value, which must stay with them when flags are moved to the end
+VALUE_OPTIONS = ('--match', '--workers', '--format', '--output', '--limit', '--offset', '--page-size',
+                 '--trace-file', '--since', '--by', '--command')
+
+# The commands which change the listings, and so make the remembered ones out of date
+NOTEBOOK_CHANGING_COMMANDS = ('newnotebook', 'deletenotebook', 'deletenotebooks')
+NOTE_CHANGING_COMMANDS = ('newnote', 'newnotes', 'deletenote', 'deletenotes')
+
+# --------------------------------------------------------------------------------------------------------------------
+
+class _TokenRefresher(threading.Thread):
+    """ Renews the access token in the background while the shell is idle, so the next command doesn't have to wait
+    for the transport to renew it. It stays out of the way of running commands by skipping its check whenever the
+    shell is busy. """
+
+    def __init__(self, shell):
+        super(_TokenRefresher, self).__init__()
+        self.daemon = True
+        self.shell = shell
+        self.stopped = threading.Event()
+
+
+    def run(self):
+        while not self.stopped.wait(TOKEN_CHECK_INTERVAL):
+            if not self.shell.busy.acquire(blocking=False):
+                continue
+            try:
+                self.shell.app.transport.refresh_access_token(margin=TOKEN_REFRESH_MARGIN)
+            except Exception:
+                # The next command runs the ensure steps itself, and reports whatever went wrong
+                pass
+            finally:
+                self.shell.busy.release()
+
+
+    def stop(self):
+        self.stopped.set()
+
+
+class _Shell(cmd.Cmd):
+    """ The read-eval-print loop. Every line is dispatched through the app's command table, and the notebooks and
+    notes it lists are remembered, for tab completion and so that they may be referred to by name. """
+
+    prompt = 'cc> '
+    intro  = '\ncloudCache shell. Type `help` for the commands, and `exit` or Ctrl-D to leave.'
+
+    def __init__(self, app):
+        super(_Shell, self).__init__()
+        self.app = app
+        self.busy = threading.Lock()
+
+        # The last seen notebook listing ({id: name}), note listings ({notebook id: {note id: key}}), and the notebook
+        # whose notes were listed most recently, which is used when a command's notebook ID is left out
+        self.notebooks = {}
+        self.notes = {}
+        self.current_notebook = None
+
+
+    def emptyline(self):
+        """ OVERRIDE - Do nothing, rather than repeating the last command. """
+        pass
+
+
+    def do_exit(self, _):
+        """ Leave the shell. """
+        return True
+
+    do_quit = do_exit
+
+
+    def do_EOF(self, _):
+        print('')
+        return True
+
+
+    def do_help(self, _):
+        """ OVERRIDE - List the available commands and aliases. """
+        print('\nCommands: {}'.format(', '.join(sorted(self._command_names()))))
+        print('Aliases: {}'.format(', '.join('{} = {}'.format(*alias) for alias in sorted(ALIASES.items()))))
+        print('\nNotebooks may be given by name once they have been listed. After `notes <notebook>`, the notebook ID')
+        print('may be left out of `notes`, `note <note ID>`, `newnote <key> <value>` and `deletenote <note ID>`.')
+
+
+    def default(self, line):
+        """ OVERRIDE - Runs the line as a cloudCache command. """
+
+        try:
+            args = shlex.split(line)
+        except ValueError as error:
+            print('\nUnable to parse the command: {}'.format(error))
+            return
+
+        name = ALIASES.get(args[0], args[0])
+        if name in UNSHELLABLE_COMMANDS:
+            print('\nThe `{}` command can not be run from the shell.'.format(name))
+            return
+
+        args = self._expand_args(name, args[1:])
+
+        with self.busy:
+            try:
+                command = self.app.run([name] + args)
+            except SystemExit:
+                return
+            except KeyboardInterrupt:
+                print('')
+                return
+            except Exception as error:
+                # A command which fails unexpectedly mustn't end the shell, and the rest of the user's session with it
+                print('\n{}'.format(error))
+                return
+
+        self._remember(name, args, command)
+
+
+    def _command_names(self):
+        return [name for name in self.app.commands if name not in UNSHELLABLE_COMMANDS] + ['exit', 'help']
+
+
+    def _expand_args(self, name, args):
+        """ Fills in the current notebook's ID when it has been left out, and swaps notebook names for their IDs. Flags
+        such as `--local` are left alone, and moved to the end. """
+
+        position = NOTEBOOK_ARG_POSITIONS.get(name)
+        if position is None:
+            return args
+
+        flags, args = self._split_flags(args)
+
+        implied = self.current_notebook is not None and len(args) == IMPLIED_NOTEBOOK_ARG_COUNTS.get(name)
+        if implied:
+            args = args[:position] + [str(self.current_notebook)] + args[position:]
+        elif position < len(args):
+            args = args[:position] + [self._notebook_id(args[position])] + args[position + 1:]
+
+        return args + flags
+
+
+    def _split_flags(self, args):
+        """ Splits the args into the flags (along with the values of any options), and everything else. """
+
+        flags, rest = [], []
+        args = iter(args)
+
+        for arg in args:
+            if not arg.startswith('--'):
+                rest.append(arg)
+                continue
+
+            flags.append(arg)
+            value = next(args, None) if arg in VALUE_OPTIONS else None
+            if value is not None:
+                flags.append(value)
+
+        return flags, rest
+
+
+    def _notebook_id(self, value):
+        """ The ID of the notebook with the given name, if it has been listed, or the value itself otherwise. """
+
+        for nb_id, name in self.notebooks.items():
+            if name.lower() == value.lower():
+                return str(nb_id)
+        return value
+
+
+    def _remember(self, name, args, command):
+        """ Keeps the notebooks and notes the command listed, if it was a successful listing. """
+
+        results = getattr(command, 'results', None)
+        response = getattr(command, 'response', None)
+        if not results or (response is not None and not response):
+            return
+
+        if name == 'notebooks' and 'notebooks' in results:
+            self.notebooks = self._updated_listing(self.notebooks, command)
+
+        elif name == 'notes' and 'notes' in results:
+            nb_id = command.notebook_id
+            nb_id = int(nb_id) if nb_id.isdigit() else nb_id
+            self.notes[nb_id] = self._updated_listing(self.notes.get(nb_id, {}), command)
+            self.current_notebook = nb_id
+
+        elif name in NOTEBOOK_CHANGING_COMMANDS + NOTE_CHANGING_COMMANDS:
+            # The listings may be out of date now, so forget the ones affected
+            if name in NOTEBOOK_CHANGING_COMMANDS:
+                self.notebooks = {}
+            if name in NOTE_CHANGING_COMMANDS and args:
+                self.notes.pop(int(args[0]) if args[0].isdigit() else args[0], None)
+
+
+    def _updated_listing(self, remembered, command):
+        """ A listing which covered the whole collection replaces the one remembered. One which only covered part of
+        it, with `--limit` or `--offset`, or which stopped early, is added to it. """
+
+        if command.complete:
+            return dict(command.listed)
+
+        merged = dict(remembered)
+        merged.update(command.listed)
+        return merged
+
+
+    def completenames(self, text, *ignored):
+        """ OVERRIDE - Completes command names and aliases. """
+        return sorted(name for name in self._command_names() + list(ALIASES) if name.startswith(text))
+
+
+    def completedefault(self, text, line, begidx, endidx):
+        """ OVERRIDE - Completes notebook IDs and names, and note IDs, from the listings seen so far. """
+
+        words = line[:begidx].split()
+        if not words:
+            return []
+
+        name = ALIASES.get(words[0], words[0])
+        position = len(words) - 1
+
+        candidates = []
+        if NOTEBOOK_ARG_POSITIONS.get(name) == position:
+            candidates = [str(nb_id) for nb_id in self.notebooks] + list(self.notebooks.values())
+
+        elif NOTE_ARG_POSITIONS.get(name) == position:
+            notebook = self.current_notebook
+            if name == 'deletenote' and words[1:]:
+                notebook = self._notebook_id(words[1])
+                notebook = int(notebook) if notebook.isdigit() else notebook
+            candidates = [str(note_id) for note_id in self.notes.get(notebook, {})]
+
+        return sorted(candidate for candidate in candidates if candidate.startswith(text))
+
+
+class ShellCommand(object):
+
+    def __init__(self, args, parent_app):
+        self.args = args
+        self.app = parent_app
+        self._validate_and_parse_args()
+        self.action()
+
+
+    def _validate_and_parse_args(self):
+        """ Since the 'shell' command is argument-free, make sure no arguments were passed in. """
+        if len(self.args) > 0:
+            raise CommandValidationError('The `shell` command takes no parameters.')
+
+
+    def action(self):
+        """ Runs the shell until the user leaves it, renewing the access token in the background in the meantime. """
+
+        shell = _Shell(self.app)
+        refresher = _TokenRefresher(shell)
+        refresher.start()
+
+        try:
+            shell.cmdloop()
+        except KeyboardInterrupt:
+            print('')
+        finally:
+            refresher.stop()
@@ -0,0 +1,173 @@
+""" Summarize the HTTP requests the CLI has made: how many, how fast, and how many failed, per endpoint or command. """
+
+import time
+from collections import Counter, OrderedDict
+
+from . import CommandValidationError, pop_flag, pop_option
+from .BaseCommands import BaseCommand
+from cloudCacheCLI import CFG_SERVER, CFG_PORT
+
+# The window summarized, if --since isn't supplied
+DEFAULT_WINDOW = '24h'
+
+# The seconds in each unit a window may be given in
+WINDOW_UNITS = {'m': 60, 'h': 3600, 'd': 86400}
+
+# What the requests may be grouped by, and the heading of the group's column
+GROUPINGS = OrderedDict([('endpoint', 'Endpoint'), ('command', 'Command')])
+
+# The upper bounds (milliseconds) of the latency histogram's buckets, and their headings. The last is unbounded
+HISTOGRAM_BOUNDS = (10, 25, 50, 100, 250, 500, 1000, 2500)
+HISTOGRAM_HEADINGS = ['<10ms', '<25ms', '<50ms', '<100ms', '<250ms', '<500ms', '<1s', '<2.5s', '2.5s+']
+
+# --------------------------------------------------------------------------------------------------------------------
+
+def _percentile(ordered, percent):
+    """ The nearest-rank percentile of a sorted, non-empty list. """
+    rank = -(-len(ordered) * percent // 100)
+    return ordered[rank - 1]
+
+
+def _bucket(latency_ms):
+    return next((index for index, bound in enumerate(HISTOGRAM_BOUNDS) if latency_ms < bound), len(HISTOGRAM_BOUNDS))
+
+
+class _Group(object):
+    """ The requests made to one endpoint, or by one command. """
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies_ms = []
+        self.errors = Counter()
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        self.bytes_sent = []
+        self.bytes_received = []
+        self.first = self.last = None
+
+
+    def add(self, recorded_at, status, error, request_bytes, response_bytes, latency):
+        latency_ms = latency * 1000
+        self.latencies_ms.append(latency_ms)
+        self.histogram[_bucket(latency_ms)] += 1
+
+        if error is not None:
+            self.errors[error] += 1
+        elif status >= 400:
+            self.errors['HTTP {}'.format(status)] += 1
+
+        self.bytes_sent.append(request_bytes or 0)
+        if response_bytes is not None:
+            self.bytes_received.append(response_bytes)
+
+        self.first = recorded_at if self.first is None else self.first
+        self.last = recorded_at
+
+
+    def summary(self):
+        """ The group's row of the listing. Throughput is the requests per second between its first and last request,
+        or over a single second if they were all made within one. """
+
+        ordered = sorted(self.latencies_ms)
+        requests = len(ordered)
+        errors = sum(self.errors.values())
+
+        return {'name': self.name, 'requests': requests, 'errors': errors,
+                'error_percent': round(errors * 100.0 / requests, 1),
+                'p50_ms': round(_percentile(ordered, 50), 1), 'p95_ms': round(_percentile(ordered, 95), 1),
+                'p99_ms': round(_percentile(ordered, 99), 1),
+                'per_second': round(requests / max(1.0, self.last - self.first), 2),
+                'avg_bytes_sent': int(sum(self.bytes_sent) / requests),
+                'avg_bytes_received': (int(sum(self.bytes_received) / len(self.bytes_received))
+                                       if self.bytes_received else None)}
+
+
+class StatsCommand(BaseCommand):
+
+    def __init__(self, args, parent_app):
+        super(StatsCommand, self).__init__(args, parent_app)
+        self.action()
+
+
+    def _validate_and_parse_args(self):
+        """ Make sure no arguments are passed in besides the optional `--since DURATION`, `--by endpoint|command`,
+        `--command NAME` and `--all-servers` options. """
+
+        self.args = list(self.args)
+        self.window = pop_option(self.args, '--since', DEFAULT_WINDOW)
+        self.grouping = pop_option(self.args, '--by', 'endpoint')
+        self.command_filter = pop_option(self.args, '--command')
+        self.all_servers = pop_flag(self.args, '--all-servers')
+
+        if len(self.args) > 0:
+            raise CommandValidationError('The `stats` command takes no parameters besides its options.')
+
+        if self.grouping not in GROUPINGS:
+            raise CommandValidationError('The `--by` option must be one of {}.'.format(', '.join(GROUPINGS)))
+
+        amount, unit = self.window[:-1], self.window[-1:]
+        if not amount.isdigit() or int(amount) == 0 or unit not in WINDOW_UNITS:
+            msg = 'The `--since` option must be a number of minutes, hours or days, such as `30m`, `24h` or `7d`.'
+            raise CommandValidationError(msg)
+        self.window_seconds = int(amount) * WINDOW_UNITS[unit]
+
+
+    def action(self):
+        """ OVERRIDE - Reads the requests recorded within the window, to the configured server unless `--all-servers`
+        is passed, and summarizes them per endpoint (with its method) or per command. """
+
+        config = self.app.config_manager.load_config()
+        server = None if self.all_servers else '{}:{}'.format(config[CFG_SERVER], config[CFG_PORT])
+
+        since = time.time() - self.window_seconds
+        requests = self.app.request_metrics.requests(since, server, self.command_filter)
+
+        groups = {}
+        for recorded_at, command, method, endpoint, status, error, request_bytes, response_bytes, latency in requests:
+            name = '{} {}'.format(method, endpoint) if self.grouping == 'endpoint' else (command or '(unknown)')
+            if name not in groups:
+                groups[name] = _Group(name)
+            groups[name].add(recorded_at, status, error, request_bytes, response_bytes, latency)
+
+        self.groups = [groups[name] for name in sorted(groups)]
+        self.results = [group.summary() for group in self.groups]
+        self._on_action_success()
+
+
+    def _on_action_success(self):
+        """ Lists each group's request count, error rate, latency percentiles, throughput and payload sizes. A table
+        is followed by each group's latency histogram, and the errors seen, in tables of their own. In the other
+        output formats, they're part of each group's row instead, as {bucket: requests} and {error: requests}. """
+
+        where = 'all servers' if self.all_servers else 'this server'
+
+        if not self.results and self._table_output:
+            if not self.app.request_metrics.enabled:
+                print('\nRequests aren\'t being recorded, since `metrics retention` is configured to 0 days.')
+            else:
+                print('\nNo requests were made to {} in the last {}.'.format(where, self.window))
+            return
+
+        columns = [('name', GROUPINGS[self.grouping]), ('requests', 'Requests'), ('errors', 'Errors'),
+                   ('error_percent', 'Error %'), ('p50_ms', 'p50 ms'), ('p95_ms', 'p95 ms'), ('p99_ms', 'p99 ms'),
+                   ('per_second', 'Requests/s'), ('avg_bytes_sent', 'Avg bytes sent'),
+                   ('avg_bytes_received', 'Avg bytes received')]
+        if not self._table_output:
+            columns += [('histogram', 'Latency histogram'), ('errors_seen', 'Errors seen')]
+            rows = [dict(result, histogram=dict(zip(HISTOGRAM_HEADINGS, group.histogram)),
+                         errors_seen=dict(group.errors.most_common()))
+                    for result, group in zip(self.results, self.groups)]
+            self._write_rows(columns, rows)
+            return
+
+        heading = '  Requests to {} in the last {}:\n'.format(where, self.window)
+        self._write_rows(columns, self.results, heading=heading)
+
+        histogram_columns = [('name', GROUPINGS[self.grouping])] + [(bucket, bucket) for bucket in HISTOGRAM_HEADINGS]
+        histogram = [dict(zip(HISTOGRAM_HEADINGS, group.histogram), name=group.name) for group in self.groups]
+        self._write_rows(histogram_columns, histogram, heading='  Latency histogram:\n')
+
+        errors = [{'name': group.name, 'error': error, 'requests': count} for group in self.groups
+                  for error, count in group.errors.most_common()]
+        if errors:
+            error_columns = [('name', GROUPINGS[self.grouping]), ('error', 'Error'), ('requests', 'Requests')]
+            self._write_rows(error_columns, errors, heading='  Errors:\n')
@@ -0,0 +1,59 @@
+""" Mirror the configured user's notebooks and notes into the local replica. """
+
+from contextlib import closing
+
+from . import CommandValidationError
+from .BaseCommands import GetCommand
+from cloudCacheCLI.Utilities import get_table
+from cloudCacheCLI.Utilities.ExportReader import iter_response_notebooks
+from cloudCacheCLI.Utilities.JsonCodec import loads
+
+# --------------------------------------------------------------------------------------------------------------------
+
+class SyncCommand(GetCommand):
+
+    # The sync needs the server's current state, and streams it rather than decoding it all at once
+    cacheable = False
+
+    def __init__(self, args, parent_app):
+        super(SyncCommand, self).__init__(args, parent_app)
+        self.url = '{}/notebooks'.format(self.base_url)
+        self.action()
+
+
+    def _validate_and_parse_args(self):
+        """ Since the 'sync' command is argument-free, make sure no arguments were passed in. """
+        if len(self.args) > 0:
+            raise CommandValidationError('The `sync` command takes no parameters.')
+
+
+    def action(self):
+        """ OVERRIDE - Stream the listing of every notebook and note into the replica, one note at a time. Only rows
+        whose last_updated timestamp changed are written, and the whole sync is applied in a single transaction. """
+
+        self.response = self.app.transport.get(self.url, stream=True)
+
+        with closing(self.response):
+            if not self.response:
+                self.results = loads(self.response.content)
+                self._on_action_failure()
+                return
+
+            sync = self.app.replica.begin_sync(self.user)
+            try:
+                for notebook, notes in iter_response_notebooks(self.response):
+                    sync.apply_notebook(notebook, notes)
+                sync.finish()
+            except BaseException:
+                sync.abort()
+                raise
+
+        self.results = sync.counts
+        self._on_action_success()
+
+
+    def _on_action_success(self):
+        """ Prints how many notebooks and notes were added, updated, deleted, or left alone. """
+
+        data = [[key.capitalize(), self.results[key]] for key in ('added', 'updated', 'deleted', 'unchanged')]
+        print('\n' + get_table(data, headers=['Notebooks and notes', 'Count'], indent=2))
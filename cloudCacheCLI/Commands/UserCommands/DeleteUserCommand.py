@@ -1,11 +1,8 @@
 """ Show the notes in the specified notebook. """
 
 from distutils.util import strtobool
-import json
 from getpass import getpass
 
-import requests
-
 from ..BaseCommands import DeleteCommand
 from .. import CommandValidationError
 
@@ -29,7 +26,8 @@ class DeleteUserCommand(DeleteCommand):
 
         if user_confirmation:
             body = {'password' :getpass('\nPassword: ')}
-            self.response = requests.delete(self.url, headers=self.headers, data=json.dumps(body))
+            self.response = self.app.transport.delete(self.url, body)
+            self._invalidate_cached_responses()
             super(DeleteCommand, self).action()
 
 
@@ -58,12 +58,5 @@ class NewUserCommand(PutCommand):
     def _on_action_success(self):
         """ Save the newly-created user details to the application config. """
 
-        config = self.app.config_manager.load_config()
-
-        for key in (CFG_ACCESS_TOKEN, CFG_TOKEN_EXPIRES):
-            if key in config:
-                del config[key]
-
-        config[CFG_USER] = self.username
-        config[CFG_API_KEY] = self.results['api_key']
-        self.app.config_manager.save_config(config)
\ No newline at end of file
+        updates = {CFG_USER: self.username, CFG_API_KEY: self.results['api_key']}
+        self.app.config_manager.update_config(updates, removals=(CFG_ACCESS_TOKEN, CFG_TOKEN_EXPIRES))
\ No newline at end of file
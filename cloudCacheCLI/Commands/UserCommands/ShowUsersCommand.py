@@ -2,7 +2,6 @@
 
 from .. import CommandValidationError
 from ..BaseCommands import GetCommand
-from cloudCacheCLI.Utilities import get_table
 
 # ---------------------------------------------------------------------------------------------------------------------
 
@@ -21,8 +20,5 @@ class ShowUsersCommand(GetCommand):
 
 
     def _on_action_success(self):
-        """ Prints the list of users to the console in a formatted table. """
-
-        table_headers = ['ID', 'Username']
-        data = [[user['id'], user['username']] for user in self.results['users']]
-        print('\n' + get_table(data, headers=table_headers, indent=2))
+        """ Prints the list of users to the console in a formatted table, or the chosen output format. """
+        self._write_rows([('id', 'ID'), ('username', 'Username')], self.results['users'])
@@ -1,3 +1,3 @@
-from .DeleteUserCommand import DeleteUserCommand
-from .ShowUsersCommand import ShowUsersCommand
-from .NewUserCommand import NewUserCommand
\ No newline at end of file
+from .. import lazy_exports
+
+__getattr__ = lazy_exports(globals(), ('DeleteUserCommand', 'ShowUsersCommand', 'NewUserCommand'))
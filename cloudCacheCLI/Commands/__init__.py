@@ -1,6 +1,84 @@
+import importlib
+
+from cloudCacheCLI.Utilities.TableWriter import OUTPUT_FORMATS, OUTPUT_TABLE
+
 
 class CommandValidationError(Exception):
     """ An exception which is raised when a Command object fails validation. Probably due to invalid arguments. """
     pass
 
-from .ConfigAppCommand import ConfigAppCommand
\ No newline at end of file
+
+def pop_flag(args, name):
+    """ Removes every occurrence of the flag `name` (ex: `--yes`) from the list of args, and returns whether it was
+    present at all. """
+
+    present = name in args
+    while name in args:
+        args.remove(name)
+    return present
+
+
+def pop_option(args, name, default=None):
+    """ Removes the option `name` and the value which follows it (ex: `--workers 8`) from the list of args, and returns
+    that value. Returns the default if the option isn't present. """
+
+    if name not in args:
+        return default
+
+    index = args.index(name)
+    if index + 1 >= len(args):
+        raise CommandValidationError('The `{}` option requires a value.'.format(name))
+
+    value = args[index + 1]
+    del args[index:index + 2]
+    return value
+
+
+def pop_positive_int_option(args, name, default, zero_allowed=False):
+    """ Same as pop_option, but the value must be a positive whole number (or zero, if zero_allowed), which is returned
+    as an int. The default is returned as is if the option isn't present. """
+
+    value = pop_option(args, name)
+    if value is None:
+        return default
+
+    if not value.isdigit() or int(value) < (0 if zero_allowed else 1):
+        kind = 'whole number' if zero_allowed else 'positive whole number'
+        raise CommandValidationError('The `{}` option must be a {}.'.format(name, kind))
+    return int(value)
+
+
+def pop_global_options(args):
+    """ Removes the options which apply to any command, and may be given anywhere on its command line, from the list
+    of args. Returns the format listings are written in, whether to trace the command, and the file to write the trace
+    to, if any. """
+
+    output_format = pop_option(args, '--output', OUTPUT_TABLE)
+    trace_file = pop_option(args, '--trace-file')
+    trace = pop_flag(args, '--trace') or trace_file is not None
+
+    if output_format not in OUTPUT_FORMATS:
+        raise CommandValidationError('The `--output` option must be one of {}.'.format(', '.join(OUTPUT_FORMATS)))
+
+    return output_format, trace, trace_file
+
+
+def lazy_exports(package_globals, names):
+    """ Returns a module-level __getattr__ for a package which re-exports each named class from the submodule of the
+    same name, but only imports that submodule the first time the class is asked for. This keeps importing a package
+    cheap, so that running one command doesn't import every other command and everything they depend on. """
+
+    def __getattr__(name):
+        if name not in names:
+            raise AttributeError('module {!r} has no attribute {!r}'.format(package_globals['__name__'], name))
+
+        # Importing the submodule sets the package attribute to the module, so replace it with the class
+        module = importlib.import_module('.' + name, package_globals['__name__'])
+        package_globals[name] = getattr(module, name)
+        return package_globals[name]
+
+    return __getattr__
+
+
+__getattr__ = lazy_exports(globals(), ('ConfigAppCommand', 'SyncCommand', 'DaemonCommand', 'BatchCommand',
+                                       'ShellCommand', 'SearchCommand', 'DiffCommand', 'StatsCommand'))
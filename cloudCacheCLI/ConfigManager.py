@@ -1,16 +1,23 @@
 """ The configuration manager class. """
 
 import json
+import os
 import sys
-from os.path import exists
-from getpass import getpass
+import tempfile
+import threading
+from contextlib import contextmanager
+from os.path import exists, dirname, abspath
 
-import arrow
-
-import requests
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
 
 from cloudCacheCLI import CFG_SERVER, CFG_PORT, CFG_USER, CFG_API_KEY, CFG_ACCESS_TOKEN, CFG_TOKEN_EXPIRES
+from cloudCacheCLI.Tracer import span
 from cloudCacheCLI.Utilities import get_table
+from cloudCacheCLI.Utilities.JsonCodec import loads
 
 # ---------------------------------------------------------------------------------------------------------------------
 
@@ -19,10 +26,24 @@ class ConfigManager(object):
 
     def __init__(self, config_path):
         self.config_file = config_path
+        self.lock_file   = config_path + '.lock'
+
+        # The parsed config, and the (inode, mtime, size) of the file it was parsed from
+        self._config = None
+        self._stamp  = None
+        self._thread_lock = threading.RLock()
+        self._lock_depth  = 0
+
+        # Asks for the user's password when an API key is needed. The daemon swaps this out to ask its client instead
+        self.prompt_password = _getpass
+
         self._ensure_config()
 
+
+    @property
+    def base_url(self):
         config = self.load_config()
-        self.base_url = 'http://{}:{}'.format(config[CFG_SERVER], config[CFG_PORT])
+        return 'http://{}:{}'.format(config[CFG_SERVER], config[CFG_PORT])
 
 
     def ensure_user(self):
@@ -40,44 +61,73 @@ class ConfigManager(object):
         sys.exit(0)
 
 
-    def ensure_access_token(self):
-        """ Make sure the config file has an access token, which is not expired. If it's expired, delete it and obtain
-        a new one. """
+    def ensure_access_token(self, transport):
+        """ Make sure the config file has an access token, which is not expired. If it's missing or expired, obtain
+        a new one. The supplied transport is used for the API call, and is handed the new token once we have it. From
+        then on, the transport renews the token itself whenever it's about to expire. """
+
+        error = self.refresh_access_token(transport, transport.token_margin)
+
+        if error is not None:
+            # Probably because the user configured doesn't exist. Don't bother trying to continue on, just exit
+            print('\n' + error)
+            sys.exit(0)
+
+
+    def refresh_access_token(self, transport, margin=0, rejected_token=None):
+        """ Obtains a new access token unless the config already has one which won't expire for another `margin`
+        seconds, and which isn't `rejected_token`. The transport is used for the API call, and is handed the token
+        either way. Returns None if that went well, or the server's error message if it didn't.
+
+        The refresh happens while holding the config lock, and the config is re-read once the lock is held, so when
+        several `cc` processes need a new token at once, only the first fetches one and the rest use it. """
 
         config = self.load_config()
+        if self._has_usable_token(config, margin, rejected_token):
+            # The transport may have been set up with an older token, if another process has since refreshed it
+            transport.set_access_token(config[CFG_ACCESS_TOKEN], config[CFG_TOKEN_EXPIRES])
+            return None
 
-        if CFG_ACCESS_TOKEN in config and CFG_TOKEN_EXPIRES in config:
-            token_time = arrow.get(config[CFG_TOKEN_EXPIRES])
-            if token_time > arrow.now():
-                # token exists, and is still valid, so we can use it
-                return
-            else:
-                # token exists, but is expired, so delete it
-                for key in (CFG_ACCESS_TOKEN, CFG_TOKEN_EXPIRES):
-                    if key in config:
-                        del config[key]
-                self.save_config(config)
+        with self.lock():
+            config = self.load_config()
 
-        # If we get here, either the token doesn't exist, or was expired and deleted. Get a new one
-        url = '{}/access/{}/{}'.format(self.base_url, config[CFG_USER], config[CFG_API_KEY])
+            if self._has_usable_token(config, margin, rejected_token):
+                # Another process refreshed the token while we waited for the lock
+                transport.set_access_token(config[CFG_ACCESS_TOKEN], config[CFG_TOKEN_EXPIRES])
+                return None
 
-        response = requests.get(url)
-        results  = json.loads(response.text)
+            url = '{}/access/{}/{}'.format(self.base_url, config[CFG_USER], config[CFG_API_KEY])
 
-        if response:
-            config[CFG_ACCESS_TOKEN]  = results['access token']['access_token']
-            config[CFG_TOKEN_EXPIRES] = results['access token']['expires_on']
-            self.save_config(config)
+            response = transport.get(url, authenticate=False)
+            results  = loads(response.content)
 
-        else:
-            # Probably because the user configured doesn't exist. Don't bother trying to continue on, just exit
-            print('\n' + results['message'])
-            sys.exit(0)
+            if not response:
+                self.update_config({}, removals=(CFG_ACCESS_TOKEN, CFG_TOKEN_EXPIRES))
+                return results['message']
+
+            token = results['access token']
+            self.update_config({CFG_ACCESS_TOKEN: token['access_token'], CFG_TOKEN_EXPIRES: token['expires_on']})
+            transport.set_access_token(token['access_token'], token['expires_on'])
+            return None
 
 
-    def ensure_api_key(self):
+    @staticmethod
+    def _has_usable_token(config, margin, rejected_token):
+        """ Whether the config holds an access token, other than the rejected one, which won't expire for at least
+        another `margin` seconds. """
+
+        if CFG_ACCESS_TOKEN not in config or CFG_TOKEN_EXPIRES not in config:
+            return False
+        if config[CFG_ACCESS_TOKEN] == rejected_token:
+            return False
+
+        import arrow
+        return (arrow.get(config[CFG_TOKEN_EXPIRES]) - arrow.now()).total_seconds() > margin
+
+
+    def ensure_api_key(self, transport):
         """ Make sure we have an API key for the configured user. If we don't, make the appropriate
-        API call to get one. """
+        API call to get one using the supplied transport. """
 
         config = self.load_config()
 
@@ -87,12 +137,11 @@ class ConfigManager(object):
         # If we get here, we don't have an API key, so let's go get one
         url = '{}/users/{}'.format(self.base_url, config[CFG_USER])
 
-        response = requests.get(url, data=json.dumps({'password': getpass('\nPassword: ')}))
-        results  = json.loads(response.text)
+        response = transport.get(url, {'password': self.prompt_password('\nPassword: ')}, authenticate=False)
+        results  = loads(response.content)
 
         if response:
-            config[CFG_API_KEY] = results['user']['api_key']
-            self.save_config(config)
+            self.update_config({CFG_API_KEY: results['user']['api_key']})
         else:
             # Probably because the user configured doesn't exist, or password is wrong
             print('\n' + results['message'])
@@ -108,15 +157,82 @@ class ConfigManager(object):
 
 
     def load_config(self):
-        """ Loads the config from the config file and returns it as a dict. """
-        with open(self.config_file, 'r') as config_file:
-            return json.load(config_file)
+        """ Returns the config as a dict. The file is only parsed again if it has been replaced, or its modification
+        time or size has changed, since it was last read, so calling this repeatedly is cheap. The caller gets its own
+        copy, which it may modify freely. """
+
+        with self._thread_lock, span('load config'):
+            stat  = os.stat(self.config_file)
+            stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+            if stamp != self._stamp:
+                with open(self.config_file, 'r') as config_file:
+                    self._config = json.load(config_file)
+                self._stamp = stamp
+
+            return dict(self._config)
 
 
     def save_config(self, config):
-        """ Save the config info from the supplied dict to the config file as JSON. """
-        with open(self.config_file, 'w') as config_file:
-            json.dump(config, config_file, indent=4, separators=(',', ': '))
+        """ Save the config info from the supplied dict to the config file as JSON. The file is written to a temporary
+        file alongside it, which is then renamed over it, so readers never see a partially written config. """
+
+        directory = dirname(abspath(self.config_file))
+        contents  = json.dumps(config, indent=4, separators=(',', ': '))
+
+        with self._thread_lock:
+            descriptor, temp_path = tempfile.mkstemp(prefix='.ccconfig-', dir=directory)
+            try:
+                with os.fdopen(descriptor, 'w') as temp_file:
+                    temp_file.write(contents)
+                    temp_file.flush()
+                    os.fsync(temp_file.fileno())
+                os.replace(temp_path, self.config_file)
+            except BaseException:
+                if exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+            stat = os.stat(self.config_file)
+            self._config = dict(config)
+            self._stamp  = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+    def update_config(self, updates, removals=()):
+        """ Sets the supplied keys and deletes the removals from the current config, and saves it, all while holding
+        the config lock, so changes made by other processes in the meantime aren't overwritten. """
+
+        with self.lock():
+            config = self.load_config()
+            config.update(updates)
+            for key in removals:
+                config.pop(key, None)
+            self.save_config(config)
+
+
+    @contextmanager
+    def lock(self):
+        """ Holds an exclusive lock on the config, shared between threads and between `cc` processes, for the duration
+        of the with block. The lock is re-entrant within a thread. """
+
+        with self._thread_lock:
+            if self._lock_depth:
+                # This thread already holds the file lock
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+
+            with open(self.lock_file, 'a+') as lock_file:
+                _lock_file(lock_file)
+                self._lock_depth = 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth = 0
+                    _unlock_file(lock_file)
 
 
     def echo_config(self):
@@ -128,4 +244,34 @@ class ConfigManager(object):
         data    = [[key, config[key]] for key in sorted(config.keys())]
 
         print('')
-        print(get_table(data, headers=headers, indent=2))
\ No newline at end of file
+        print(get_table(data, headers=headers, indent=2))
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+def _getpass(prompt):
+    """ getpass.getpass, which is only imported when a password is actually needed. """
+    from getpass import getpass
+    return getpass(prompt)
+
+
+def _lock_file(lock_file):
+    """ Blocks until an exclusive lock is held on the open file. """
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+    else:
+        lock_file.seek(0)
+        while True:
+            try:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                # LK_LOCK gives up after 10 seconds, but a token refresh can legitimately take longer
+                continue
+
+
+def _unlock_file(lock_file):
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    else:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
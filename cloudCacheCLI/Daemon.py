@@ -0,0 +1,323 @@
+""" The `cc daemon` server, and the thin client the `cc` entry point uses to hand commands to it.
+
+The two talk over a Unix domain socket, one JSON message per line. The client sends the command line, and the daemon
+runs it and streams its output back, asking the client for a line of input whenever the command prompts for one:
+
+    client -> daemon    {"argv": [...], "cwd": "..."}     the command to run, and where to run it
+                        {"line": "..."} / {"eof": true}    the reply to an "input" message
+    daemon -> client    {"out": "..."} / {"err": "..."}    output, as it is written
+                        {"input": "...", "secret": false}  a prompt, which the client answers with a line of input
+                        {"exit": 0}                        the command has finished, with this exit status
+
+This module is imported on every `cc` call, so it must stay free of anything but the standard library.
+"""
+
+import io
+import json
+import os
+import socket
+import sys
+from contextlib import redirect_stdout, redirect_stderr
+
+# The name of the daemon's socket, which lives alongside the config file
+SOCKET_NAME = '.ccdaemon.sock'
+
+# The argv sent to ask a running daemon to shut down
+STOP_ARGV = ['daemon', 'stop']
+
+# Commands which are always run in the client's own process, since they need its terminal for line editing
+LOCAL_COMMANDS = ('shell',)
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+def daemon_available():
+    """ Whether this platform supports Unix domain sockets, and so the daemon. """
+    return hasattr(socket, 'AF_UNIX')
+
+
+def _connect(socket_path):
+    """ Connects to the daemon listening at socket_path. Returns None if there isn't one. """
+
+    if not daemon_available() or not os.path.exists(socket_path):
+        return None
+
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        # A stale socket left behind by a daemon which didn't shut down cleanly
+        connection.close()
+        return None
+    return connection
+
+
+def _send(stream, **message):
+    stream.write(json.dumps(message).encode('utf-8') + b'\n')
+    stream.flush()
+
+
+def _receive(stream):
+    """ Reads one message, or returns None if the other end has hung up. """
+    line = stream.readline()
+    return json.loads(line.decode('utf-8')) if line else None
+
+
+def forward_to_daemon(socket_path, argv):
+    """ Runs the command line (without the script name) in the daemon listening at socket_path, relaying its output
+    and prompts through this process's console. Returns the command's exit status, or None if no daemon is running (or
+    the command must run locally), in which case the caller should run the command itself. """
+
+    if argv[:1] and argv[0] in LOCAL_COMMANDS:
+        return None
+
+    connection = _connect(socket_path)
+    if connection is None:
+        return None
+
+    with connection, connection.makefile('rwb') as stream:
+        _send(stream, argv=list(argv), cwd=os.getcwd())
+
+        while True:
+            message = _receive(stream)
+
+            if message is None:
+                print('\nThe cloudCache daemon stopped before the command finished.', file=sys.stderr)
+                return 1
+
+            if 'out' in message:
+                sys.stdout.write(message['out'])
+                sys.stdout.flush()
+
+            elif 'err' in message:
+                sys.stderr.write(message['err'])
+                sys.stderr.flush()
+
+            elif 'input' in message:
+                _answer_prompt(stream, message['input'], message.get('secret', False))
+
+            elif 'exit' in message:
+                return message['exit']
+
+
+def _answer_prompt(stream, prompt, secret):
+    """ Reads a line from this process's console in reply to a prompt from the daemon. """
+
+    try:
+        if secret:
+            from getpass import getpass
+            line = getpass(prompt)
+        else:
+            sys.stdout.write(prompt)
+            sys.stdout.flush()
+            line = sys.stdin.readline()
+            if not line:
+                raise EOFError()
+    except (EOFError, KeyboardInterrupt):
+        _send(stream, eof=True)
+    else:
+        _send(stream, line=line.rstrip('\n'))
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+class _ClientConsole(object):
+    """ Stands in for the console of the client whose command is running: output is sent to the client as it is
+    written, and input is requested from the client a line at a time. """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.stdout = _ClientOutput(self, 'out')
+        self.stderr = _ClientOutput(self, 'err')
+        self.stdin  = _ClientInput(self)
+
+
+    def send(self, **message):
+        _send(self.stream, **message)
+
+
+    def prompt(self, prompt, secret=False):
+        """ Asks the client for a line of input. Raises EOFError if it has none to give. """
+
+        self.stdout.flush()
+        self.send(input=prompt, secret=secret)
+
+        reply = _receive(self.stream)
+        if reply is None or 'line' not in reply:
+            raise EOFError()
+        return reply['line']
+
+
+    def prompt_password(self, prompt='Password: '):
+        """ Same signature as getpass.getpass, but the password is typed at the client's console. """
+        return self.prompt(prompt, secret=True)
+
+
+class _ClientOutput(io.TextIOBase):
+    """ A text stream which sends everything written to it to the client, a line at a time. """
+
+    def __init__(self, console, kind):
+        self.console = console
+        self.kind    = kind
+        self.pending = []
+
+
+    def writable(self):
+        return True
+
+
+    def write(self, text):
+        self.pending.append(text)
+        if '\n' in text:
+            self.flush()
+        return len(text)
+
+
+    def flush(self):
+        if self.pending:
+            self.console.send(**{self.kind: ''.join(self.pending)})
+            self.pending = []
+
+
+class _ClientInput(io.TextIOBase):
+    """ A text stream which reads lines from the client, so that input() works inside the daemon. """
+
+    def __init__(self, console):
+        self.console = console
+
+
+    def readable(self):
+        return True
+
+
+    def readline(self, size=-1):
+        try:
+            return self.console.prompt('') + '\n'
+        except EOFError:
+            return ''
+
+
+class CommandDaemon(object):
+    """ Serves commands for `cc` clients over a Unix domain socket, using a single long-lived CloudCacheCliApp, so the
+    imports, parsed config, access token, response cache and pooled HTTP connection are all reused between commands.
+
+    Commands are run one at a time, in the order clients connect. Each one runs in the client's working directory,
+    with its output and prompts relayed through the client's console. """
+
+    def __init__(self, app, socket_path):
+        self.app = app
+        self.socket_path = socket_path
+        self.running = False
+
+
+    def serve_forever(self):
+        """ Listens for clients until asked to stop by `cc daemon stop`, or interrupted. """
+
+        listener = self._listen()
+        self.running = True
+        print('\ncloudCache daemon listening on {}'.format(self.socket_path))
+
+        try:
+            while self.running:
+                connection, _ = listener.accept()
+                with connection, connection.makefile('rwb') as stream:
+                    self._serve(stream)
+
+        except KeyboardInterrupt:
+            pass
+
+        finally:
+            listener.close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            print('\ncloudCache daemon stopped.')
+
+
+    def _listen(self):
+        """ Binds the socket, replacing any stale one. Only the current user may connect, since the daemon acts with
+        their access token. Raises RuntimeError if a daemon is already listening on it. """
+
+        existing = _connect(self.socket_path)
+        if existing is not None:
+            existing.close()
+            raise RuntimeError('A cloudCache daemon is already running on {}.'.format(self.socket_path))
+
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        previous_umask = os.umask(0o177)
+        try:
+            listener.bind(self.socket_path)
+        finally:
+            os.umask(previous_umask)
+
+        listener.listen(16)
+        return listener
+
+
+    def _serve(self, stream):
+        """ Runs a single client's command and sends back its exit status. A client which hangs up part way through
+        doesn't take the daemon down with it. """
+
+        try:
+            request = _receive(stream)
+            if request is None:
+                return
+
+            if request['argv'] == STOP_ARGV:
+                self.running = False
+                _send(stream, out='\ncloudCache daemon stopped.\n')
+                _send(stream, exit=0)
+                return
+
+            _send(stream, exit=self._run(request, _ClientConsole(stream)))
+
+        except (BrokenPipeError, ConnectionResetError, ValueError):
+            pass
+
+
+    def _run(self, request, console):
+        """ Runs the command line in the request through the app, with the client's console and working directory,
+        and returns its exit status. """
+
+        config_manager = self.app.config_manager
+        previous_cwd, previous_stdin, previous_prompt = os.getcwd(), sys.stdin, config_manager.prompt_password
+        status = 0
+
+        try:
+            os.chdir(request['cwd'])
+            sys.stdin = console.stdin
+            config_manager.prompt_password = console.prompt_password
+
+            with redirect_stdout(console.stdout), redirect_stderr(console.stderr):
+                try:
+                    self.app.reopen_if_settings_changed()
+                    self.app.run(request['argv'])
+                except SystemExit as error:
+                    status = _exit_status(error)
+                except (BrokenPipeError, ConnectionResetError):
+                    raise
+                except Exception:
+                    import traceback
+                    traceback.print_exc()
+                    status = 1
+                finally:
+                    console.stdout.flush()
+                    console.stderr.flush()
+
+        finally:
+            os.chdir(previous_cwd)
+            sys.stdin = previous_stdin
+            config_manager.prompt_password = previous_prompt
+
+        return status
+
+
+def _exit_status(error):
+    """ The exit status for a SystemExit, following the same rules as the interpreter. """
+
+    if error.code is None:
+        return 0
+    if isinstance(error.code, int):
+        return error.code
+    print(error.code, file=sys.stderr)
+    return 1
@@ -0,0 +1,166 @@
+""" The record of what the last `exportnotebooks` run exported, so the next one can export only what has changed. """
+
+import sqlite3
+
+from cloudCacheCLI import CFG_SERVER, CFG_PORT
+
+# Each user's exports are recorded per server (host:port), since IDs and user names are only unique on one server.
+# Bumped whenever the tables change, so that a manifest written by an older version is replaced
+_SCHEMA_VERSION = 2
+
+_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS exported_notebooks (
+        server TEXT NOT NULL,
+        user TEXT NOT NULL,
+        id INTEGER NOT NULL,
+        last_updated TEXT,
+        PRIMARY KEY (server, user, id)
+    );
+    CREATE TABLE IF NOT EXISTS exported_notes (
+        server TEXT NOT NULL,
+        user TEXT NOT NULL,
+        id INTEGER NOT NULL,
+        notebook_id INTEGER NOT NULL,
+        last_updated TEXT,
+        PRIMARY KEY (server, user, id)
+    );
+    CREATE INDEX IF NOT EXISTS exported_notes_by_notebook ON exported_notes (server, user, notebook_id);
+    CREATE TABLE IF NOT EXISTS exports (
+        server TEXT NOT NULL,
+        user TEXT NOT NULL,
+        exported_on TEXT NOT NULL,
+        PRIMARY KEY (server, user)
+    );
+'''
+
+# The tables of a manifest written before _SCHEMA_VERSION, which are dropped. Its exports can't be told apart by
+# server, so the next export is a full one
+_OLD_SCHEMA = '''
+    DROP TABLE IF EXISTS exported_notebooks;
+    DROP TABLE IF EXISTS exported_notes;
+    DROP TABLE IF EXISTS exports;
+'''
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+class ManifestUpdate(object):
+    """ Applies a full listing of the user's notebooks and notes to the manifest, inside a single transaction, telling
+    the export which of them have been added or updated since the last export. Once the listing is exhausted, the
+    notebooks and notes which weren't in it are the ones deleted since the last export. """
+
+    def __init__(self, manifest, user):
+        self.manifest = manifest
+        self.server   = manifest.server
+        self.user     = user
+        self.deleted_notes  = []
+        self.seen_notebooks = set()
+
+        self.connection = manifest.connect()
+        self.connection.execute('BEGIN')
+        self.previous_export = manifest.last_exported(user)
+        self.notebook_versions = dict(self.connection.execute(
+            'SELECT id, last_updated FROM exported_notebooks WHERE server = ? AND user = ?', (self.server, user)))
+
+
+    def apply_notebook(self, notebook):
+        """ Records a notebook from the listing. Returns whether it was added or updated since the last export. """
+
+        nb_id = notebook['id']
+        self.seen_notebooks.add(nb_id)
+
+        changed = _changed(self.notebook_versions, nb_id, notebook.get('last_updated'))
+        if changed:
+            self.connection.execute('INSERT OR REPLACE INTO exported_notebooks VALUES (?, ?, ?, ?)',
+                                    (self.server, self.user, nb_id, notebook.get('last_updated')))
+        return changed
+
+
+    def apply_notes(self, notebook_id, notes):
+        """ Records a notebook's notes from the listing, yielding a (note, whether it was added or updated since the
+        last export) pair for each. Once the notes are exhausted, the notebook's deleted notes are added to
+        self.deleted_notes. """
+
+        note_versions = dict(self.connection.execute(
+            'SELECT id, last_updated FROM exported_notes WHERE server = ? AND user = ? AND notebook_id = ?',
+            (self.server, self.user, notebook_id)))
+        seen_notes = set()
+
+        for note in notes:
+            seen_notes.add(note['id'])
+            changed = _changed(note_versions, note['id'], note.get('last_updated'))
+            if changed:
+                self.connection.execute('INSERT OR REPLACE INTO exported_notes VALUES (?, ?, ?, ?, ?)',
+                                        (self.server, self.user, note['id'], notebook_id, note.get('last_updated')))
+            yield note, changed
+
+        deleted = [note_id for note_id in note_versions if note_id not in seen_notes]
+        self.connection.executemany('DELETE FROM exported_notes WHERE server = ? AND user = ? AND id = ?',
+                                    [(self.server, self.user, note_id) for note_id in deleted])
+        self.deleted_notes.extend((notebook_id, note_id) for note_id in deleted)
+
+
+    def deleted_notebooks(self):
+        """ Forgets the notebooks (and their notes) which weren't in the listing, and returns their IDs. Only call this
+        once the whole listing has been applied. """
+
+        deleted = [nb_id for nb_id in self.notebook_versions if nb_id not in self.seen_notebooks]
+        for nb_id in deleted:
+            self.connection.execute('DELETE FROM exported_notebooks WHERE server = ? AND user = ? AND id = ?',
+                                    (self.server, self.user, nb_id))
+            self.connection.execute('DELETE FROM exported_notes WHERE server = ? AND user = ? AND notebook_id = ?',
+                                    (self.server, self.user, nb_id))
+        return deleted
+
+
+    def finish(self, exported_on):
+        """ Records when this export was taken, and commits it. """
+        self.connection.execute('INSERT OR REPLACE INTO exports VALUES (?, ?, ?)',
+                                (self.server, self.user, exported_on))
+        self.connection.commit()
+
+
+    def abort(self):
+        self.connection.rollback()
+
+
+def _changed(versions, item_id, last_updated):
+    return item_id not in versions or versions[item_id] != last_updated or last_updated is None
+
+
+class ExportManifest(object):
+    """ A SQLite database of the ID and last_updated timestamp of every notebook and note in each user's last export.
+    The notes themselves aren't kept, so it stays small. Only the exports from the configured server are read or
+    written. """
+
+    def __init__(self, config_manager, path):
+        config = config_manager.load_config()
+
+        self.path = path
+        self.server = '{}:{}'.format(config[CFG_SERVER], config[CFG_PORT])
+        self._connection = None
+
+
+    def connect(self):
+        """ Opens the database, creating the schema if needed, on first use. """
+
+        if self._connection is None:
+            # Transactions are managed explicitly, so that a manifest is only updated by an export which finished
+            self._connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            if self._connection.execute('PRAGMA user_version').fetchone()[0] < _SCHEMA_VERSION:
+                self._connection.executescript(_OLD_SCHEMA)
+                self._connection.execute('PRAGMA user_version = {}'.format(_SCHEMA_VERSION))
+            self._connection.executescript(_SCHEMA)
+        return self._connection
+
+
+    def begin_export(self, user):
+        """ Starts applying a fresh listing of the user's notebooks and notes. Returns a ManifestUpdate. """
+        return ManifestUpdate(self, user)
+
+
+    def last_exported(self, user):
+        """ Returns when the user's notebooks were last exported (ISO-8601 string), or None if they never have been. """
+        row = self.connect().execute('SELECT exported_on FROM exports WHERE server = ? AND user = ?',
+                                     (self.server, user)).fetchone()
+        return row[0] if row else None
+
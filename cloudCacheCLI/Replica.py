@@ -0,0 +1,273 @@
+""" The local SQLite replica of the user's notebooks and notes, kept up to date by the `sync` command. """
+
+import sqlite3
+
+import arrow
+
+from cloudCacheCLI import CFG_SERVER, CFG_PORT
+
+# Each user's notebooks and notes are kept per server (host:port), since IDs and user names are only unique on one
+# server. Bumped whenever the tables change, so that a replica written by an older version is replaced
+_SCHEMA_VERSION = 2
+
+_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS notebooks (
+        server TEXT NOT NULL,
+        user TEXT NOT NULL,
+        id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        created_on TEXT,
+        last_updated TEXT,
+        PRIMARY KEY (server, user, id)
+    );
+    CREATE TABLE IF NOT EXISTS notes (
+        server TEXT NOT NULL,
+        user TEXT NOT NULL,
+        id INTEGER NOT NULL,
+        notebook_id INTEGER NOT NULL,
+        key TEXT NOT NULL,
+        value TEXT,
+        created_on TEXT,
+        last_updated TEXT,
+        PRIMARY KEY (server, user, id)
+    );
+    CREATE INDEX IF NOT EXISTS notes_by_notebook ON notes (server, user, notebook_id);
+    CREATE TABLE IF NOT EXISTS syncs (
+        server TEXT NOT NULL,
+        user TEXT NOT NULL,
+        synced_on TEXT NOT NULL,
+        PRIMARY KEY (server, user)
+    );
+'''
+
+# The tables of a replica written before _SCHEMA_VERSION, which are dropped. Its contents can't be told apart by
+# server, so it has to be synced again
+_OLD_SCHEMA = '''
+    DROP TABLE IF EXISTS notes_fts;
+    DROP TABLE IF EXISTS notes;
+    DROP TABLE IF EXISTS notebooks;
+    DROP TABLE IF EXISTS syncs;
+'''
+
+# The full-text index over note keys and values, which reads the notes table for its content rather than keeping its
+# own copy. The triggers keep it in step with every change a sync makes to the notes table, so a sync only re-indexes
+# the notes it actually writes. The 2 and 3 character prefixes of every term are indexed too, since search terms are
+# matched as prefixes, and expanding a short prefix to every term which starts with it is otherwise the slowest part of
+# a query
+_SEARCH_SCHEMA = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(key, value, content='notes', content_rowid='rowid',
+                                                            prefix='2 3');
+    CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON notes BEGIN
+        INSERT INTO notes_fts (rowid, key, value) VALUES (new.rowid, new.key, new.value);
+    END;
+    CREATE TRIGGER IF NOT EXISTS notes_fts_delete AFTER DELETE ON notes BEGIN
+        INSERT INTO notes_fts (notes_fts, rowid, key, value) VALUES ('delete', old.rowid, old.key, old.value);
+    END;
+    CREATE TRIGGER IF NOT EXISTS notes_fts_update AFTER UPDATE ON notes BEGIN
+        INSERT INTO notes_fts (notes_fts, rowid, key, value) VALUES ('delete', old.rowid, old.key, old.value);
+        INSERT INTO notes_fts (rowid, key, value) VALUES (new.rowid, new.key, new.value);
+    END;
+'''
+
+# How much more a match in a note's key counts towards its rank than a match in its value
+KEY_WEIGHT = 5.0
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+class ReplicaSync(object):
+    """ Applies a full listing of the user's notebooks and notes to the replica, inside a single transaction, writing
+    only the rows whose last_updated timestamp has changed. Notebooks and notes which weren't in the listing are
+    deleted when the sync is finished. """
+
+    def __init__(self, replica, user):
+        self.replica = replica
+        self.server  = replica.server
+        self.user    = user
+        self.counts  = {'added': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+        self.seen_notebooks = set()
+
+        self.connection = replica.connect()
+        self.connection.execute('BEGIN')
+        self.notebook_versions = dict(self.connection.execute(
+            'SELECT id, last_updated FROM notebooks WHERE server = ? AND user = ?', (self.server, user)))
+
+
+    def _count(self, versions, item_id, last_updated):
+        """ Counts an item as added, updated or unchanged. Returns whether it needs to be written. """
+
+        if item_id not in versions:
+            self.counts['added'] += 1
+        elif versions[item_id] != last_updated or last_updated is None:
+            self.counts['updated'] += 1
+        else:
+            self.counts['unchanged'] += 1
+            return False
+        return True
+
+
+    def apply_notebook(self, notebook, notes):
+        """ Applies one notebook and all its notes from the listing. """
+
+        nb_id = notebook['id']
+        self.seen_notebooks.add(nb_id)
+
+        if self._count(self.notebook_versions, nb_id, notebook.get('last_updated')):
+            self.connection.execute('INSERT OR REPLACE INTO notebooks VALUES (?, ?, ?, ?, ?, ?)',
+                                    (self.server, self.user, nb_id, notebook['name'], notebook.get('created_on'),
+                                     notebook.get('last_updated')))
+
+        note_versions = dict(self.connection.execute(
+            'SELECT id, last_updated FROM notes WHERE server = ? AND user = ? AND notebook_id = ?',
+            (self.server, self.user, nb_id)))
+        seen_notes = set()
+
+        for note in notes:
+            seen_notes.add(note['id'])
+            if self._count(note_versions, note['id'], note.get('last_updated')):
+                self.connection.execute('INSERT OR REPLACE INTO notes VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                        (self.server, self.user, note['id'], nb_id, note['key'], note['value'],
+                                         note.get('created_on'), note.get('last_updated')))
+
+        deleted = [(self.server, self.user, note_id) for note_id in note_versions if note_id not in seen_notes]
+        self.connection.executemany('DELETE FROM notes WHERE server = ? AND user = ? AND id = ?', deleted)
+        self.counts['deleted'] += len(deleted)
+
+
+    def finish(self):
+        """ Deletes the notebooks (and their notes) which weren't in the listing, and commits the sync. """
+
+        for nb_id in self.notebook_versions:
+            if nb_id not in self.seen_notebooks:
+                self.counts['deleted'] += 1
+                self.connection.execute('DELETE FROM notebooks WHERE server = ? AND user = ? AND id = ?',
+                                        (self.server, self.user, nb_id))
+                self.connection.execute('DELETE FROM notes WHERE server = ? AND user = ? AND notebook_id = ?',
+                                        (self.server, self.user, nb_id))
+
+        self.connection.execute('INSERT OR REPLACE INTO syncs VALUES (?, ?, ?)',
+                                (self.server, self.user, arrow.utcnow().isoformat()))
+        self.connection.commit()
+
+
+    def abort(self):
+        self.connection.rollback()
+
+
+class Replica(object):
+    """ A SQLite database mirroring each user's notebooks and notes, so they can be browsed instantly and offline. Only
+    those of the configured server are read or written. """
+
+    def __init__(self, config_manager, path):
+        config = config_manager.load_config()
+
+        self.path = path
+        self.server = '{}:{}'.format(config[CFG_SERVER], config[CFG_PORT])
+        self.searchable = False
+        self._connection = None
+
+
+    def connect(self):
+        """ Opens the database, creating the schema if needed, on first use. """
+
+        if self._connection is None:
+            # Transactions are managed explicitly, so that a whole sync is applied atomically
+            self._connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            if self._connection.execute('PRAGMA user_version').fetchone()[0] < _SCHEMA_VERSION:
+                self._connection.executescript(_OLD_SCHEMA)
+                self._connection.execute('PRAGMA user_version = {}'.format(_SCHEMA_VERSION))
+            self._connection.executescript(_SCHEMA)
+            self.searchable = self._create_search_index(self._connection)
+        return self._connection
+
+
+    def _create_search_index(self, connection):
+        """ Creates the full-text index, and fills it from any notes synced before it existed. Returns False if this
+        Python's SQLite was built without FTS5, in which case notes can't be searched. """
+
+        # INSERT OR REPLACE only fires the delete trigger for the row it replaces when triggers may be recursive
+        connection.execute('PRAGMA recursive_triggers = ON')
+
+        existed = connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'notes_fts'").fetchone()
+        try:
+            connection.executescript(_SEARCH_SCHEMA)
+        except sqlite3.OperationalError:
+            return False
+
+        if not existed:
+            connection.execute("INSERT INTO notes_fts (notes_fts) VALUES ('rebuild')")
+        return True
+
+
+    def begin_sync(self, user):
+        """ Starts applying a fresh listing of the user's notebooks and notes. Returns a ReplicaSync. """
+        return ReplicaSync(self, user)
+
+
+    def last_synced(self, user):
+        """ Returns when the user's replica was last synced (ISO-8601 string), or None if it has never been synced. """
+        row = self.connect().execute('SELECT synced_on FROM syncs WHERE server = ? AND user = ?',
+                                     (self.server, user)).fetchone()
+        return row[0] if row else None
+
+
+    def notebooks(self, user):
+        """ Returns the user's notebooks in the shape of a /notebooks response, with a note_count in place of the notes
+        themselves. """
+
+        rows = self.connect().execute('''SELECT nb.id, nb.name, nb.created_on, nb.last_updated, COUNT(n.id)
+                                         FROM notebooks nb
+                                         LEFT JOIN notes n
+                                           ON n.server = nb.server AND n.user = nb.user AND n.notebook_id = nb.id
+                                         WHERE nb.server = ? AND nb.user = ? GROUP BY nb.id ORDER BY nb.id''',
+                                      (self.server, user))
+        keys = ('id', 'name', 'created_on', 'last_updated', 'note_count')
+        return {'notebooks': [dict(zip(keys, row)) for row in rows]}
+
+
+    def notes(self, user, notebook_id):
+        """ Returns a notebook's notes in the shape of a /notebooks/{id}/notes response, or None if the notebook isn't
+        in the replica. """
+
+        connection = self.connect()
+        row = connection.execute('SELECT name FROM notebooks WHERE server = ? AND user = ? AND id = ?',
+                                 (self.server, user, notebook_id)).fetchone()
+        if row is None:
+            return None
+
+        rows = connection.execute('SELECT id, key, value, created_on, last_updated FROM notes '
+                                  'WHERE server = ? AND user = ? AND notebook_id = ? ORDER BY id',
+                                  (self.server, user, notebook_id))
+        keys = ('id', 'key', 'value', 'created_on', 'last_updated')
+        return {'notebook': row[0], 'notes': [dict(zip(keys, note)) for note in rows]}
+
+
+    def note(self, user, notebook_id, note_id):
+        """ Returns a single note in the shape of a /notebooks/{id}/notes/{id} response, or None if it isn't in the
+        replica. """
+
+        row = self.connect().execute('SELECT id, key, value, created_on, last_updated FROM notes '
+                                     'WHERE server = ? AND user = ? AND notebook_id = ? AND id = ?',
+                                     (self.server, user, notebook_id, note_id)).fetchone()
+        return dict(zip(('id', 'key', 'value', 'created_on', 'last_updated'), row)) if row else None
+
+
+    def search(self, user, query, limit, notebook_id=None):
+        """ Returns the user's notes matching the FTS5 query, best matches first, as dictionaries of the notebook ID
+        and name, the note ID and key, and a snippet of the note's value around the matched terms. """
+
+        sql = '''SELECT n.notebook_id, nb.name, n.id, n.key, snippet(notes_fts, 1, '[', ']', '…', 12)
+                 FROM notes_fts
+                 JOIN notes n ON n.rowid = notes_fts.rowid
+                 JOIN notebooks nb ON nb.server = n.server AND nb.user = n.user AND nb.id = n.notebook_id
+                 WHERE notes_fts MATCH ? AND n.server = ? AND n.user = ?'''
+        params = [query, self.server, user]
+
+        if notebook_id is not None:
+            sql += ' AND n.notebook_id = ?'
+            params.append(notebook_id)
+
+        sql += ' ORDER BY bm25(notes_fts, ?, 1.0) LIMIT ?'
+        params.extend([KEY_WEIGHT, limit])
+
+        keys = ('notebook_id', 'notebook', 'note_id', 'key', 'snippet')
+        return [dict(zip(keys, row)) for row in self.connect().execute(sql, params)]
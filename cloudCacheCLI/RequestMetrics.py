@@ -0,0 +1,164 @@
+""" The on-disk record of every HTTP request the CLI makes, which `cc stats` summarizes. """
+
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from cloudCacheCLI import CFG_SERVER, CFG_PORT, CFG_METRICS_RETENTION
+
+# How many days requests are kept for, if not configured otherwise. 0 stops requests being recorded
+DEFAULT_RETENTION_DAYS = 30
+
+# Recorded requests are written out once this many have built up, even if the command is still running
+FLUSH_EVERY = 1000
+
+# Each endpoint's path, and the template it's recorded as. Names, IDs and API keys are left out, so that requests to
+# the same endpoint are grouped together, and no credentials are written to disk
+ENDPOINT_TEMPLATES = [
+    (re.compile(r'^/users/[^/]+$'), '/users/{username}'),
+    (re.compile(r'^/access/[^/]+/[^/]+$'), '/access/{username}/{api_key}'),
+    (re.compile(r'^/notebooks/\d+$'), '/notebooks/{notebook_id}'),
+    (re.compile(r'^/notebooks/\d+/notes$'), '/notebooks/{notebook_id}/notes'),
+    (re.compile(r'^/notebooks/\d+/notes/\d+$'), '/notebooks/{notebook_id}/notes/{note_id}'),
+]
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+def endpoint_template(path):
+    """ The endpoint template of a request path, without its query string. Numeric segments of a path which isn't a
+    known endpoint are replaced with `{id}`. """
+
+    path = path.split('?', 1)[0].rstrip('/') or '/'
+    for pattern, template in ENDPOINT_TEMPLATES:
+        if pattern.match(path):
+            return template
+    return '/'.join('{id}' if segment.isdigit() else segment for segment in path.split('/'))
+
+
+class RequestMetrics(object):
+    """ Records the method, endpoint, status (or error), payload sizes and latency of each request in a SQLite
+    database, along with the command which made it and the server it was sent to. Requests are held in memory and
+    written out together when the command finishes, so recording them costs the requests themselves next to nothing.
+    Requests older than the retention period are dropped as new ones are written, so the database doesn't grow
+    without bound. """
+
+    def __init__(self, config_manager, path):
+        config = config_manager.load_config()
+
+        self.path           = path
+        self.server         = '{}:{}'.format(config[CFG_SERVER], config[CFG_PORT])
+        self.retention_days = int(config.get(CFG_METRICS_RETENTION, DEFAULT_RETENTION_DAYS))
+
+        # The command requests are attributed to, unless the thread making them says otherwise (see attributed_to)
+        self.command = None
+
+        self.lock        = threading.Lock()
+        self._local      = threading.local()
+        self._pending    = []
+        self._connection = None
+
+
+    @property
+    def enabled(self):
+        return self.retention_days > 0
+
+
+    def _connect(self):
+        """ Opens the database on first use. Like the response cache, losing the last few records in a crash is an
+        acceptable price for cheap writes. """
+
+        if self._connection is None:
+            import sqlite3
+
+            self._connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=OFF')
+            self._connection.execute('''CREATE TABLE IF NOT EXISTS requests (
+                                          recorded_at REAL NOT NULL,
+                                          server TEXT NOT NULL,
+                                          command TEXT,
+                                          method TEXT NOT NULL,
+                                          endpoint TEXT NOT NULL,
+                                          status INTEGER,
+                                          error TEXT,
+                                          request_bytes INTEGER,
+                                          response_bytes INTEGER,
+                                          latency REAL NOT NULL)''')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS requests_recorded_at ON requests (recorded_at)')
+        return self._connection
+
+
+    @contextmanager
+    def attributed_to(self, command):
+        """ Attributes the requests made on the current thread to `command`, for as long as the block runs. """
+
+        previous = getattr(self._local, 'command', None)
+        self._local.command = command
+        try:
+            yield
+        finally:
+            self._local.command = previous
+
+
+    def record(self, method, path, status, error, request_bytes, response_bytes, latency):
+        """ Records a request to path, which got a response with the given status, or failed with the named error. The
+        latency is in seconds, and response_bytes may be None if the size of the response isn't known. """
+
+        if not self.enabled:
+            return
+
+        command = getattr(self._local, 'command', None) or self.command
+        row = (time.time(), self.server, command, method, endpoint_template(path), status, error, request_bytes,
+               response_bytes, latency)
+
+        with self.lock:
+            self._pending.append(row)
+            if len(self._pending) >= FLUSH_EVERY:
+                self._write_pending()
+
+
+    def flush(self):
+        """ Writes out the requests recorded since the last flush, and drops those older than the retention period. """
+
+        with self.lock:
+            if self._pending:
+                self._write_pending()
+
+
+    def _write_pending(self):
+        """ Call with the lock held. A database which can't be written to, perhaps because another `cc` has it locked
+        for longer than the timeout, costs these records rather than failing the command which made the requests. """
+
+        import sqlite3
+
+        rows, self._pending = self._pending, []
+        try:
+            connection = self._connect()
+            connection.executemany('INSERT INTO requests VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            connection.execute('DELETE FROM requests WHERE recorded_at < ?',
+                               (time.time() - self.retention_days * 86400,))
+            connection.commit()
+        except sqlite3.Error:
+            pass
+
+
+    def requests(self, since, server=None, command=None):
+        """ Returns (recorded_at, command, method, endpoint, status, error, request_bytes, response_bytes, latency) of
+        each request made since the given POSIX timestamp, oldest first, optionally only those to the given server, or
+        made by the given command. """
+
+        self.flush()
+
+        query = ('SELECT recorded_at, command, method, endpoint, status, error, request_bytes, response_bytes, latency '
+                 'FROM requests WHERE recorded_at >= ?')
+        params = [since]
+        if server is not None:
+            query += ' AND server = ?'
+            params.append(server)
+        if command is not None:
+            query += ' AND command = ?'
+            params.append(command)
+
+        with self.lock:
+            return self._connect().execute(query + ' ORDER BY recorded_at', params).fetchall()
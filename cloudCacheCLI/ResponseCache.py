@@ -0,0 +1,214 @@
+""" The on-disk cache of GET responses. """
+
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+from cloudCacheCLI import CFG_CACHE_TTL, CFG_CACHE_SIZE
+
+# How long (seconds) a cached response is served without asking the server, and how many responses are kept, if not
+# configured otherwise
+DEFAULT_TTL = 60
+DEFAULT_MAX_ENTRIES = 500
+
+# Responses larger than this many bytes aren't worth keeping around
+MAX_BODY_SIZE = 8 * 1024 * 1024
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+class CachedResponse(object):
+    """ Stands in for a requests.Response when a GET is served from the cache, exposing the parts commands use. """
+
+    def __init__(self, entry):
+        self.status_code = 200
+        self.reason      = 'OK (cached)'
+        self.content     = entry.body
+        self.text        = entry.body.decode('utf-8')
+        self.headers     = {}
+        self.from_cache  = True
+
+
+    def __bool__(self):
+        return True
+
+
+class CacheEntry(object):
+    """ A single cached response, along with the validators needed to revalidate it. """
+
+    def __init__(self, body, etag, last_modified, stored_at):
+        self.body          = body
+        self.etag          = etag
+        self.last_modified = last_modified
+        self.stored_at     = stored_at
+
+
+    def is_fresh(self, ttl):
+        return time.time() - self.stored_at < ttl
+
+
+    def validation_headers(self):
+        """ The conditional request headers which ask the server to reply 304 Not Modified if nothing changed. """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache(object):
+    """ Caches successful GET responses in a SQLite database, keyed by user and URL. Entries are served directly while
+    younger than the TTL, revalidated with ETag/Last-Modified after that, and the least recently used entries are
+    evicted once there are more than max_entries. A TTL of 0 revalidates every time, and max_entries of 0 disables the
+    cache altogether. """
+
+    def __init__(self, config_manager, path):
+        config = config_manager.load_config()
+
+        self.path        = path
+        self.ttl         = int(config.get(CFG_CACHE_TTL, DEFAULT_TTL))
+        self.max_entries = int(config.get(CFG_CACHE_SIZE, DEFAULT_MAX_ENTRIES))
+        self.lock        = threading.Lock()
+        self._connection = None
+
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+
+    def _connect(self):
+        """ Opens the database on first use. The cache is disposable, so durability is traded away for speed. """
+
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=OFF')
+            self._connection.execute('''CREATE TABLE IF NOT EXISTS responses (
+                                          user TEXT NOT NULL,
+                                          url TEXT NOT NULL,
+                                          body BLOB NOT NULL,
+                                          etag TEXT,
+                                          last_modified TEXT,
+                                          stored_at REAL NOT NULL,
+                                          last_used REAL NOT NULL,
+                                          PRIMARY KEY (user, url))''')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)')
+        return self._connection
+
+
+    def get(self, user, url):
+        """ Returns the CacheEntry for the user and URL, or None if there isn't one. Marks it as recently used. """
+
+        if not self.enabled:
+            return None
+
+        with self.lock:
+            try:
+                connection = self._connect()
+                row = connection.execute('SELECT body, etag, last_modified, stored_at FROM responses '
+                                         'WHERE user = ? AND url = ?', (user, url)).fetchone()
+                if row is None:
+                    return None
+
+                connection.execute('UPDATE responses SET last_used = ? WHERE user = ? AND url = ?',
+                                   (time.time(), user, url))
+                connection.commit()
+                return CacheEntry(bytes(row[0]), row[1], row[2], row[3])
+
+            except sqlite3.Error as error:
+                self._on_error(error)
+                return None
+
+
+    def store(self, user, url, response):
+        """ Stores a successful response, then evicts the least recently used entries beyond max_entries. """
+
+        if not self.enabled or len(response.content) > MAX_BODY_SIZE:
+            return
+
+        now = time.time()
+        with self.lock:
+            try:
+                connection = self._connect()
+                connection.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                   (user, url, sqlite3.Binary(response.content), response.headers.get('ETag'),
+                                    response.headers.get('Last-Modified'), now, now))
+                connection.execute('DELETE FROM responses WHERE rowid NOT IN '
+                                   '(SELECT rowid FROM responses ORDER BY last_used DESC LIMIT ?)',
+                                   (self.max_entries,))
+                connection.commit()
+            except sqlite3.Error as error:
+                self._on_error(error)
+
+
+    def touch(self, user, url):
+        """ Restarts the TTL of an entry which the server has just confirmed is unchanged. """
+
+        with self.lock:
+            try:
+                connection = self._connect()
+                connection.execute('UPDATE responses SET stored_at = ? WHERE user = ? AND url = ?',
+                                   (time.time(), user, url))
+                connection.commit()
+            except sqlite3.Error as error:
+                self._on_error(error)
+
+
+    def invalidate(self, url):
+        """ Drops every entry, for any user, which a change to the given URL may have made stale: the URL itself, any
+        URL beneath it, and every collection above it. For example, a change to /notebooks/5/notes invalidates
+        /notebooks/5/notes/9, /notebooks/5/notes, /notebooks/5 and /notebooks. Query strings are ignored. """
+
+        if not self.enabled:
+            return
+
+        parts = urlsplit(url)
+        root = '{}://{}'.format(parts.scheme, parts.netloc)
+        segments = [segment for segment in parts.path.split('/') if segment]
+        paths = [root + '/' + '/'.join(segments[:end]) for end in range(len(segments), 0, -1)]
+
+        if not paths:
+            return
+
+        with self.lock:
+            try:
+                connection = self._connect()
+                for path in paths:
+                    connection.execute('DELETE FROM responses WHERE url = ? OR substr(url, 1, ?) = ?',
+                                       (path, len(path) + 1, path + '?'))
+                connection.execute('DELETE FROM responses WHERE substr(url, 1, ?) = ?',
+                                   (len(paths[0]) + 1, paths[0] + '/'))
+                connection.commit()
+            except sqlite3.Error as error:
+                self._on_error(error)
+
+
+    def _on_error(self, error):
+        """ The cache is disposable, so a database error only ever costs a miss. Being locked by another process is
+        temporary, but a file which isn't a readable database never will be, so it's deleted to be recreated on next
+        use. Must be called with the lock held. """
+
+        if self._connection is not None:
+            try:
+                self._connection.rollback()
+            except sqlite3.Error:
+                pass
+
+        if isinstance(error, sqlite3.OperationalError):
+            return
+
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except sqlite3.Error:
+                pass
+            self._connection = None
+
+        for path in (self.path, self.path + '-wal', self.path + '-shm'):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
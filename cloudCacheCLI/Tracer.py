@@ -0,0 +1,231 @@
+""" Timing of where a command's time goes, for the global `--trace` option.
+
+While a Tracer is active, span() times a block of code: loading the config, an HTTP request, decoding a response,
+rendering a listing, and so on. Spans may nest, and may be opened on any thread, so a bulk command's worker threads
+each record their own requests. When the command finishes, the tracer prints a breakdown of the time spent in each
+phase, and can write every span out as a Chrome trace-event file, to be opened in chrome://tracing or Perfetto.
+
+When no tracer is active, span() hands back a shared no-op span, so tracing costs nothing but that call when it's off.
+This module is imported on every `cc` call, so it must stay free of anything but the standard library.
+"""
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# The categories of span. Each phase of running a command, and each HTTP request
+CATEGORY_PHASE = 'phase'
+CATEGORY_HTTP  = 'http'
+
+# The tracer of the command being run, if it's being traced
+_active = None
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+def span(name, category=CATEGORY_PHASE, **args):
+    """ Returns a context manager which times the block it wraps as a span named `name`, along with any args, if a
+    command is being traced. Further args can be added with the span's annotate() while it's open. """
+
+    tracer = _active
+    if tracer is None:
+        return _NO_SPAN
+    return _Span(tracer, name, category, args)
+
+
+def tracing():
+    """ Whether a command is being traced. """
+    return _active is not None
+
+
+@contextmanager
+def traced(title, trace_file=None, started_at=None):
+    """ Traces the block it wraps, titled `title`. When it finishes, prints the breakdown of where the time went, and
+    writes the trace to trace_file if given. """
+
+    tracer = Tracer(started_at).start()
+    try:
+        yield tracer
+    finally:
+        tracer.stop()
+        tracer.report(title)
+        if trace_file is not None:
+            tracer.write_chrome_trace(trace_file)
+            print('Wrote the trace to {}.'.format(trace_file), file=sys.stderr)
+
+
+class _NoSpan(object):
+    """ The span handed out when nothing is being traced. """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def annotate(self, **args):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span(object):
+
+    __slots__ = ('tracer', 'name', 'category', 'args', 'start', 'child_time')
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.child_time = 0.0
+
+
+    def __enter__(self):
+        self.tracer._open_spans().append(self)
+        self.start = time.perf_counter()
+        return self
+
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        self.tracer._close(self, end)
+        return False
+
+
+    def annotate(self, **args):
+        """ Adds args to the span, such as the status of the response to a request. """
+        self.args.update(args)
+
+
+class Tracer(object):
+    """ Records the spans of a single command. Use start() and stop() to make it the active tracer. """
+
+    def __init__(self, started_at=None):
+        """ If the time the process started at (from time.perf_counter) is given, the time up to now, which is mostly
+        spent importing the CLI, is recorded as the `imports` phase. """
+
+        self.origin = started_at if started_at is not None else time.perf_counter()
+        self.finished_at = None
+        self.main_thread = threading.get_ident()
+
+        # (name, category, thread ID, start, duration, self duration, args) of every finished span
+        self.spans = []
+        self.thread_names = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        if started_at is not None:
+            self._record('imports', CATEGORY_PHASE, started_at, time.perf_counter(), 0.0, {})
+
+
+    def start(self):
+        global _active
+        _active = self
+        return self
+
+
+    def stop(self):
+        global _active
+        if _active is self:
+            _active = None
+        self.finished_at = time.perf_counter()
+
+
+    def _open_spans(self):
+        """ The spans open on the current thread, innermost last. """
+        try:
+            return self._local.open_spans
+        except AttributeError:
+            self._local.open_spans = []
+            return self._local.open_spans
+
+
+    def _close(self, closed_span, end):
+        open_spans = self._open_spans()
+        open_spans.pop()
+
+        duration = end - closed_span.start
+        if open_spans:
+            open_spans[-1].child_time += duration
+
+        self._record(closed_span.name, closed_span.category, closed_span.start, end, closed_span.child_time,
+                     closed_span.args)
+
+
+    def _record(self, name, category, start, end, child_time, args):
+        thread = threading.current_thread()
+        duration = end - start
+
+        with self._lock:
+            self.thread_names.setdefault(thread.ident, thread.name)
+            self.spans.append((name, category, thread.ident, start, duration, duration - child_time, args))
+
+
+    @property
+    def wall_time(self):
+        return (self.finished_at or time.perf_counter()) - self.origin
+
+
+    def phases(self):
+        """ The calls to, and total, self and longest time spent in, each phase, in the order they were first entered.
+        A span's self time excludes the spans nested within it, so the self times of the spans of the main thread add
+        up to the time accounted for. """
+
+        phases = {}
+        for name, category, _, _, duration, self_duration, _ in sorted(self.spans, key=lambda recorded: recorded[3]):
+            phase = phases.setdefault(name, {'phase': name, 'category': category, 'calls': 0, 'total': 0.0,
+                                             'self': 0.0, 'longest': 0.0})
+            phase['calls'] += 1
+            phase['total'] += duration
+            phase['self'] += self_duration
+            phase['longest'] = max(phase['longest'], duration)
+        return list(phases.values())
+
+
+    def report(self, title, stream=None):
+        """ Prints the breakdown of each phase's time, the time not accounted for by any span, and the slowest HTTP
+        request. Written to stderr by default, so it never mixes with output meant for a script. """
+
+        stream = stream if stream is not None else sys.stderr
+        wall_ms = self.wall_time * 1000
+
+        traced = sum(self_duration for _, _, thread_id, _, _, self_duration, _ in self.spans
+                     if thread_id == self.main_thread)
+
+        stream.write('\nTrace of `{}` ({:.1f} ms):\n'.format(title, wall_ms))
+        stream.write('  {:<24} {:>7} {:>11} {:>11} {:>11}\n'.format('Phase', 'Calls', 'Total ms', 'Self ms',
+                                                                    'Longest ms'))
+        for phase in self.phases():
+            stream.write('  {:<24} {:>7} {:>11.1f} {:>11.1f} {:>11.1f}\n'.format(
+                phase['phase'], phase['calls'], phase['total'] * 1000, phase['self'] * 1000, phase['longest'] * 1000))
+        stream.write('  {:<24} {:>7} {:>11} {:>11.1f}\n'.format('(not traced)', '', '',
+                                                                max(0.0, wall_ms - traced * 1000)))
+
+        requests = [recorded for recorded in self.spans if recorded[1] == CATEGORY_HTTP]
+        if requests:
+            threads = len(set(recorded[2] for recorded in requests))
+            name, _, _, _, duration, _, args = max(requests, key=lambda recorded: recorded[4])
+            stream.write('  {} HTTP requests on {} thread(s). The slowest was {} {} ({:.1f} ms).\n'.format(
+                len(requests), threads, name.split()[-1], args.get('url', ''), duration * 1000))
+
+
+    def write_chrome_trace(self, path):
+        """ Writes every span to path in the Chrome trace-event format, with times in microseconds since the process
+        (or the trace) started. """
+
+        import json
+
+        pid = os.getpid()
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread_id, 'args': {'name': thread_name}}
+                  for thread_id, thread_name in self.thread_names.items()]
+
+        for name, category, thread_id, start, duration, _, args in self.spans:
+            events.append({'name': name, 'cat': category, 'ph': 'X', 'pid': pid, 'tid': thread_id,
+                           'ts': round((start - self.origin) * 1e6, 1), 'dur': round(duration * 1e6, 1),
+                           'args': args})
+
+        with open(path, 'w') as trace_file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, trace_file)
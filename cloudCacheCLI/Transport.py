@@ -0,0 +1,332 @@
+""" The HTTP transport shared by every command. """
+
+import random
+import sys
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException, ConnectionError, ConnectTimeout, Timeout
+from requests.packages.urllib3.exceptions import NewConnectionError
+
+from cloudCacheCLI import CFG_SERVER, CFG_PORT, CFG_ACCESS_TOKEN, CFG_TOKEN_EXPIRES, CFG_POOL_SIZE, CFG_TOKEN_MARGIN,\
+    CFG_CONNECT_TIMEOUT, CFG_READ_TIMEOUT, CFG_RETRIES, CFG_BREAKER_THRESHOLD, CFG_BREAKER_COOLDOWN
+from cloudCacheCLI.Tracer import CATEGORY_HTTP, span
+from cloudCacheCLI.Utilities.JsonCodec import dumps_bytes
+
+# The defaults for each of the transport's configuration options:
+#   the number of keep-alive connections held open to the cloudCache server,
+#   how many seconds before the access token expires it is renewed,
+#   how many seconds to wait to connect to the server, and then for it to respond,
+#   how many times a failed request is retried,
+#   and how many consecutive failed attempts open the circuit breaker (0 never does), and for how many seconds
+DEFAULT_POOL_SIZE         = 10
+DEFAULT_TOKEN_MARGIN      = 60
+DEFAULT_CONNECT_TIMEOUT   = 5
+DEFAULT_READ_TIMEOUT      = 30
+DEFAULT_RETRIES           = 3
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_COOLDOWN  = 30
+
+# The delay (seconds) before the first retry, which doubles for each retry after it, and the most it can grow to. The
+# actual delay is a random fraction of this, so that many workers retrying at once don't all hit the server together
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY  = 8
+
+# Repeating these methods has the same effect as making the request once, so they're always safe to retry. Other
+# methods (our PUTs create things) are only retried when the request never reached the server
+IDEMPOTENT_METHODS = ('GET', 'DELETE')
+
+# Responses which say the server (or a proxy in front of it) is temporarily unable to handle the request
+UNAVAILABLE_STATUSES = (502, 503, 504)
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+class TokenRefreshError(RequestException):
+    """ Raised when a request needed a new access token, and one couldn't be obtained. """
+    pass
+
+
+class ServerUnavailableError(ConnectionError):
+    """ Raised when a request can't reach the server, once any retries have been used up, or straight away while the
+    circuit breaker is open. """
+    pass
+
+
+class CircuitBreaker(object):
+    """ Counts consecutive failed requests. Once there have been `threshold` of them, the server is assumed to be down,
+    and requests fail straight away rather than each waiting for a timeout. After `cooldown` seconds a single trial
+    request is let through: if it succeeds, requests flow again, and if not, the breaker stays open for another
+    cooldown. A threshold of 0 disables the breaker. """
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown  = cooldown
+        self.failures  = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+
+    def before_request(self):
+        """ Raises ServerUnavailableError if the breaker is open, and this request isn't the trial request. """
+
+        with self.lock:
+            if self.opened_at is None:
+                return
+
+            remaining = self.cooldown - (time.time() - self.opened_at)
+            if remaining > 0 or self.trial_in_flight:
+                message = 'The cloudCache server appears to be down after {} failed requests in a row.'
+                message += ' Not trying again for another {:.0f} seconds.'.format(max(remaining, 0))
+                raise ServerUnavailableError(message.format(self.failures))
+
+            self.trial_in_flight = True
+
+
+    def record_success(self):
+        with self.lock:
+            self.failures  = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.threshold and self.failures >= self.threshold:
+                self.opened_at = time.time()
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+class Transport(object):
+    """ Owns a single requests.Session for the lifetime of the application, so that every API call reuses a pooled
+    keep-alive connection to the cloudCache server rather than opening a new TCP connection per request. """
+
+    def __init__(self, config_manager, metrics=None):
+        """ If a RequestMetrics is given, every request sent is recorded in it. """
+
+        config = config_manager.load_config()
+
+        self.config_manager = config_manager
+        self.metrics = metrics
+        self.base_url     = 'http://{}:{}'.format(config[CFG_SERVER], config[CFG_PORT])
+        self.pool_size    = int(config.get(CFG_POOL_SIZE, DEFAULT_POOL_SIZE))
+        self.token_margin = int(config.get(CFG_TOKEN_MARGIN, DEFAULT_TOKEN_MARGIN))
+        self.timeout      = (int(config.get(CFG_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT)),
+                             int(config.get(CFG_READ_TIMEOUT, DEFAULT_READ_TIMEOUT)))
+        self.retries      = int(config.get(CFG_RETRIES, DEFAULT_RETRIES))
+        self.breaker      = CircuitBreaker(int(config.get(CFG_BREAKER_THRESHOLD, DEFAULT_BREAKER_THRESHOLD)),
+                                           int(config.get(CFG_BREAKER_COOLDOWN, DEFAULT_BREAKER_COOLDOWN)))
+
+        self.session = requests.Session()
+        self._mount_pool()
+        self.session.headers.update({'Content-Type': 'application/json'})
+
+        self.access_token = None
+        self.token_expires_at = None
+        self._token_lock = threading.Lock()
+
+        if CFG_ACCESS_TOKEN in config:
+            self.set_access_token(config[CFG_ACCESS_TOKEN], config.get(CFG_TOKEN_EXPIRES))
+
+
+    def _mount_pool(self):
+        """ Mounts a connection pool of the current pool size for both HTTP and HTTPS. """
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+
+    def ensure_pool_size(self, size):
+        """ Grows the connection pool to at least `size` connections, so that many threads can share this transport
+        without connections being discarded. Never shrinks the pool. """
+        if size > self.pool_size:
+            self.pool_size = size
+            self._mount_pool()
+
+
+    def set_access_token(self, access_token, expires_on=None):
+        """ Sets the access token sent as a default header on every subsequent request, and when it expires (an
+        ISO-8601 string), if known. """
+
+        self.token_expires_at = _timestamp(expires_on) if expires_on else None
+        self.access_token = access_token
+        self.session.headers['access-token'] = access_token
+
+
+    def token_expiring(self, margin=None):
+        """ Whether the access token expires within `margin` seconds (the configured refresh margin by default). """
+        margin = self.token_margin if margin is None else margin
+        return self.token_expires_at is not None and self.token_expires_at - time.time() <= margin
+
+
+    def refresh_access_token(self, rejected_token=None, margin=None):
+        """ Gets a new access token if the server rejected `rejected_token` and it's still the current one, or if the
+        current one expires within `margin` seconds. Threads needing a new token at the same time share a single
+        refresh: the first one fetches it, and the rest wait for it and then find there's nothing left to do. The
+        config manager does the same across processes. Raises TokenRefreshError if a new token couldn't be obtained. """
+
+        margin = self.token_margin if margin is None else margin
+
+        with self._token_lock:
+            if rejected_token is not None and rejected_token != self.access_token:
+                return
+            if rejected_token is None and not self.token_expiring(margin):
+                return
+
+            error = self.config_manager.refresh_access_token(self, margin, rejected_token)
+            if error is not None:
+                raise TokenRefreshError(error)
+
+
+    def request(self, method, url, body=None, stream=False, headers=None, authenticate=True):
+        """ Performs an HTTP request through the pooled session. If a body (dictionary) is supplied, it is dumped to
+        JSON and sent as the request body. If stream is True, the response body isn't downloaded up front, and must be
+        read from response.raw (and the response closed) by the caller. Any headers supplied are sent in addition to
+        the default headers. Returns the requests.Response object.
+
+        Unless `authenticate` is False (for the calls which obtain credentials in the first place), an access token
+        which is about to expire is renewed before the request is sent, and a request the server rejects with 401 is
+        retried once with a new token. So a long-running job never fails just because its token expired. """
+
+        if authenticate and self.token_expiring():
+            self.refresh_access_token()
+
+        token = self.access_token
+        response = self._send_with_retries(method, url, body, stream, headers)
+
+        if authenticate and token is not None and response.status_code == 401:
+            response.close()
+            self.refresh_access_token(rejected_token=token)
+            response = self._send_with_retries(method, url, body, stream, headers)
+
+        return response
+
+
+    def _send_with_retries(self, method, url, body, stream, headers):
+        """ Sends the request, retrying with jittered exponential backoff when the server can't be reached, times out,
+        or says it's unavailable. Requests which aren't idempotent are only retried if they never reached the server.
+        Each retry is reported on stderr. Raises ServerUnavailableError once the retries are used up, or if the circuit
+        breaker is open. """
+
+        idempotent = method in IDEMPOTENT_METHODS
+        attempt = 0
+
+        while True:
+            self.breaker.before_request()
+
+            try:
+                response = self._send(method, url, body, stream, headers)
+            except (ConnectionError, Timeout) as error:
+                self.breaker.record_failure()
+                retryable = idempotent or _failed_before_sending(error)
+                problem = error.__class__.__name__
+                if not retryable or attempt >= self.retries:
+                    message = '{} {} failed after {} attempt(s): {}'.format(method, url, attempt + 1, problem)
+                    raise ServerUnavailableError(message) from error
+            else:
+                if response.status_code not in UNAVAILABLE_STATUSES:
+                    self.breaker.record_success()
+                    return response
+
+                self.breaker.record_failure()
+                if not idempotent or attempt >= self.retries:
+                    return response
+                response.close()
+                problem = 'HTTP {}'.format(response.status_code)
+
+            attempt += 1
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+            print('Retrying {} {} in {:.1f}s (attempt {} of {}): {}'.format(method, url, delay, attempt + 1,
+                                                                           self.retries + 1, problem), file=sys.stderr)
+            time.sleep(delay)
+
+
+    def _send(self, method, url, body, stream, headers):
+        """ Sends a single attempt at the request. When traced, each attempt is a span, and each is recorded in the
+        request metrics. For a streamed response, both end once its headers have arrived. """
+
+        path = url[len(self.base_url):] or '/'
+
+        with span('HTTP ' + method, CATEGORY_HTTP, url=path) as request_span:
+            data = dumps_bytes(body) if body is not None else None
+            start = time.perf_counter()
+
+            try:
+                response = self.session.request(method, url, data=data, stream=stream, headers=headers,
+                                                timeout=self.timeout)
+            except RequestException as error:
+                self._record(method, path, data, stream, None, error.__class__.__name__, start)
+                raise
+
+            request_span.annotate(status=response.status_code)
+            self._record(method, path, data, stream, response, None, start)
+            return response
+
+
+    def _record(self, method, path, data, stream, response, error, start):
+        """ Records a request in the metrics, if they're being kept. The size of a streamed response is only known if
+        the server sent its Content-Length. """
+
+        if self.metrics is None:
+            return
+
+        latency = time.perf_counter() - start
+        status = response_bytes = None
+
+        if response is not None:
+            status = response.status_code
+            if stream:
+                length = response.headers.get('Content-Length')
+                response_bytes = int(length) if length and length.isdigit() else None
+            else:
+                response_bytes = len(response.content)
+
+        request_bytes = len(data) if data is not None else 0
+        self.metrics.record(method, path, status, error, request_bytes, response_bytes, latency)
+
+
+    def get(self, url, body=None, stream=False, headers=None, authenticate=True):
+        """ Performs an HTTP GET. """
+        return self.request('GET', url, body, stream, headers, authenticate)
+
+
+    def put(self, url, body=None):
+        """ Performs an HTTP PUT. """
+        return self.request('PUT', url, body)
+
+
+    def post(self, url, body=None):
+        """ Performs an HTTP POST. """
+        return self.request('POST', url, body)
+
+
+    def delete(self, url, body=None):
+        """ Performs an HTTP DELETE. """
+        return self.request('DELETE', url, body)
+
+
+    def close(self):
+        """ Closes every pooled connection. """
+        self.session.close()
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+def _timestamp(iso_datetime):
+    """ The POSIX timestamp of an ISO-8601 date and time. """
+    import arrow
+    return arrow.get(iso_datetime).datetime.timestamp()
+
+
+def _failed_before_sending(error):
+    """ Whether a request failed before any of it reached the server (it couldn't connect), so that even a request
+    which isn't idempotent can be safely sent again. """
+
+    if isinstance(error, ConnectTimeout):
+        return True
+
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
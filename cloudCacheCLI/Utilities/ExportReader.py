@@ -0,0 +1,305 @@
+""" Incremental reading of the files written by the `exportnotebooks` command, in either of its formats. """
+
+import io
+import json
+import re
+
+from cloudCacheCLI.Utilities.JsonCodec import loads
+
+FORMAT_JSON   = 'json'
+FORMAT_NDJSON = 'ndjson'
+FORMATS       = (FORMAT_JSON, FORMAT_NDJSON)
+
+# The `type` of each record in an NDJSON export. Every notebook record is followed by the records of its notes
+NDJSON_NOTEBOOK = 'notebook'
+NDJSON_NOTE     = 'note'
+
+# The `type` of the extra records in a delta export: the header which starts it, and the tombstones of deleted items
+NDJSON_DELTA            = 'delta'
+NDJSON_DELETED_NOTEBOOK = 'deleted_notebook'
+NDJSON_DELETED_NOTE     = 'deleted_note'
+
+# The number of characters read from the export file at a time
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\r\n]*')
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+class _JsonStream(object):
+    """ A forward-only cursor over a JSON document which reads its file a chunk at a time. Structural characters are
+    consumed one at a time, and complete values are decoded with JSONDecoder.raw_decode, so only the value currently
+    being decoded (plus one chunk) is ever held in memory. """
+
+    def __init__(self, file_obj, chunk_size):
+        self.file       = file_obj
+        self.chunk_size = chunk_size
+        self.buffer     = ''
+        self.pos        = 0
+        self.eof        = False
+        self.decoder    = json.JSONDecoder()
+
+
+    def _fill(self, size):
+        """ Discards the consumed part of the buffer, and appends up to `size` more characters from the file. Returns
+        False if the end of the file has been reached. """
+
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+
+        chunk = self.file.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+
+        self.buffer += chunk
+        return True
+
+
+    def peek(self):
+        """ Returns the next non-whitespace character without consuming it, or an empty string at the end of file. """
+
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+
+            if not self._fill(self.chunk_size):
+                return ''
+
+
+    def expect(self, chars):
+        """ Consumes and returns the next non-whitespace character, which must be one of `chars`. """
+
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError('Invalid export file: expected one of `{}` but found `{}`.'.format(chars, char or 'EOF'))
+
+        self.pos += 1
+        return char
+
+
+    def value(self):
+        """ Decodes and returns the next complete JSON value. If the value runs past the end of the buffer, more of
+        the file is read (growing geometrically, so a large value isn't re-parsed too many times) and it's retried. """
+
+        self.peek()
+
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+
+                # A number at the very end of the buffer may continue in the next chunk, so only trust a value which
+                # ends before the buffer does, unless there's nothing left to read
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+
+            except ValueError:
+                if self.eof:
+                    raise
+
+            self._fill(max(self.chunk_size, len(self.buffer) - self.pos))
+
+
+def _iter_array(stream):
+    """ Consumes a JSON array, yielding once per element. The caller must consume each element from the stream before
+    resuming the generator. """
+
+    stream.expect('[')
+    if stream.peek() == ']':
+        stream.expect(']')
+        return
+
+    while True:
+        yield
+        if stream.expect(',]') == ']':
+            return
+
+
+def _iter_object(stream):
+    """ Consumes a JSON object, yielding each key. The caller must consume the key's value from the stream before
+    resuming the generator. """
+
+    stream.expect('{')
+    if stream.peek() == '}':
+        stream.expect('}')
+        return
+
+    while True:
+        key = stream.value()
+        stream.expect(':')
+        yield key
+        if stream.expect(',}') == '}':
+            return
+
+
+def _iter_notes(stream):
+    """ Yields each note dictionary from a `notes` array. """
+    for _ in _iter_array(stream):
+        yield stream.value()
+
+
+def _iter_notebook(stream):
+    """ Consumes a single notebook object, yielding exactly one (notebook, notes) pair. Notes are streamed when the name
+    precedes them in the file, which is the case for files written by `exportnotebooks`. Otherwise they have to be
+    buffered until the name is found. """
+
+    notebook = {}
+    buffered_notes = []
+    yielded = False
+
+    for key in _iter_object(stream):
+        if key == 'notes' and 'name' in notebook:
+            notes = _iter_notes(stream)
+            yield notebook, notes
+            yielded = True
+
+            # Drain whatever the caller didn't consume, so the stream is positioned after the notes array
+            for _ in notes:
+                pass
+
+        elif key == 'notes':
+            buffered_notes = list(_iter_notes(stream))
+
+        else:
+            notebook[key] = stream.value()
+
+    if 'name' not in notebook:
+        raise ValueError('Invalid export file: found a notebook without a name.')
+
+    if not yielded:
+        yield notebook, iter(buffered_notes)
+
+
+def iter_export_notebooks(file_obj, chunk_size=DEFAULT_CHUNK_SIZE):
+    """ Incrementally reads an export file in the `exportnotebooks` JSON layout, which is also the layout of the
+    server's /notebooks response:
+    {"notebooks": [{"name": ..., "notes": [{"key": ..., "value": ...}, ...]}, ...]}
+
+    Yields a (notebook, notes) pair for each notebook as soon as its notes are reached, where notebook is a dictionary
+    of the fields which precede the notes (always including the name), and notes is an iterator yielding each note
+    dictionary. Each notes iterator should be consumed before moving on to the next notebook; anything left unconsumed
+    is skipped. Memory use is bounded by the largest single note, not the file.
+
+    Raises ValueError if the file has no `notebooks` array, or if anything follows the top-level object, as the later
+    records of an NDJSON export would.
+
+    Args:
+        file_obj: A file object opened in text mode.
+        chunk_size (int): The number of characters to read from the file at a time.
+    """
+
+    stream = _JsonStream(file_obj, chunk_size)
+    found_notebooks = False
+
+    for key in _iter_object(stream):
+        if key != 'notebooks':
+            stream.value()
+            continue
+
+        found_notebooks = True
+        for _ in _iter_array(stream):
+            for notebook, notes in _iter_notebook(stream):
+                yield notebook, notes
+
+    if stream.peek():
+        raise ValueError('Invalid export file: found `{}` after the end of the export.'.format(stream.peek()))
+
+    if not found_notebooks:
+        raise ValueError('Invalid export file: it has no `notebooks`.')
+
+
+def iter_response_notebooks(response):
+    """ Incrementally reads the body of a /notebooks response requested with stream=True, yielding (notebook, notes)
+    pairs exactly like iter_export_notebooks as the body arrives. """
+
+    # urllib3 closes the raw stream as soon as the body is exhausted, which would make checking for anything after the
+    # export fail with a closed file, rather than read the end of file
+    response.raw.decode_content = True
+    response.raw.auto_close = False
+    body = io.TextIOWrapper(response.raw, encoding=response.encoding or 'utf-8')
+    return iter_export_notebooks(body)
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+class _NdjsonRecords(object):
+    """ The records of an NDJSON export, one decoded line at a time, with one record of lookahead. """
+
+    def __init__(self, file_obj):
+        self.lines = (line for line in file_obj if line.strip())
+        self.next_record = None
+        self.advance()
+
+
+    def advance(self):
+        """ Moves the lookahead on to the next record, or None at the end of the file. """
+        line = next(self.lines, None)
+        self.next_record = loads(line) if line is not None else None
+
+
+    def iter_notes(self):
+        """ Yields note records up to, but not including, the next record which isn't a note. """
+        while self.next_record is not None and self.next_record.get('type') == NDJSON_NOTE:
+            note = self.next_record
+            self.advance()
+            yield note
+
+
+def iter_ndjson_notebooks(file_obj):
+    """ Incrementally reads an export file in the `exportnotebooks --format ndjson` layout, where each line is either a
+    notebook record, or a note record belonging to the notebook record before it:
+    {"type": "notebook", "id": ..., "name": ...}
+    {"type": "note", "notebook_id": ..., "key": ..., "value": ...}
+
+    Yields (notebook, notes) pairs exactly like iter_export_notebooks, reading a single line at a time.
+    """
+
+    records = _NdjsonRecords(file_obj)
+
+    while records.next_record is not None:
+        notebook = records.next_record
+        if notebook.get('type') != NDJSON_NOTEBOOK or 'name' not in notebook:
+            raise ValueError('Invalid export file: expected a notebook record but found `{}`.'.format(notebook))
+
+        records.advance()
+        notes = records.iter_notes()
+        yield notebook, notes
+
+        for _ in notes:
+            pass
+
+
+def read_delta(file_obj):
+    """ Reads a delta export written by `exportnotebooks --since`, which is laid out like an NDJSON export, but starts
+    with a header record, holds only the notebooks and notes added or updated since the previous export, and ends with
+    tombstones for the notebooks and notes deleted since:
+    {"type": "delta", "since": ..., "exported_on": ...}
+    {"type": "notebook", "id": ..., "name": ...}
+    {"type": "note", "notebook_id": ..., "id": ..., "key": ..., "value": ...}
+    {"type": "deleted_notebook", "id": ...}
+    {"type": "deleted_note", "notebook_id": ..., "id": ...}
+
+    A notebook record is included when any of its notes changed, even if the notebook itself didn't. Returns the header,
+    and an iterator yielding the rest of the records, reading a single line at a time. """
+
+    records = (loads(line) for line in file_obj if line.strip())
+    header = next(records, None)
+
+    if header is None or header.get('type') != NDJSON_DELTA:
+        raise ValueError('Invalid delta export: it does not start with a delta header record.')
+
+    return header, records
+
+
+def iter_notebooks(file_obj, export_format):
+    """ Incrementally reads an export file of either format, yielding (notebook, notes) pairs. """
+    if export_format == FORMAT_NDJSON:
+        return iter_ndjson_notebooks(file_obj)
+    return iter_export_notebooks(file_obj)
+
+
+def guess_format(path):
+    """ Guesses the format of an export file from its extension, defaulting to JSON. """
+    return FORMAT_NDJSON if path.lower().endswith(('.ndjson', '.jsonl')) else FORMAT_JSON
@@ -0,0 +1,129 @@
+""" A checkpoint journal for `importnotebooks`, so that an import which stops partway through can be resumed without
+creating any notebook or note twice.
+
+The journal is an append-only file of JSON lines. The first line describes the input file, and every line after it
+records one notebook or note which the server has created, by its position in the input file, along with the ID the
+server assigned to it:
+{"input": ..., "size": ...}
+{"notebook": 0, "name": ..., "id": ...}
+{"notebook": 0, "note": 0, "id": ...}
+
+Each line is flushed as soon as it's written, so the journal survives the process being killed. A final line which was
+only partly written when that happened is ignored.
+"""
+
+import json
+import os
+import threading
+
+# The journal's file name is the input file's, with this appended, unless it's given with --journal
+JOURNAL_SUFFIX = '.journal'
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+class ImportJournal(object):
+    """ The notebooks and notes of one input file which have already been imported, and the file they're recorded in.
+    Entries may be written from several worker threads at once. """
+
+    def __init__(self, path, input_file):
+        self.path = path
+        self.header = {'input': os.path.basename(input_file), 'size': os.path.getsize(input_file)}
+
+        # {notebook position: (notebook name, notebook ID)} and {(notebook position, note position): note ID}
+        self.notebooks = {}
+        self.notes = {}
+
+        self._file = None
+        self._complete_size = 0
+        self._lock = threading.Lock()
+
+
+    @property
+    def exists(self):
+        return os.path.exists(self.path)
+
+
+    def load(self):
+        """ Reads the entries of an existing journal. Raises ValueError if it was written for a different input
+        file. """
+
+        with open(self.path, 'rb') as journal_file:
+            data = journal_file.read()
+
+        # Anything after the last newline is a line which was cut short, and is dropped when the journal is reopened
+        self._complete_size = data.rfind(b'\n') + 1
+
+        entries = []
+        for line_number, line in enumerate(data[:self._complete_size].decode('utf-8').splitlines(), 1):
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                raise ValueError('The journal `{}` is corrupt at line {}.'.format(self.path, line_number))
+
+        if not entries or entries[0] != self.header:
+            msg = 'The journal `{}` was written for a different input file, or the input file has changed since.'
+            raise ValueError(msg.format(self.path))
+
+        for entry in entries[1:]:
+            if 'note' in entry:
+                self.notes[(entry['notebook'], entry['note'])] = entry['id']
+            else:
+                self.notebooks[entry['notebook']] = (entry['name'], entry['id'])
+
+
+    def open(self, resume):
+        """ Opens the journal for writing. A resumed journal is appended to, otherwise a new one is started. """
+
+        if resume:
+            self._file = open(self.path, 'a')
+            self._file.truncate(self._complete_size)
+        else:
+            self._file = open(self.path, 'w')
+            self._write(self.header)
+
+
+    def notebook_id(self, position, name):
+        """ The ID of the notebook at this position in the input file, if it has already been created, or else None.
+        Raises ValueError if the journal recorded a notebook of a different name there. """
+
+        if position not in self.notebooks:
+            return None
+
+        journaled_name, notebook_id = self.notebooks[position]
+        if journaled_name != name:
+            msg = 'The journal `{}` recorded notebook `{}` where the input file now has `{}`.'
+            raise ValueError(msg.format(self.path, journaled_name, name))
+
+        return notebook_id
+
+
+    def note_imported(self, notebook_position, note_position):
+        return (notebook_position, note_position) in self.notes
+
+
+    def record_notebook(self, position, name, notebook_id):
+        self.notebooks[position] = (name, notebook_id)
+        self._write({'notebook': position, 'name': name, 'id': notebook_id})
+
+
+    def record_note(self, notebook_position, note_position, note_id):
+        """ Records a created note. Called from the worker threads. """
+        self._write({'notebook': notebook_position, 'note': note_position, 'id': note_id})
+
+
+    def _write(self, entry):
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+    def remove(self):
+        self.close()
+        os.remove(self.path)
@@ -0,0 +1,138 @@
+""" Working out the fewest requests which bring the server in line with an export file, for `importnotebooks --sync`
+and `diff`.
+
+Notebooks are matched by name, and notes by key within their notebook. Notes are compared by a digest of their key and
+value, so only digests, never the notes themselves, are held in memory for either side. The server can only create and
+delete notes, so a note whose value has changed is replaced: the new version is created, and the old one deleted.
+Anything on the server which isn't in the file is left alone.
+"""
+
+import hashlib
+import json
+from collections import defaultdict
+
+# What happens to a notebook of the file
+NOTEBOOK_CREATE    = 'create'
+NOTEBOOK_UPDATE    = 'update'
+NOTEBOOK_UNCHANGED = 'unchanged'
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+def note_digest(key, value):
+    """ A digest of a note's content. """
+    return hashlib.sha1(json.dumps([key, value]).encode('utf-8')).hexdigest()
+
+
+class NotebookPlan(object):
+    """ What needs to be done for one notebook of the file. """
+
+    def __init__(self, position, name, notebook_id):
+        self.position = position
+        self.name = name
+
+        # The ID of the server's notebook of the same name, or None if it has to be created
+        self.notebook_id = notebook_id
+
+        # The positions of the notes which have to be created, and {position: ID of the server note it replaces}
+        self.creates = set()
+        self.replaces = {}
+        self.unchanged = 0
+
+
+    @property
+    def action(self):
+        if self.notebook_id is None:
+            return NOTEBOOK_CREATE
+        return NOTEBOOK_UPDATE if self.creates else NOTEBOOK_UNCHANGED
+
+
+class ImportPlan(object):
+    """ The plan for importing a file into the server's current notebooks. Build it with read_server(), then
+    read_file(). """
+
+    def __init__(self):
+        # {notebook name: [(notebook ID, {note key: [(digest, note ID)]})]}, in the server's order
+        self.server_notebooks = defaultdict(list)
+
+        # {notebook position: NotebookPlan}, in the file's order
+        self.notebooks = {}
+
+
+    def read_server(self, notebooks):
+        """ Takes in the server's notebooks, as (notebook, notes) pairs. """
+
+        for notebook, notes in notebooks:
+            server_notes = defaultdict(list)
+            for note in notes:
+                server_notes[note['key']].append((note_digest(note['key'], note['value']), note['id']))
+            self.server_notebooks[notebook['name']].append((notebook['id'], server_notes))
+
+
+    def read_file(self, notebooks):
+        """ Takes in the file's notebooks, as (notebook, notes) pairs, and works out what to do with each. A notebook
+        which shares its name with a server notebook is matched with it, in order. """
+
+        for position, (notebook, notes) in enumerate(notebooks):
+            name = notebook['name']
+            matches = self.server_notebooks.get(name)
+
+            if not matches:
+                plan = self.notebooks[position] = NotebookPlan(position, name, None)
+                plan.creates.update(note_position for note_position, _ in enumerate(notes))
+                continue
+
+            notebook_id, server_notes = matches.pop(0)
+            plan = self.notebooks[position] = NotebookPlan(position, name, notebook_id)
+            self._plan_notes(plan, server_notes, notes)
+
+
+    def _plan_notes(self, plan, server_notes, notes):
+        """ Matches the file's notes with the server's, first where their content is identical, and then where only
+        their key is the same. """
+
+        file_notes = [(note_position, note['key'], note_digest(note['key'], note['value']))
+                      for note_position, note in enumerate(notes)]
+        unmatched = []
+
+        for note_position, key, digest in file_notes:
+            candidates = server_notes.get(key, [])
+            match = next((index for index, (server_digest, _) in enumerate(candidates) if server_digest == digest),
+                         None)
+            if match is None:
+                unmatched.append((note_position, key))
+            else:
+                del candidates[match]
+                plan.unchanged += 1
+
+        for note_position, key in unmatched:
+            plan.creates.add(note_position)
+            candidates = server_notes.get(key)
+            if candidates:
+                plan.replaces[note_position] = candidates.pop(0)[1]
+
+
+    def notebook_id(self, position, name):
+        """ The ID of the server notebook the file's notebook at this position goes into, or None if it has to be
+        created. """
+        return self.notebooks[position].notebook_id
+
+
+    def note_imported(self, notebook_position, note_position):
+        """ Whether the note at this position of the file is already on the server. """
+        return note_position not in self.notebooks[notebook_position].creates
+
+
+    def replaced_note_id(self, notebook_position, note_position):
+        """ The ID of the server note which the note at this position replaces, or None. """
+        return self.notebooks[notebook_position].replaces.get(note_position)
+
+
+    @property
+    def totals(self):
+        """ The number of notebooks to create, and notes to create, replace and leave unchanged. """
+
+        plans = self.notebooks.values()
+        return {'notebooks created': sum(1 for plan in plans if plan.action == NOTEBOOK_CREATE),
+                'notes created': sum(len(plan.creates) - len(plan.replaces) for plan in plans),
+                'notes replaced': sum(len(plan.replaces) for plan in plans),
+                'notes unchanged': sum(plan.unchanged for plan in plans)}
@@ -0,0 +1,151 @@
+""" The JSON codec used for request bodies, API responses, and the records of NDJSON import and export files.
+
+The codec is chosen with the `json codec` configuration option: the standard library's `json`, `simplejson`, or
+`orjson`, or `auto` (the default) for the fastest of those which is installed. Whichever is used, the results are the
+same: responses are decoded straight from their bytes, and records are encoded compactly, as `json.dumps` with
+separators=(',', ':') would encode them. Anything the chosen codec can't handle, such as integers too large for orjson,
+falls back to the standard library.
+
+The codec's module is only imported the first time something is encoded or decoded.
+"""
+
+import importlib
+import importlib.util
+import json
+import sys
+
+CODEC_AUTO       = 'auto'
+CODEC_JSON       = 'json'
+CODEC_SIMPLEJSON = 'simplejson'
+CODEC_ORJSON     = 'orjson'
+CODECS           = (CODEC_AUTO, CODEC_JSON, CODEC_SIMPLEJSON, CODEC_ORJSON)
+
+# The codecs `auto` picks from, fastest first
+AUTO_PREFERENCE = (CODEC_ORJSON, CODEC_SIMPLEJSON, CODEC_JSON)
+
+_COMPACT = (',', ':')
+
+# The configured codec, and the codec object it resolved to, once something has been encoded or decoded
+_configured = CODEC_AUTO
+_codec = None
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+class _StdlibCodec(object):
+    """ The standard library's json module, or simplejson, which shares its interface. """
+
+    def __init__(self, name, module):
+        self.name = name
+        self.module = module
+
+
+    def loads(self, data):
+        return self.module.loads(data)
+
+
+    def dumps(self, obj):
+        return self.module.dumps(obj, separators=_COMPACT)
+
+
+    def dumps_bytes(self, obj):
+        return self.module.dumps(obj, separators=_COMPACT).encode('utf-8')
+
+
+class _OrjsonCodec(object):
+    """ orjson, which only works with bytes, and writes characters outside ASCII as UTF-8 rather than escaping them. So
+    that text written to a file is the same whichever codec wrote it, text which isn't ASCII is encoded again by the
+    standard library. """
+
+    name = CODEC_ORJSON
+
+    def __init__(self, module):
+        self.module = module
+
+
+    def loads(self, data):
+        try:
+            return self.module.loads(data)
+        except self.module.JSONDecodeError:
+            # Also raises the standard library's error for anything which really isn't valid JSON
+            return json.loads(data)
+
+
+    def dumps(self, obj):
+        try:
+            text = self.module.dumps(obj).decode('utf-8')
+        except TypeError:
+            return json.dumps(obj, separators=_COMPACT)
+        return text if text.isascii() else json.dumps(obj, separators=_COMPACT)
+
+
+    def dumps_bytes(self, obj):
+        try:
+            return self.module.dumps(obj)
+        except TypeError:
+            return json.dumps(obj, separators=_COMPACT).encode('utf-8')
+
+
+def codec_available(name):
+    """ Whether the named codec (one of CODECS) can be used. """
+    if name in (CODEC_AUTO, CODEC_JSON):
+        return True
+    return importlib.util.find_spec(name) is not None
+
+
+def use_codec(name):
+    """ Chooses the codec (one of CODECS) used from now on. """
+
+    global _configured, _codec
+    if name != _configured:
+        _configured = name
+        _codec = None
+
+
+def _load(name):
+    if name == CODEC_JSON:
+        return _StdlibCodec(CODEC_JSON, json)
+
+    module = importlib.import_module(name)
+    return _OrjsonCodec(module) if name == CODEC_ORJSON else _StdlibCodec(name, module)
+
+
+def _current():
+    """ The codec object of the configured codec. A configured codec which isn't installed is reported once, and the
+    standard library is used instead. """
+
+    global _codec
+    if _codec is not None:
+        return _codec
+
+    names = AUTO_PREFERENCE if _configured == CODEC_AUTO else (_configured, CODEC_JSON)
+    for name in names:
+        try:
+            _codec = _load(name)
+            break
+        except ImportError:
+            if _configured != CODEC_AUTO:
+                print('The `{}` JSON codec is not installed, so `json` is being used instead.'.format(name),
+                      file=sys.stderr)
+
+    return _codec
+
+
+def codec_name():
+    """ The name of the codec actually in use. """
+    return _current().name
+
+
+def loads(data):
+    """ Decodes a JSON document, given as bytes (in UTF-8, -16 or -32) or as text. Raises ValueError if it isn't
+    valid JSON. """
+    return _current().loads(data)
+
+
+def dumps(obj):
+    """ Encodes obj as compact JSON text, with characters outside ASCII escaped, for writing to a file. """
+    return _current().dumps(obj)
+
+
+def dumps_bytes(obj):
+    """ Encodes obj as compact JSON in UTF-8, for sending as a request body. """
+    return _current().dumps_bytes(obj)
@@ -0,0 +1,94 @@
+""" Incremental reading of key/value note records, for the `newnotes` command, in CSV, TSV or NDJSON. """
+
+import csv
+import json
+
+from cloudCacheCLI.Utilities.JsonCodec import loads
+
+FORMAT_CSV    = 'csv'
+FORMAT_TSV    = 'tsv'
+FORMAT_NDJSON = 'ndjson'
+FORMATS       = (FORMAT_CSV, FORMAT_TSV, FORMAT_NDJSON)
+
+# The optional header row of a CSV or TSV file
+HEADER = ['key', 'value']
+
+# The csv module refuses fields over 128KB by default, but a note's value may be much larger than that
+MAX_FIELD_SIZE = 2 ** 31 - 1
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+def iter_delimited_notes(file_obj, delimiter):
+    """ Incrementally reads CSV or TSV rows of exactly two columns, the note key and the note value. Values may be
+    quoted to contain the delimiter or span several lines. A first row of `key` and `value` is taken to be a header and
+    skipped. Yields a (line number, key, value) tuple for each row, numbered by the line the row starts on.
+
+    Args:
+        file_obj: A file object opened in text mode, with newline='' so quoted newlines are kept.
+        delimiter (string): The column separator.
+    """
+
+    csv.field_size_limit(MAX_FIELD_SIZE)
+    reader = csv.reader(file_obj, delimiter=delimiter)
+
+    while True:
+        # reader.line_num is the line the last row read ended on, so a row spanning several lines starts after it
+        line_number = reader.line_num + 1
+        row = next(reader, None)
+        if row is None:
+            return
+        if not row:
+            continue
+
+        if line_number == 1 and [column.strip().lower() for column in row] == HEADER:
+            continue
+
+        if len(row) != 2:
+            message = 'Invalid input on line {}: expected 2 columns, the key and the value, but found {}.'
+            raise ValueError(message.format(line_number, len(row)))
+
+        yield line_number, row[0], row[1]
+
+
+def iter_ndjson_notes(file_obj):
+    """ Incrementally reads NDJSON records, one per line, each with a `key` and a `value`:
+    {"key": ..., "value": ...}
+
+    This is also the shape of the note records written by `exportnotebooks --format ndjson`, whose other fields are
+    ignored. Values which aren't strings are stored as their JSON. Yields a (line number, key, value) tuple for each
+    record. """
+
+    for line_number, line in enumerate(file_obj, 1):
+        if not line.strip():
+            continue
+
+        try:
+            record = loads(line)
+        except ValueError as error:
+            raise ValueError('Invalid input on line {}: {}'.format(line_number, error))
+
+        if not isinstance(record, dict) or 'key' not in record or 'value' not in record:
+            message = 'Invalid input on line {}: expected a record with a `key` and a `value`.'
+            raise ValueError(message.format(line_number))
+
+        value = record['value']
+        yield line_number, str(record['key']), value if isinstance(value, str) else json.dumps(value)
+
+
+def iter_notes(file_obj, note_format):
+    """ Incrementally reads note records of any of the formats, yielding (line number, key, value) tuples. """
+
+    if note_format == FORMAT_NDJSON:
+        return iter_ndjson_notes(file_obj)
+    return iter_delimited_notes(file_obj, '\t' if note_format == FORMAT_TSV else ',')
+
+
+def guess_format(path):
+    """ Guesses the format of an input file from its extension, defaulting to CSV. """
+
+    path = path.lower()
+    if path.endswith(('.ndjson', '.jsonl')):
+        return FORMAT_NDJSON
+    if path.endswith(('.tsv', '.tab')):
+        return FORMAT_TSV
+    return FORMAT_CSV
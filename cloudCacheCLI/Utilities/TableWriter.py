@@ -0,0 +1,200 @@
+""" Streaming output of rows, either as a table for people to read, or in a machine-readable format for scripts.
+
+Rows are written as they're produced, rather than the whole table being built up as a single string first, so the time
+to the first row and the memory used don't grow with the number of rows. The table's column widths are taken from a
+bounded sample of the first rows, and any cell too wide for its column is truncated.
+"""
+
+import json
+import os
+import sys
+from contextlib import contextmanager
+from itertools import chain, islice
+
+OUTPUT_TABLE   = 'table'
+OUTPUT_PLAIN   = 'plain'
+OUTPUT_TSV     = 'tsv'
+OUTPUT_JSON    = 'json'
+OUTPUT_NDJSON  = 'ndjson'
+OUTPUT_FORMATS = (OUTPUT_TABLE, OUTPUT_PLAIN, OUTPUT_TSV, OUTPUT_JSON, OUTPUT_NDJSON)
+
+# The number of rows read ahead to size the table's columns, and the widest any column may be
+SAMPLE_SIZE      = 200
+MAX_COLUMN_WIDTH = 60
+
+# The pager used for tables longer than the terminal, if $PAGER isn't set. -F quits straight away if it all fits
+DEFAULT_PAGER = 'less -FRX'
+
+# The characters which TSV output escapes, so that every row is exactly one line
+_TSV_ESCAPES = {'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'}
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+def write_rows(columns, rows, output_format=OUTPUT_TABLE, indent=0, stream=None):
+    """ Writes the rows to the stream, as they're produced, in the given output format.
+
+    Args:
+        columns (list of tuple): A (field, header) pair for each column. The field is the key of the column's value in
+            each row, and in the JSON formats. The header is the column's heading in a table or TSV.
+        rows: An iterable of dictionaries, each holding a value for every field. It's only iterated once.
+        output_format (string): One of OUTPUT_FORMATS.
+        indent (int): The number of spaces to indent a table by.
+        stream: The text stream to write to. Defaults to sys.stdout.
+    """
+
+    stream = stream if stream is not None else sys.stdout
+    fields = [field for field, _ in columns]
+
+    if output_format == OUTPUT_TABLE:
+        _write_table(columns, rows, indent, stream)
+
+    elif output_format == OUTPUT_PLAIN:
+        for row in rows:
+            stream.write(' '.join(_flatten(row[field]) for field in fields) + '\n')
+
+    elif output_format == OUTPUT_TSV:
+        stream.write('\t'.join(header for _, header in columns) + '\n')
+        for row in rows:
+            stream.write('\t'.join(_tsv_escape(row[field]) for field in fields) + '\n')
+
+    elif output_format == OUTPUT_NDJSON:
+        for row in rows:
+            stream.write(json.dumps({field: row[field] for field in fields}) + '\n')
+
+    elif output_format == OUTPUT_JSON:
+        stream.write('[')
+        for index, row in enumerate(rows):
+            stream.write((',\n ' if index else '\n ') + json.dumps({field: row[field] for field in fields}))
+        stream.write('\n]\n')
+
+    else:
+        raise ValueError('Unknown output format `{}`.'.format(output_format))
+
+
+def _write_table(columns, rows, indent, stream):
+    """ Writes the rows as a table in the same style as tabulate's fancy_grid, sizing the columns to fit the first
+    SAMPLE_SIZE rows. """
+
+    fields = [field for field, _ in columns]
+    headers = [header for _, header in columns]
+
+    rows = iter(rows)
+    sample = [[_flatten(row[field]) for field in fields] for row in islice(rows, SAMPLE_SIZE)]
+    remaining = ([_flatten(row[field]) for field in fields] for row in rows)
+
+    widths = [min(MAX_COLUMN_WIDTH, max([len(header)] + [len(cells[index]) for cells in sample]))
+              for index, header in enumerate(headers)]
+
+    margin = ' ' * indent
+
+    def border(left, fill, middle, right):
+        return margin + left + middle.join(fill * (width + 2) for width in widths) + right + '\n'
+
+    def line(cells):
+        return margin + '│ ' + ' │ '.join(_fit(cell, width) for cell, width in zip(cells, widths)) + ' │\n'
+
+    stream.write(border('╒', '═', '╤', '╕'))
+    stream.write(line(headers))
+    stream.write(border('╞', '═', '╪', '╡'))
+
+    for index, cells in enumerate(chain(sample, remaining)):
+        if index:
+            stream.write(border('├', '─', '┼', '┤'))
+        stream.write(line(cells))
+
+    stream.write(border('╘', '═', '╧', '╛'))
+
+
+def _text(value):
+    """ A value as text. Nested values are written as JSON, rather than as Python would print them. """
+    if value is None:
+        return ''
+    return json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+
+
+def _flatten(value):
+    """ A value as a single line of text. """
+    return ' '.join(_text(value).split())
+
+
+def _fit(text, width):
+    """ Pads the text out to the width, or truncates it with an ellipsis if it's wider. """
+    return text.ljust(width) if len(text) <= width else text[:width - 1] + '…'
+
+
+def _tsv_escape(value):
+    return ''.join(_TSV_ESCAPES.get(char, char) for char in _text(value))
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+class _PagerClosed(Exception):
+    """ Raised when output is written after the user has quit the pager. """
+    pass
+
+
+class _PagedStream(object):
+    """ A text stream which holds output back until it would fill the terminal. If it does, everything is sent through
+    the pager from then on. If it doesn't, it's written to stdout as usual once the output is finished. """
+
+    def __init__(self, pager_command, screen_lines):
+        self.pager_command = pager_command
+        self.screen_lines = screen_lines
+        self.held = []
+        self.held_lines = 0
+        self.pager = None
+
+
+    def write(self, text):
+        if self.pager is None:
+            self.held.append(text)
+            self.held_lines += text.count('\n')
+            if self.held_lines < self.screen_lines:
+                return
+            self._start_pager()
+            text = ''.join(self.held)
+            self.held = []
+
+        try:
+            self.pager.stdin.write(text)
+        except BrokenPipeError:
+            raise _PagerClosed()
+
+
+    def _start_pager(self):
+        import subprocess
+        self.pager = subprocess.Popen(self.pager_command, shell=True, stdin=subprocess.PIPE, universal_newlines=True)
+
+
+    def close(self):
+        if self.pager is None:
+            sys.stdout.write(''.join(self.held))
+            return
+
+        try:
+            self.pager.stdin.close()
+        except BrokenPipeError:
+            pass
+        self.pager.wait()
+
+
+@contextmanager
+def paged_output(enabled=True):
+    """ Yields the stream a long listing should be written to. When stdout is a terminal, and `enabled`, a listing
+    taller than the terminal is shown through $PAGER (or `less`), as it's written. Otherwise, or if $PAGER is set but
+    empty, the stream is stdout. """
+
+    pager_command = os.environ.get('PAGER', DEFAULT_PAGER)
+    if not enabled or not pager_command or not sys.stdout.isatty():
+        yield sys.stdout
+        return
+
+    import shutil
+
+    sys.stdout.flush()
+    stream = _PagedStream(pager_command, shutil.get_terminal_size().lines - 1)
+    try:
+        yield stream
+    except _PagerClosed:
+        pass
+    finally:
+        stream.close()
@@ -1,5 +1,5 @@
+from cloudCacheCLI.Tracer import span
 
-import tabulate
 
 def get_table(data, headers=(), indent=0, table_format='fancy_grid'):
     """ Get an ascii table string for a given set of values (list of lists), and column headers.
@@ -16,7 +16,11 @@ def get_table(data, headers=(), indent=0, table_format='fancy_grid'):
         string: The formatted table of data
     """
 
-    table  = tabulate.tabulate(data, headers=headers, numalign='left', tablefmt=table_format)
-    indent = ' ' * indent
+    with span('render'):
+        # tabulate is only imported once a table is needed, since most of the CLI's startup time goes on imports
+        import tabulate
 
-    return '\n'.join(indent + line for line in table.split('\n'))
\ No newline at end of file
+        table  = tabulate.tabulate(data, headers=headers, numalign='left', tablefmt=table_format)
+        indent = ' ' * indent
+
+        return '\n'.join(indent + line for line in table.split('\n'))
\ No newline at end of file
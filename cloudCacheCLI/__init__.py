@@ -1,6 +1,17 @@
-CFG_SERVER        = 'server'
-CFG_PORT          = 'port'
-CFG_USER          = 'user'
-CFG_API_KEY       = 'api key'
-CFG_ACCESS_TOKEN  = 'access token'
-CFG_TOKEN_EXPIRES = 'token expires'
+CFG_SERVER            = 'server'
+CFG_PORT              = 'port'
+CFG_USER              = 'user'
+CFG_API_KEY           = 'api key'
+CFG_ACCESS_TOKEN      = 'access token'
+CFG_TOKEN_EXPIRES     = 'token expires'
+CFG_POOL_SIZE         = 'pool size'
+CFG_CACHE_TTL         = 'cache ttl'
+CFG_CACHE_SIZE        = 'cache size'
+CFG_TOKEN_MARGIN      = 'token refresh margin'
+CFG_CONNECT_TIMEOUT   = 'connect timeout'
+CFG_READ_TIMEOUT      = 'read timeout'
+CFG_RETRIES           = 'retries'
+CFG_BREAKER_THRESHOLD = 'breaker threshold'
+CFG_BREAKER_COOLDOWN  = 'breaker cooldown'
+CFG_METRICS_RETENTION = 'metrics retention'
+CFG_JSON_CODEC        = 'json codec'
@@ -1,81 +1,48 @@
-""" The cloudCache CLI application module. """
+""" The cloudCache CLI entry point. If a `cc daemon` is running, the command is handed to it, and otherwise it is run in
+this process. Only the daemon client is imported up front, so that handing a command to the daemon stays cheap. """
 
+import time
+
+# When the process started, near enough, so that `--trace` can show how long importing the CLI took
+STARTED_AT = time.perf_counter()
+
+import os
 import sys
 from os.path import dirname, realpath, join
 
-from requests.exceptions import ConnectionError
+from Daemon import SOCKET_NAME, forward_to_daemon
 
-from ConfigManager import ConfigManager
-from Commands import CommandValidationError, ConfigAppCommand
-from Commands.UserCommands import NewUserCommand, ShowUsersCommand, DeleteUserCommand
-from Commands.NotebookCommands import DeleteNotebookCommand, NewNotebookCommand, ShowNotebooksCommand,\
-    ExportNotebooksCommand, ImportNotebooksCommand
-from Commands.NoteCommands import DeleteNoteCommand, ShowNotesCommand, NewNoteCommand, ShowNoteCommand
+# The exit status of a process killed by SIGPIPE, which is how a command is expected to end once the reader of its
+# output has gone away, such as `head` in `cc notebooks | head`
+BROKEN_PIPE_STATUS = 141
 
 # -------------------------------------------------------------------------------------------------
 
-class CloudCacheCliApp(object):
-
-    commands = {
-        'config': ConfigAppCommand,
-        'users': ShowUsersCommand,
-        'notebooks': ShowNotebooksCommand,
-        'newuser': NewUserCommand,
-        'notes': ShowNotesCommand,
-        'newnotebook': NewNotebookCommand,
-        'newnote': NewNoteCommand,
-        'note': ShowNoteCommand,
-        'deletenote': DeleteNoteCommand,
-        'deletenotebook': DeleteNotebookCommand,
-        'deleteuser': DeleteUserCommand,
-        'exportnotebooks': ExportNotebooksCommand,
-        'importnotebooks': ImportNotebooksCommand
-    }
-
-    def __init__(self, args):
-        # discard the first argument, which is the script name
-        self.args = args[1:]
-        self.config_manager = ConfigManager(join(dirname(realpath(__file__)), '.ccconfig'))
-
-        # If no arguments are provided, just echo the current configuration and exit the script
-        if len(self.args) == 0:
-            self.config_manager.echo_config()
-            sys.exit(0)
-
-        try:
-            user_command = self.args.pop(0)
-            self.command = self.commands[user_command]
-        except KeyError:
-            print('\n`{}` is not a valid cloudCache command.'.format(user_command))
-            return
-            # TODO display help
-
-        should_skip_ensure_steps = (self.command is ConfigAppCommand or self.command is NewUserCommand)
-        if not should_skip_ensure_steps:
-            # Before executing any command other than config or newuser, ensure a user is configured, ensure we have a
-            # valid API key, and also an access token so we can be making API calls.
-            self.config_manager.ensure_user()
-            self.config_manager.ensure_api_key()
-            self.config_manager.ensure_access_token()
+def main(argv):
+    """ Runs the command line in argv (sys.argv), and returns the exit status. If whatever is reading the output
+    closes the pipe before the command has finished writing, the command stops quietly. """
 
-        # Execute command now
-        self.action()
+    try:
+        status = forward_to_daemon(join(dirname(realpath(__file__)), SOCKET_NAME), argv[1:])
 
+        if status is None:
+            # No daemon is running, so do the work here
+            from Application import CloudCacheCliApp
+            CloudCacheCliApp(argv, started_at=STARTED_AT)
+            status = 0
 
-    def action(self):
-        """ Perform the selected command action. """
-        try:
-            self.command(self.args, self)
+        # Any output still buffered must reach the pipe now, while a broken pipe can still be caught
+        sys.stdout.flush()
 
-        except ConnectionError:
-            msg  = '\nUnable to connect to the cloudCache server.'
-            msg += '\nEnsure your server host and port configuration is correct, and that the server is running.'
-            print(msg)
+    except BrokenPipeError:
+        # Python flushes stdout again on exit, which would fail the same way, so send whatever is left nowhere
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        status = BROKEN_PIPE_STATUS
 
-        except CommandValidationError as error:
-            print('\n{}'.format(error))
+    return status
 
 # -------------------------------------------------------------------------------------------------
 
 if __name__ == '__main__':
-    app = CloudCacheCliApp(sys.argv)
+    sys.exit(main(sys.argv))
@@ -0,0 +1,48 @@
+""" Checks that the streaming reader of JSON export files reads what `json.load` would, and rejects what it would
+reject, or what isn't an export at all. """
+
+import io
+
+import pytest
+
+from cloudCacheCLI.Utilities.ExportReader import iter_export_notebooks
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+def read(text, chunk_size=4):
+    """ Every (notebook, notes) pair in the export, with the notes read into a list. A tiny chunk size makes values
+    span several reads of the file. """
+    return [(notebook, list(notes)) for notebook, notes in iter_export_notebooks(io.StringIO(text), chunk_size)]
+
+
+def test_reads_notebooks_and_notes():
+    text = '{"notebooks": [{"name": "a", "notes": [{"key": "k", "value": 12345}]}, {"name": "b", "notes": []}]}\n'
+    assert read(text) == [({'name': 'a'}, [{'key': 'k', 'value': 12345}]), ({'name': 'b'}, [])]
+
+
+def test_reads_notes_which_precede_the_name():
+    assert read('{"notebooks": [{"notes": [{"key": "k"}], "name": "a"}]}') == [({'name': 'a'}, [{'key': 'k'}])]
+
+
+def test_skips_other_keys():
+    assert read('{"total": 1, "notebooks": [{"name": "a", "notes": []}], "more": {"x": [1]}}') == [({'name': 'a'}, [])]
+
+
+def test_reads_an_empty_listing():
+    assert read('{"notebooks": []}') == []
+
+
+@pytest.mark.parametrize('text', [
+    '{}',
+    '{"notebook": []}',
+    '',
+    '{"type": "notebook", "id": 1, "name": "a"}\n{"type": "note", "notebook_id": 1, "key": "k", "value": "v"}\n',
+    '{"notebooks": []} garbage',
+    '{"notebooks": [{"name": "a", "notes": []}]}{"notebooks": []}',
+    '{"notebooks": {"name": "a"}}',
+    '{"notebooks": [{"notes": []}]}',
+    '{"notebooks": [{"name": "a", "notes": [}',
+])
+def test_rejects_what_is_not_an_export(text):
+    with pytest.raises(ValueError):
+        read(text)
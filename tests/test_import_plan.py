@@ -0,0 +1,86 @@
+""" Checks the plan `importnotebooks --sync` and `diff` work out: which notes of the file are created, which replace a
+server note, and which are left alone, when keys are repeated and notes are in a different order. """
+
+from cloudCacheCLI.Utilities.ImportPlan import ImportPlan, NOTEBOOK_CREATE, NOTEBOOK_UPDATE, NOTEBOOK_UNCHANGED
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+def plan(server, file):
+    """ The plan for importing the file into the server. Each is a list of (notebook name, [(key, value)]), and the
+    server's notebooks and notes are given IDs by their positions: notebook n is 100 * (n + 1), and its notes follow
+    on from it. """
+
+    server_notebooks = [({'id': 100 * (nb + 1), 'name': name},
+                         [{'id': 100 * (nb + 1) + note + 1, 'key': key, 'value': value}
+                          for note, (key, value) in enumerate(notes)])
+                        for nb, (name, notes) in enumerate(server)]
+    file_notebooks = [({'name': name}, [{'key': key, 'value': value} for key, value in notes]) for name, notes in file]
+
+    import_plan = ImportPlan()
+    import_plan.read_server(server_notebooks)
+    import_plan.read_file(file_notebooks)
+    return import_plan
+
+
+def test_reordered_notes_are_unchanged():
+    import_plan = plan([('a', [('x', 1), ('y', 2), ('z', 3)])], [('a', [('z', 3), ('x', 1), ('y', 2)])])
+
+    notebook = import_plan.notebooks[0]
+    assert notebook.action == NOTEBOOK_UNCHANGED
+    assert notebook.unchanged == 3
+    assert not notebook.creates and not notebook.replaces
+
+
+def test_changed_value_replaces_the_server_note():
+    import_plan = plan([('a', [('x', 1), ('y', 2)])], [('a', [('y', 2), ('x', 5)])])
+
+    notebook = import_plan.notebooks[0]
+    assert notebook.action == NOTEBOOK_UPDATE
+    assert notebook.creates == {1}
+    assert notebook.replaces == {1: 101}
+    assert import_plan.replaced_note_id(0, 1) == 101
+    assert import_plan.note_imported(0, 0) and not import_plan.note_imported(0, 1)
+
+
+def test_duplicate_keys_match_identical_content_first():
+    # The second `k` of the file is identical to the server's second, so it's the first which replaces the server's
+    # first, even though both share the key
+    import_plan = plan([('a', [('k', 1), ('k', 2)])], [('a', [('k', 5), ('k', 2)])])
+
+    notebook = import_plan.notebooks[0]
+    assert notebook.unchanged == 1
+    assert notebook.creates == {0}
+    assert notebook.replaces == {0: 101}
+
+
+def test_duplicate_keys_beyond_the_servers_are_created():
+    import_plan = plan([('a', [('k', 1)])], [('a', [('k', 1), ('k', 1), ('k', 2)])])
+
+    notebook = import_plan.notebooks[0]
+    assert notebook.unchanged == 1
+    assert notebook.creates == {1, 2}
+    assert notebook.replaces == {}
+
+
+def test_each_server_note_is_replaced_at_most_once():
+    import_plan = plan([('a', [('k', 1), ('k', 2)])], [('a', [('k', 3), ('k', 4), ('k', 5)])])
+
+    notebook = import_plan.notebooks[0]
+    assert notebook.creates == {0, 1, 2}
+    assert notebook.replaces == {0: 101, 1: 102}
+
+
+def test_notebooks_with_the_same_name_are_matched_in_order():
+    import_plan = plan([('a', [('x', 1)]), ('a', [('y', 2)])],
+                       [('a', [('x', 1)]), ('a', [('y', 3)]), ('a', [('z', 4)])])
+
+    assert [import_plan.notebook_id(position, 'a') for position in range(3)] == [100, 200, None]
+    assert [notebook.action for notebook in import_plan.notebooks.values()] == \
+        [NOTEBOOK_UNCHANGED, NOTEBOOK_UPDATE, NOTEBOOK_CREATE]
+
+
+def test_totals():
+    import_plan = plan([('a', [('x', 1), ('y', 2)])], [('a', [('x', 1), ('y', 3), ('z', 4)]), ('b', [('w', 5)])])
+
+    assert import_plan.totals == {'notebooks created': 1, 'notes created': 2, 'notes replaced': 1,
+                                  'notes unchanged': 1}
@@ -0,0 +1,56 @@
+""" Checks the notebooks and notes listings against the fake server, both paging them and, as a server which ignores
+the paging parameters does, returning them whole, so that `--limit` and `--offset` must be applied by the CLI. """
+
+import pytest
+
+from benchmarks.command_benchmark import CliSandbox
+
+NOTEBOOKS = 7
+NOTES_PER_NOTEBOOK = 7
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+@pytest.fixture(scope='module', params=[True, False], ids=['paged', 'unpaged'])
+def sandbox(request):
+    sandbox = CliSandbox(notebooks=NOTEBOOKS, notes_per_notebook=NOTES_PER_NOTEBOOK, pagination=request.param)
+    yield sandbox
+    sandbox.close()
+
+
+def listed(sandbox, args, column):
+    """ The values of the named column of the rows `cc` lists, read from its TSV output. """
+
+    lines = sandbox.output(args + ['--output', 'tsv']).splitlines()
+    index = lines[0].split('\t').index(column)
+    return [line.split('\t')[index] for line in lines[1:]]
+
+
+@pytest.mark.parametrize('options, expected', [
+    ([], range(7)),
+    (['--page-size', '2'], range(7)),
+    (['--limit', '3'], range(3)),
+    (['--limit', '3', '--page-size', '2'], range(3)),
+    (['--offset', '5'], range(5, 7)),
+    (['--offset', '2', '--limit', '3', '--page-size', '2'], range(2, 5)),
+    (['--offset', '4', '--limit', '10', '--page-size', '2'], range(4, 7)),
+    (['--offset', '10'], []),
+])
+def test_notebooks(sandbox, options, expected):
+    names = listed(sandbox, ['notebooks'] + options, 'Notebook Name')
+    assert names == ['notebook {}'.format(index) for index in expected]
+
+
+def test_notebook_note_counts(sandbox):
+    counts = listed(sandbox, ['notebooks', '--page-size', '3'], '# of Notes')
+    assert counts == [str(NOTES_PER_NOTEBOOK)] * NOTEBOOKS
+
+
+@pytest.mark.parametrize('options, expected', [
+    ([], range(7)),
+    (['--page-size', '3'], range(7)),
+    (['--offset', '1', '--limit', '2'], range(1, 3)),
+    (['--offset', '3', '--page-size', '2'], range(3, 7)),
+])
+def test_notes(sandbox, options, expected):
+    keys = listed(sandbox, ['notes', str(sandbox.notebook_id)] + options, 'Note name')
+    assert keys == ['key {}'.format(index) for index in expected]
@@ -0,0 +1,59 @@
+""" Checks that the response cache treats a database it can't use as a miss, rather than failing the command, and
+recreates one which isn't a database at all. """
+
+import sqlite3
+
+from cloudCacheCLI.ResponseCache import ResponseCache
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+class _Config(object):
+    def load_config(self):
+        return {}
+
+
+class _Response(object):
+    def __init__(self, body):
+        self.content = body
+        self.headers = {'ETag': '"1"'}
+
+
+URL = 'http://localhost:5000/notebooks'
+
+
+def test_stores_and_gets(tmp_path):
+    cache = ResponseCache(_Config(), str(tmp_path / 'cache'))
+    cache.store('user', URL, _Response(b'{}'))
+    assert cache.get('user', URL).body == b'{}'
+
+
+def test_recreates_a_file_which_is_not_a_database(tmp_path):
+    path = tmp_path / 'cache'
+    path.write_bytes(b'garbage' * 1000)
+    cache = ResponseCache(_Config(), str(path))
+
+    assert cache.get('user', URL) is None
+    cache.invalidate(URL)
+    cache.touch('user', URL)
+    cache.store('user', URL, _Response(b'{}'))
+
+    assert cache.get('user', URL).body == b'{}'
+
+
+def test_a_locked_database_is_a_miss(tmp_path):
+    path = str(tmp_path / 'cache')
+    cache = ResponseCache(_Config(), path)
+    cache.store('user', URL, _Response(b'{}'))
+
+    cache._connection.execute('PRAGMA busy_timeout = 0')
+    other = sqlite3.connect(path)
+    other.execute('BEGIN EXCLUSIVE')
+    try:
+        assert cache.get('user', URL) is None
+        cache.store('user', URL, _Response(b'[]'))
+    finally:
+        other.rollback()
+        other.close()
+
+    # The lock was only temporary, so the database is kept
+    assert cache.get('user', URL).body == b'{}'
@@ -0,0 +1,168 @@
+""" Checks which failed requests the transport retries, and that its circuit breaker opens on consecutive failures and
+lets requests through again once the server recovers. Requests are answered by a stub adapter, not a server. """
+
+import pytest
+from requests.adapters import BaseAdapter
+from requests.exceptions import ConnectionError, ConnectTimeout, ReadTimeout
+from requests.models import Response
+from requests.packages.urllib3.exceptions import MaxRetryError, NewConnectionError
+
+import cloudCacheCLI.Transport as transport_module
+from cloudCacheCLI import CFG_SERVER, CFG_PORT, CFG_RETRIES, CFG_BREAKER_THRESHOLD, CFG_BREAKER_COOLDOWN
+from cloudCacheCLI.Transport import CircuitBreaker, ServerUnavailableError, Transport, _failed_before_sending
+
+URL = 'http://localhost:5000/notebooks'
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+class _Config(object):
+    def __init__(self, **options):
+        self.config = dict({CFG_SERVER: 'localhost', CFG_PORT: '5000', CFG_RETRIES: 2, CFG_BREAKER_THRESHOLD: 0},
+                           **options)
+
+    def load_config(self):
+        return self.config
+
+
+class _StubAdapter(BaseAdapter):
+    """ Answers each request with the next outcome given: an HTTP status code, or an exception to raise. """
+
+    def __init__(self, *outcomes):
+        super(_StubAdapter, self).__init__()
+        self.outcomes = list(outcomes)
+        self.sent = 0
+
+    def send(self, request, **kwargs):
+        self.sent += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+
+        response = Response()
+        response.status_code = outcome
+        response._content = b'{}'
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+def refused():
+    """ The error requests raises when nothing is listening on the server's port. """
+    reason = NewConnectionError(None, 'Connection refused')
+    return ConnectionError(MaxRetryError(None, URL, reason))
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(transport_module, 'RETRY_BASE_DELAY', 0)
+
+
+def stub_transport(adapter, **options):
+    transport = Transport(_Config(**options))
+    transport.session.mount('http://', adapter)
+    return transport
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+def test_failed_before_sending():
+    assert _failed_before_sending(ConnectTimeout())
+    assert _failed_before_sending(refused())
+    assert not _failed_before_sending(ReadTimeout())
+    assert not _failed_before_sending(ConnectionError('Connection reset by peer'))
+
+
+def test_get_is_retried_after_a_read_timeout():
+    adapter = _StubAdapter(ReadTimeout(), 200)
+    assert stub_transport(adapter).get(URL).status_code == 200
+    assert adapter.sent == 2
+
+
+def test_post_is_not_retried_after_a_read_timeout():
+    adapter = _StubAdapter(ReadTimeout(), 200)
+    with pytest.raises(ServerUnavailableError):
+        stub_transport(adapter).post(URL, {'name': 'a'})
+    assert adapter.sent == 1
+
+
+def test_post_is_retried_when_it_never_reached_the_server():
+    adapter = _StubAdapter(refused(), ConnectTimeout(), 200)
+    assert stub_transport(adapter).post(URL, {'name': 'a'}).status_code == 200
+    assert adapter.sent == 3
+
+
+def test_put_is_not_retried_when_the_server_is_unavailable():
+    adapter = _StubAdapter(503, 200)
+    assert stub_transport(adapter).put(URL, {'name': 'a'}).status_code == 503
+    assert adapter.sent == 1
+
+
+def test_get_gives_up_after_the_retries():
+    adapter = _StubAdapter(503, 503, 503, 200)
+    assert stub_transport(adapter).get(URL).status_code == 503
+    assert adapter.sent == 3
+
+
+def test_open_breaker_fails_without_sending():
+    adapter = _StubAdapter(refused(), refused(), 200)
+    transport = stub_transport(adapter, **{CFG_RETRIES: 0, CFG_BREAKER_THRESHOLD: 2, CFG_BREAKER_COOLDOWN: 30})
+
+    for _ in range(2):
+        with pytest.raises(ServerUnavailableError):
+            transport.get(URL)
+
+    with pytest.raises(ServerUnavailableError):
+        transport.get(URL)
+    assert adapter.sent == 2
+
+    # Once the cooldown has passed, the trial request goes through, and closes the breaker
+    transport.breaker.opened_at -= 30
+    assert transport.get(URL).status_code == 200
+    assert transport.breaker.opened_at is None
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+def test_breaker_opens_at_the_threshold():
+    breaker = CircuitBreaker(threshold=3, cooldown=30)
+
+    for _ in range(2):
+        breaker.record_failure()
+        breaker.before_request()
+
+    breaker.record_failure()
+    with pytest.raises(ServerUnavailableError):
+        breaker.before_request()
+
+
+def test_breaker_lets_one_trial_through_after_the_cooldown():
+    breaker = CircuitBreaker(threshold=1, cooldown=30)
+    breaker.record_failure()
+    breaker.opened_at -= 30
+
+    breaker.before_request()
+    with pytest.raises(ServerUnavailableError):
+        breaker.before_request()
+
+    breaker.record_success()
+    breaker.before_request()
+    breaker.before_request()
+
+
+def test_failed_trial_reopens_the_breaker():
+    breaker = CircuitBreaker(threshold=1, cooldown=30)
+    breaker.record_failure()
+    breaker.opened_at -= 30
+
+    breaker.before_request()
+    breaker.record_failure()
+    with pytest.raises(ServerUnavailableError):
+        breaker.before_request()
+
+
+def test_breaker_threshold_of_0_never_opens():
+    breaker = CircuitBreaker(threshold=0, cooldown=30)
+    for _ in range(100):
+        breaker.record_failure()
+    breaker.before_request()